@@ -1,14 +1,16 @@
 """
 LangChain Tools для MarketAnalystAgent з повноцінним планування дій
 """
-import os
 import asyncio
-import httpx
 from typing import Type
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
+from llm_client import openai_client
+from sentiment_lexicon import classify_with_lexicon
+from tools import get_price, get_news_targeted, get_market_news, get_price_history
+
 load_dotenv()
 
 # ---------- STOCK PRICE ----------
@@ -24,27 +26,14 @@ class GetStockPriceTool(BaseTool):
         return asyncio.run(self._arun(symbol))
 
     async def _arun(self, symbol: str) -> str:
-        api_key = os.getenv("TWELVE_DATA_API_KEY")
-        if not api_key:
-            return "❌ API ключ Twelve Data не налаштований"
-        
-        url = "https://api.twelvedata.com/price"
-        params = {
-            "symbol": symbol.upper(),
-            "apikey": api_key
-        }
-
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                r = await client.get(url, params=params)
-                r.raise_for_status()
-                data = r.json()
-                
-                if "price" in data:
-                    price = float(data["price"])
-                    return f"💰 {symbol.upper()}: ${price:.2f}"
-                else:
-                    return f"❌ Не вдалося знайти ціну для {symbol}. Помилка: {data.get('message', 'Unknown error')}"
+            data = await get_price(symbol.upper(), asset_class="stocks")
+            
+            if "price" in data:
+                price = float(data["price"])
+                return f"💰 {data['symbol']}: ${price:.2f}"
+            else:
+                return f"❌ Не вдалося знайти ціну для {symbol}. Помилка: {data.get('error', 'Unknown error')}"
         except Exception as e:
             return f"❌ Помилка отримання ціни {symbol}: {str(e)}"
 
@@ -62,34 +51,15 @@ class GetCryptoPriceTool(BaseTool):
         return asyncio.run(self._arun(symbol))
 
     async def _arun(self, symbol: str) -> str:
-        api_key = os.getenv("TWELVE_DATA_API_KEY")
-        if not api_key:
-            return "❌ API ключ Twelve Data не налаштований"
-        
-        # Twelve Data використовує формат BTC/USD замість BTCUSD
-        if symbol.upper().endswith("USD") and len(symbol) > 3:
-            crypto_base = symbol.upper()[:-3]
-            formatted_symbol = f"{crypto_base}/USD"
-        else:
-            formatted_symbol = symbol.upper()
-        
-        url = "https://api.twelvedata.com/price"
-        params = {
-            "symbol": formatted_symbol,
-            "apikey": api_key
-        }
-
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                r = await client.get(url, params=params)
-                r.raise_for_status()
-                data = r.json()
-                
-                if "price" in data:
-                    price = float(data["price"])
-                    return f"💰 {formatted_symbol}: ${price:,.2f}"
-                else:
-                    return f"❌ Не вдалося знайти ціну для {symbol}. Помилка: {data.get('message', 'Unknown error')}"
+            # get_crypto_price сам переводить BTCUSD у формат Twelve Data (BTC/USD)
+            data = await get_price(symbol.upper(), asset_class="crypto")
+            
+            if "price" in data:
+                price = float(data["price"])
+                return f"💰 {data['symbol']}: ${price:,.2f}"
+            else:
+                return f"❌ Не вдалося знайти ціну для {symbol}. Помилка: {data.get('error', 'Unknown error')}"
         except Exception as e:
             return f"❌ Помилка отримання ціни {symbol}: {str(e)}"
 
@@ -108,25 +78,12 @@ class GetStockNewsTool(BaseTool):
         return asyncio.run(self._arun(query, limit))
 
     async def _arun(self, query: str, limit: int = 3) -> str:
-        api_key = os.getenv("NEWSDATA_API_KEY")
-        url = "https://newsdata.io/api/1/news"
-        params = {
-            "apikey": api_key,
-            "q": query,
-            "category": "business",
-            "language": "en",
-            "size": str(min(limit, 5))
-        }
-
         try:
-            async with httpx.AsyncClient() as client:
-                r = await client.get(url, params=params)
-                r.raise_for_status()
-                data = r.json()
-                articles = data.get("results", [])
-                if not articles:
-                    return f"📰 Немає новин про {query}"
-                return "\n".join([f"{i+1}. {a['title']}" for i, a in enumerate(articles)])
+            # Спільний кеш з get_news_targeted: повторні запити не йдуть у NewsData.io
+            articles = await get_news_targeted(query, min(limit, 5))
+            if not articles:
+                return f"📰 Немає новин про {query}"
+            return "\n".join([f"{i+1}. {a['title']}" for i, a in enumerate(articles)])
         except Exception as e:
             return f"❌ Помилка: {str(e)}"
 
@@ -144,29 +101,51 @@ class GetMarketSummaryTool(BaseTool):
         return asyncio.run(self._arun(category))
 
     async def _arun(self, category: str = "business") -> str:
-        api_key = os.getenv("NEWSDATA_API_KEY")
-        url = "https://newsdata.io/api/1/news"
-        params = {
-            "apikey": api_key,
-            "category": category,
-            "q": "market",
-            "language": "en",
-            "size": "5"
-        }
-
         try:
-            async with httpx.AsyncClient() as client:
-                r = await client.get(url, params=params)
-                r.raise_for_status()
-                data = r.json()
-                articles = data.get("results", [])
-                if not articles:
-                    return "📊 Немає актуальних ринкових новин"
-                return "\n".join([f"{i+1}. {a['title']}" for i, a in enumerate(articles)])
+            # Новини категорії через маршрутизатор провайдерів та спільний кеш новин
+            articles = await get_market_news(category, 5)
+            if not articles:
+                return "📊 Немає актуальних ринкових новин"
+            return "\n".join([f"{i+1}. {a['title']}" for i, a in enumerate(articles)])
         except Exception as e:
             return f"❌ Помилка: {str(e)}"
 
 
+# ---------- PRICE HISTORY ----------
+class GetPriceHistoryInput(BaseModel):
+    symbol: str = Field(description="Тикер активу (AAPL, BTCUSD, EURUSD)")
+    interval: str = Field(default="1day", description="Інтервал свічок: 1min, 5min, 15min, 30min, 1h, 4h, 1day, 1week")
+    bars: int = Field(default=30, description="Глибина історії в інтервалах (наприклад, 30 днів для 1day)")
+
+class GetPriceHistoryTool(BaseTool):
+    name: str = "get_price_history"
+    description: str = "Історія цін активу (OHLCV свічки): зміна за період, максимум та мінімум"
+    args_schema: Type[BaseModel] = GetPriceHistoryInput
+
+    def _run(self, symbol: str, interval: str = "1day", bars: int = 30) -> str:
+        return asyncio.run(self._arun(symbol, interval, bars))
+
+    async def _arun(self, symbol: str, interval: str = "1day", bars: int = 30) -> str:
+        try:
+            data = await get_price_history(symbol.upper(), interval, bars=bars)
+            if data.get("error"):
+                return f"❌ Не вдалося отримати історію {symbol}. Помилка: {data['error']}"
+            candles = data["bars"]
+            if not candles:
+                return f"📉 Немає історичних даних для {symbol}"
+            first, last = candles[0], candles[-1]
+            change = (last["close"] - first["open"]) / first["open"] * 100 if first["open"] else 0.0
+            high = max(candle["high"] for candle in candles)
+            low = min(candle["low"] for candle in candles)
+            return (
+                f"📈 {data['symbol']} ({interval}, {len(candles)} свічок): "
+                f"відкриття {first['open']:,.2f} → закриття {last['close']:,.2f} ({change:+.2f}%), "
+                f"максимум {high:,.2f}, мінімум {low:,.2f}"
+            )
+        except Exception as e:
+            return f"❌ Помилка отримання історії {symbol}: {str(e)}"
+
+
 # ---------- SENTIMENT ----------
 class AnalyzeSentimentInput(BaseModel):
     text: str = Field(description="Текст для аналізу")
@@ -180,22 +159,24 @@ class AnalyzeSentimentTool(BaseTool):
         return asyncio.run(self._arun(text))
 
     async def _arun(self, text: str) -> str:
+        # Однозначні тексти оцінюємо локальним словником без виклику LLM
+        local_result = classify_with_lexicon(text)
+        if local_result is not None:
+            return f"📈 **Тональність:** {local_result['sentiment']}. {local_result['explanation']}"
+        
         try:
-            import openai
-            client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            
-            response = await client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Проаналізуй тональність тексту для ринку. Визнач: bullish (позитивно), bearish (негативно), neutral (нейтрально). Дай коротке пояснення (1-2 речення)."},
-                    {"role": "user", "content": text[:1000]}
-                ],
-                temperature=0,
-                max_tokens=200
-            )
+            async with openai_client() as client:
+                response = await client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": "Проаналізуй тональність тексту для ринку. Визнач: bullish (позитивно), bearish (негативно), neutral (нейтрально). Дай коротке пояснення (1-2 речення)."},
+                        {"role": "user", "content": text[:1000]}
+                    ],
+                    temperature=0,
+                    max_tokens=200
+                )
             
             result = response.choices[0].message.content.strip()
-            await client.close()
             return f"📈 **Тональність:** {result}"
         except Exception as e:
             return f"❌ Помилка аналізу: {str(e)}"
@@ -207,5 +188,6 @@ AVAILABLE_TOOLS = [
     GetCryptoPriceTool(),
     GetStockNewsTool(),
     GetMarketSummaryTool(),
+    GetPriceHistoryTool(),
     AnalyzeSentimentTool()
 ]
@@ -0,0 +1,156 @@
+"""
+Багатошаблонний пошук сутностей у тексті (автомат Ахо-Корасік)
+"""
+from collections import deque
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple
+
+# Допустимі закінчення для латинських ключів (множина: stocks, games)
+_LATIN_SUFFIXES = ("s", "es")
+# Максимальна довжина відмінкового закінчення для кириличних ключів (біткоїна, теслу)
+_CYRILLIC_MAX_SUFFIX = 3
+
+
+class EntityMatch(NamedTuple):
+    start: int
+    end: int
+    pattern: str
+    kind: str
+    value: Any
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _is_cyrillic(text: str) -> bool:
+    return any("Ѐ" <= char <= "ӿ" for char in text)
+
+
+class AhoCorasick:
+    """
+    Автомат Ахо-Корасік для пошуку всіх шаблонів за один прохід тексту.
+
+    Будується один раз; пошук лінійний за довжиною тексту і не залежить
+    від кількості шаблонів.
+    """
+
+    def __init__(self, patterns: Dict[str, Tuple[str, Any]]):
+        """
+        Args:
+            patterns: Шаблон (у нижньому регістрі) -> (тип, значення)
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        self._payloads = dict(patterns)
+
+        for pattern in self._payloads:
+            self._add(pattern)
+        self._build_links()
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern)
+
+    def _build_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                candidate = self._goto[fail].get(char, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                # Вихід стану включає шаблони, що є його суфіксами
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_raw(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Повертає всі входження шаблонів (start, end, pattern), включно з перекриттями"""
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._output[state]:
+                yield index - len(pattern) + 1, index + 1, pattern
+
+    def _word_end(self, text: str, start: int, end: int, pattern: str) -> int:
+        """
+        Перевіряє межі слова та повертає кінець збігу з урахуванням закінчення
+        або -1, якщо збіг всередині іншого слова
+        """
+        if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(pattern[0]):
+            return -1
+        if end == len(text) or not _is_word_char(text[end]) or not _is_word_char(pattern[-1]):
+            return end
+
+        word_end = end
+        while word_end < len(text) and _is_word_char(text[word_end]):
+            word_end += 1
+        suffix = text[end:word_end]
+
+        if _is_cyrillic(pattern):
+            return word_end if len(suffix) <= _CYRILLIC_MAX_SUFFIX else -1
+        return word_end if suffix in _LATIN_SUFFIXES else -1
+
+    def find(self, text: str) -> List[EntityMatch]:
+        """
+        Знаходить непересічні збіги з урахуванням меж слів.
+        Серед перекриттів перемагає найлівіший, а серед них - найдовший.
+
+        Args:
+            text: Текст (порівняння без урахування регістру)
+
+        Returns:
+            Список збігів у порядку появи в тексті
+        """
+        lowered = text.lower()
+        candidates = []
+        for start, end, pattern in self.iter_raw(lowered):
+            word_end = self._word_end(lowered, start, end, pattern)
+            if word_end >= 0:
+                candidates.append((start, word_end, pattern))
+
+        candidates.sort(key=lambda item: (item[0], -(item[1] - item[0])))
+        matches = []
+        last_end = 0
+        for start, end, pattern in candidates:
+            if start < last_end:
+                continue
+            kind, value = self._payloads[pattern]
+            matches.append(EntityMatch(start, end, pattern, kind, value))
+            last_end = end
+        return matches
+
+
+def build_entity_matcher(tickers: Dict[str, str], non_financial_keywords: List[str]) -> AhoCorasick:
+    """
+    Будує автомат для тикерів, їх аліасів та не-фінансових ключових слів
+
+    Args:
+        tickers: Аліас -> тикер (як POPULAR_TICKERS)
+        non_financial_keywords: Слова, що вказують на не-фінансовий запит
+
+    Returns:
+        Скомпільований автомат
+    """
+    patterns: Dict[str, Tuple[str, Any]] = {}
+    for keyword in non_financial_keywords:
+        patterns[keyword.lower()] = ("non_financial", keyword)
+    for alias, ticker in tickers.items():
+        patterns[alias.lower()] = ("ticker", ticker)
+    return AhoCorasick(patterns)
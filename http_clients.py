@@ -0,0 +1,145 @@
+"""
+Реєстр спільних HTTP клієнтів для зовнішніх API (ринкові дані та новини)
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+
+from rate_limiter import RateLimitExceeded, rate_limiter
+from provider_health import HealthTrackingTransport, mark_transient_failure, provider_health
+
+load_dotenv()
+
+# Налаштування пулів з'єднань
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10.0"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30.0"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Клієнти по хостах (scheme://host) та цикл подій, якому вони належать
+_clients: Dict[str, httpx.AsyncClient] = {}
+_owner_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http2_available() -> bool:
+    """Перевіряє, чи встановлено пакет h2 (потрібен для HTTP/2 в httpx)"""
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("⚠️ HTTP2_ENABLED=true, але пакет h2 не встановлено. Використовую HTTP/1.1")
+        return False
+
+
+def _host_key(url: str) -> str:
+    """Повертає ключ пулу для URL (схема + хост + порт)"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+async def _limit_request(request: httpx.Request) -> None:
+    """Ліміт запитів провайдера; відмова ліміту - тимчасовий збій для хеджованих запитів"""
+    try:
+        await rate_limiter.before_request(request)
+    except RateLimitExceeded:
+        mark_transient_failure("rate_limited")
+        raise
+
+
+def _build_client(timeout: Optional[float] = None) -> httpx.AsyncClient:
+    """
+    Створює клієнт з keep-alive пулом з'єднань, лімітами запитів до провайдерів
+    та вимикачами (circuit breaker) для недоступних провайдерів
+    """
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+    transport = HealthTrackingTransport(
+        httpx.AsyncHTTPTransport(limits=limits, http2=_http2_available()),
+        provider_health
+    )
+    return httpx.AsyncClient(
+        timeout=timeout if timeout is not None else HTTP_TIMEOUT,
+        transport=transport,
+        event_hooks={"request": [_limit_request], "response": [rate_limiter.after_response]}
+    )
+
+
+async def open_http_clients() -> None:
+    """
+    Активує реєстр клієнтів для поточного циклу подій.
+    Викликається один раз при старті FastAPI (lifespan).
+    """
+    global _owner_loop
+    _owner_loop = asyncio.get_running_loop()
+
+
+async def close_http_clients() -> None:
+    """Закриває всі пули з'єднань. Викликається при зупинці сервера."""
+    global _owner_loop
+    clients = list(_clients.values())
+    _clients.clear()
+    _owner_loop = None
+    await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+
+def get_http_client(url: str) -> Optional[httpx.AsyncClient]:
+    """
+    Повертає спільний клієнт для хоста з URL
+
+    Args:
+        url: Адреса запиту (використовується лише хост)
+
+    Returns:
+        Клієнт з пулом з'єднань або None, якщо реєстр не активний
+        у поточному циклі подій
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+    # httpx клієнт прив'язаний до циклу подій, в якому відкриті його з'єднання
+    if _owner_loop is None or loop is not _owner_loop:
+        return None
+
+    key = _host_key(url)
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        client = _build_client()
+        _clients[key] = client
+    return client
+
+
+@asynccontextmanager
+async def http_client(url: str, timeout: Optional[float] = None) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Видає клієнт для запиту до хоста з URL.
+
+    Якщо реєстр активний у поточному циклі подій - повертає спільний клієнт
+    (з'єднання перевикористовуються). Інакше створює тимчасовий клієнт,
+    який закривається після виходу з блоку.
+
+    Args:
+        url: Адреса запиту
+        timeout: Таймаут для тимчасового клієнта (для спільного передавайте
+            timeout безпосередньо у запит)
+    """
+    client = get_http_client(url)
+    if client is not None:
+        yield client
+        return
+
+    async with _build_client(timeout) as temp_client:
+        yield temp_client
+
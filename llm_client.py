@@ -0,0 +1,119 @@
+"""
+Спільний клієнт OpenAI з пулом з'єднань та метриками використання
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Налаштування пулу з'єднань до OpenAI
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "10"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30.0"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5.0"))
+
+_client: Optional[openai.AsyncOpenAI] = None
+_owner_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Метрики використання пулу
+llm_pool_stats = {
+    "in_flight": 0,
+    "peak_in_flight": 0,
+    "requests_total": 0,
+    "shared_requests": 0,
+    "temporary_clients": 0
+}
+
+
+def _build_client() -> openai.AsyncOpenAI:
+    """Створює клієнт OpenAI з власним httpx пулом з'єднань"""
+    timeout = httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+    http_client = httpx.AsyncClient(
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE
+        )
+    )
+    return openai.AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        timeout=timeout,
+        http_client=http_client
+    )
+
+
+async def open_llm_client() -> None:
+    """Створює спільний клієнт для поточного циклу подій (FastAPI lifespan)"""
+    global _client, _owner_loop
+    _owner_loop = asyncio.get_running_loop()
+    _client = _build_client()
+
+
+async def close_llm_client() -> None:
+    """Закриває спільний клієнт та його пул з'єднань"""
+    global _client, _owner_loop
+    client = _client
+    _client = None
+    _owner_loop = None
+    if client is not None:
+        await client.close()
+
+
+def _shared_client() -> Optional[openai.AsyncOpenAI]:
+    """Повертає спільний клієнт, якщо він належить поточному циклу подій"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    if _client is None or loop is not _owner_loop:
+        return None
+    return _client
+
+
+@asynccontextmanager
+async def openai_client() -> AsyncIterator[openai.AsyncOpenAI]:
+    """
+    Видає клієнт OpenAI для одного виклику.
+
+    У циклі подій сервера повертає спільний клієнт з пулом з'єднань.
+    В інших циклах (наприклад, asyncio.run в LangChain інструментах)
+    створює тимчасовий клієнт і закриває його після виходу з блоку.
+    """
+    client = _shared_client()
+    llm_pool_stats["requests_total"] += 1
+    llm_pool_stats["in_flight"] += 1
+    llm_pool_stats["peak_in_flight"] = max(llm_pool_stats["peak_in_flight"], llm_pool_stats["in_flight"])
+
+    try:
+        if client is not None:
+            llm_pool_stats["shared_requests"] += 1
+            yield client
+        else:
+            llm_pool_stats["temporary_clients"] += 1
+            temp_client = _build_client()
+            try:
+                yield temp_client
+            finally:
+                await temp_client.close()
+    finally:
+        llm_pool_stats["in_flight"] -= 1
+
+
+def get_llm_pool_stats() -> Dict[str, Any]:
+    """
+    Повертає метрики використання пулу OpenAI
+
+    Returns:
+        Словник з лічильниками та відсотком завантаження пулу
+    """
+    stats = dict(llm_pool_stats)
+    stats["max_connections"] = OPENAI_MAX_CONNECTIONS
+    stats["utilization"] = round(stats["in_flight"] / OPENAI_MAX_CONNECTIONS, 3) if OPENAI_MAX_CONNECTIONS else 0.0
+    stats["shared_client_active"] = _client is not None
+    return stats
@@ -4,29 +4,89 @@ MarketAnalystAgent - GenAI агент для аналізу ринкової т
 import asyncio
 import json
 import os
-from typing import List, Dict, Any
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
 from datetime import datetime
 
-import httpx
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 from tools import (
-    analyze_multiple_news, analyze_intent, extract_ticker, get_price,
-    detect_entity, plan_actions, execute_action_plan, get_news_targeted
+    analyze_multiple_news, analyze_intent, extract_ticker, get_price, get_prices, get_price_history, price_history,
+    detect_entity, plan_actions, execute_action_plan, get_news_targeted, symbol_master, extract_entities,
+    is_known_symbol, needs_analysis, refresh_symbols, run_symbol_reloader, get_entity_matcher
 )
 from agent_tools import AVAILABLE_TOOLS
+from http_clients import open_http_clients, close_http_clients
+from llm_client import openai_client, open_llm_client, close_llm_client, get_llm_pool_stats
+from quote_cache import quote_cache
+from tick_store import tick_store
+from price_stream import PRICE_STREAM_ENABLED, price_stream, websockets_available
+from price_hub import PriceHub, PriceSubscriber
+from sentiment_cache import sentiment_cache
+from sentiment_lexicon import get_lexicon_stats
+from swr_cache import StaleWhileRevalidateCache
+from news_cache import news_query_cache
+from rate_limiter import rate_limiter, request_priority, PRIORITY_BACKGROUND
+from provider_health import provider_health
+from provider_router import provider_router
+from news_pipeline import NewsProvider, aggregate_news, rank_news, NEWS_AGGREGATE_LIMIT, NEWS_PROVIDER_FETCH_SIZE
+from news_store import news_store
+from news_ingest import (
+    NewsIngestor, NewsDataSource, FinageNewsSource,
+    NEWS_INGEST_ENABLED, NEWS_INGEST_INTERVAL, NEWS_INGEST_MAX_PAGES
+)
 from langchain_openai import ChatOpenAI
 from langchain.agents import AgentExecutor, create_openai_functions_agent
+from langchain_core.callbacks import AsyncCallbackHandler
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 load_dotenv()
 
+
+async def run_in_background(coro_factory) -> None:
+    """Виконує фонову задачу з низьким пріоритетом запитів до API (ліміти провайдерів)"""
+    with request_priority(PRIORITY_BACKGROUND):
+        await coro_factory()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Відкриває спільні пули з'єднань (HTTP та OpenAI) і фонові задачі на старті та закриває при зупинці"""
+    await open_http_clients()
+    await open_llm_client()
+    # Довідник символів і автомат сутностей будуються до першого запиту, не в циклі подій
+    await asyncio.to_thread(refresh_symbols)
+    background_tasks = [
+        asyncio.create_task(run_in_background(news_cache.run_refresher)),
+        asyncio.create_task(run_symbol_reloader())
+    ]
+    if NEWS_INGEST_ENABLED:
+        background_tasks.append(asyncio.create_task(run_in_background(news_ingestor.run)))
+    if PRICE_STREAM_ENABLED and websockets_available():
+        background_tasks.append(asyncio.create_task(price_stream.run()))
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        # Задачі мають завершитися до закриття клієнтів і сховищ, якими вони користуються
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        await price_hub.close()
+        await close_llm_client()
+        await close_http_clients()
+        sentiment_cache.close()
+        news_store.close()
+
+
 app = FastAPI(
     title="Market Analyst Agent",
     description="GenAI агент для аналізу ринкової тональності на основі новин",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Pydantic моделі для API
@@ -40,15 +100,18 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     message: Message
 
+class PricesRequest(BaseModel):
+    symbols: List[str]
+
 class NewsItem(BaseModel):
     title: str
     description: str
     source: str
     published_at: str
 
-# Кеш для новин (простий в пам'яті кеш)
-news_cache = {"data": [], "timestamp": None}
+# Кеш для новин (stale-while-revalidate, створюється після fetch_all_news)
 CACHE_DURATION = 300  # 5 хвилин
+NEWS_MAX_STALE = int(os.getenv("NEWS_MAX_STALE", "600"))  # скільки ще віддавати застарілі новини
 
 # Налаштування LangChain агента
 AGENT_SYSTEM_PROMPT = """Ти експертний фінансовий аналітик з доступом до реальних даних через API.
@@ -63,6 +126,7 @@ AGENT_SYSTEM_PROMPT = """Ти експертний фінансовий анал
 - get_crypto_price: ціни криптовалют (BTCUSD, ETHUSD, тощо)
 - get_stock_news: новини про конкретні компанії
 - get_market_summary: загальна ринкова ситуація
+- get_price_history: історія цін (зміна за період, максимум, мінімум)
 - analyze_sentiment: аналіз тональності новин
 
 🧠 **Алгоритм роботи:**
@@ -74,6 +138,7 @@ AGENT_SYSTEM_PROMPT = """Ти експертний фінансовий анал
 
 2. **Для цінових запитів** ("скільки коштує X?"):
    - Просто отримай та поверни поточну ціну
+   - Для питань про динаміку ("як змінився X за місяць?") використай get_price_history
 
 3. **Для ринкових запитів** ("що на ринку?"):
    - Отримай загальний огляд ринку
@@ -87,13 +152,19 @@ AGENT_SYSTEM_PROMPT = """Ти експертний фінансовий анал
 🚫 **НЕ відповідай на не-фінансові запити** (спорт, погода, рецепти, тощо)"""
 
 # Створення LangChain агента
-def create_financial_agent():
-    """Створює LangChain агента з фінансовими інструментами"""
+def create_financial_agent(streaming: bool = False):
+    """
+    Створює LangChain агента з фінансовими інструментами
+    
+    Args:
+        streaming: Генерувати токени відповіді по одному (для /run/stream)
+    """
     
     # Налаштування LLM
     llm = ChatOpenAI(
         model="gpt-3.5-turbo",
         temperature=0.1,
+        streaming=streaming,
         openai_api_key=os.getenv("OPENAI_API_KEY")
     )
     
@@ -119,8 +190,13 @@ def create_financial_agent():
     
     return agent_executor
 
-# Глобальний агент (створюється один раз)
+# Глобальні агенти (створюються один раз)
 financial_agent = None
+streaming_financial_agent = None
+
+# Максимум агентів, що виконуються одночасно (решта чекає в черзі)
+AGENT_MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", "20"))
+agent_semaphore = asyncio.Semaphore(AGENT_MAX_CONCURRENCY)
 
 # Константи для відповідей агента
 INVESTMENT_ADVICE_RULES = """Ти експерт з інвестицій, який надає поради на основі аналізу новин та цін.
@@ -148,126 +224,145 @@ GENERAL_CHAT_RESPONSES = {
 }
 
 
-async def fetch_newsdata_io_news() -> List[Dict]:
-    """Отримує новини з NewsData.io API"""
-    api_key = os.getenv("NEWSDATA_API_KEY")
-    if not api_key:
-        return []
-    
-    url = "https://newsdata.io/api/1/news"
-    params = {
-        "apikey": api_key,
-        "category": "business,top",
-        "language": "en",
-        "size": "3"
-    }
-    
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            news_items = []
-            for article in data.get("results", [])[:3]:
-                if article.get("title") and article.get("description"):
-                    news_items.append({
-                        "title": article["title"],
-                        "description": article["description"],
-                        "source": "NewsData.io",
-                        "published_at": article.get("pubDate", ""),
-                        "full_text": f"{article['title']}. {article['description']}"
-                    })
-            return news_items
-    except Exception as e:
-        print(f"Помилка при отриманні новин з NewsData.io: {e}")
-        return []
+# Адаптери джерел загальних новин (реєструються в tools.py; weight - якість джерела для ранжування)
+NEWS_ADAPTERS = [adapter for adapter in provider_router.adapters if adapter.supports("news")]
 
 
-async def fetch_finage_news() -> List[Dict]:
-    """Отримує новини з Finage API"""
-    api_key = os.getenv("FINAGE_API_KEY")
-    if not api_key:
-        return []
-    
-    url = "https://api.finage.co.uk/news/forex"
-    params = {
-        "apikey": api_key,
-        "limit": "3"
-    }
-    
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            news_items = []
-            articles = data if isinstance(data, list) else data.get("news", [])
-            
-            for article in articles[:3]:
-                if article.get("title"):
-                    description = article.get("description", "") or article.get("summary", "")
-                    news_items.append({
-                        "title": article["title"],
-                        "description": description,
-                        "source": "Finage",
-                        "published_at": article.get("date", ""),
-                        "full_text": f"{article['title']}. {description}"
-                    })
-            return news_items
-    except Exception as e:
-        print(f"Помилка при отриманні новин з Finage: {e}")
-        return []
+def news_providers() -> List[NewsProvider]:
+    """
+    Джерела для агрегатора новин: провайдери з відкритим вимикачем пропускаються
+    (якщо недоступні всі - пробуємо всі)
+    """
+    candidates = provider_router.candidates("news")
+    available = [adapter for adapter in candidates if provider_router.is_available(adapter.name)] or candidates
+    return [NewsProvider(adapter.label, adapter.handlers["news"], adapter.weight) for adapter in available]
+
+
+# Фоновий інжест новин у локальне сховище (NEWS_INGEST_ENABLED)
+news_ingestor = NewsIngestor(
+    news_store,
+    [NewsDataSource(NEWS_INGEST_MAX_PAGES), FinageNewsSource()],
+    NEWS_INGEST_INTERVAL,
+    sentiment_analyzer=analyze_multiple_news,
+    entity_extractor=extract_entities
+)
+
+
+async def fetch_all_news() -> List[Dict]:
+    """
+    Отримує новини з усіх джерел паралельно, прибирає майже-дублікати
+    та повертає найсвіжіші новини з найкращих джерел.
+    Якщо працює інжест, новини читаються з локального сховища без запитів до API.
+    """
+    if NEWS_INGEST_ENABLED and news_ingestor.is_fresh():
+        local_news = await asyncio.to_thread(news_store.recent, NEWS_PROVIDER_FETCH_SIZE * len(NEWS_ADAPTERS))
+        if local_news:
+            source_weights = {adapter.label: adapter.weight for adapter in NEWS_ADAPTERS}
+            return rank_news(local_news, source_weights, NEWS_AGGREGATE_LIMIT)
+    return await aggregate_news(news_providers(), NEWS_AGGREGATE_LIMIT)
+
+
+news_cache = StaleWhileRevalidateCache(fetch_all_news, ttl=CACHE_DURATION, max_stale=NEWS_MAX_STALE)
 
 
 @app.get("/news", response_model=List[NewsItem])
 async def get_news():
     """
-    Отримує останні 3 економічні новини з різних джерел
+    Отримує останні економічні новини з різних джерел (без дублікатів, за рейтингом).
+    Застарілі новини віддаються одразу, поки кеш оновлюється у фоні.
     """
-    global news_cache
-    
-    # Перевіряємо кеш
-    current_time = datetime.now().timestamp()
-    if (news_cache["timestamp"] and 
-        current_time - news_cache["timestamp"] < CACHE_DURATION and 
-        news_cache["data"]):
-        return news_cache["data"]
-    
     try:
-        # Отримуємо новини з обох джерел паралельно
-        newsdata_task = fetch_newsdata_io_news()
-        finage_task = fetch_finage_news()
-        
-        newsdata_results, finage_results = await asyncio.gather(
-            newsdata_task, finage_task, return_exceptions=True
-        )
-        
-        # Обробляємо результати
-        all_news = []
-        
-        if not isinstance(newsdata_results, Exception):
-            all_news.extend(newsdata_results)
-        
-        if not isinstance(finage_results, Exception):
-            all_news.extend(finage_results)
-        
-        # Обмежуємо до 6 новин і сортуємо
-        all_news = all_news[:6]
-        
-        # Оновлюємо кеш
-        news_cache = {
-            "data": all_news,
-            "timestamp": current_time
-        }
-        
-        return all_news
-    
+        return await news_cache.get()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Помилка отримання новин: {str(e)}")
 
 
+# Максимум символів в одному запиті /prices
+MAX_PRICES_SYMBOLS = 200
+
+
+@app.post("/prices")
+async def get_prices_batch(request: PricesRequest) -> Dict[str, Dict[str, Any]]:
+    """
+    Повертає ціни кількох активів (watchlist, портфель) одним запитом
+    """
+    if not request.symbols:
+        raise HTTPException(status_code=400, detail="Список символів порожній")
+    if len(request.symbols) > MAX_PRICES_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"Максимум {MAX_PRICES_SYMBOLS} символів за запит")
+    
+    return await get_prices(request.symbols)
+
+
+@app.get("/history/{symbol}")
+async def get_history(symbol: str, interval: str = "1day", start: Optional[int] = None, end: Optional[int] = None):
+    """
+    Історичні OHLCV свічки активу (з локального кешу, до API - лише за відсутні діапазони)
+    """
+    result = await get_price_history(symbol, interval, start, end)
+    if result.get("error"):
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+
+async def fetch_watched_price(symbol: str) -> Dict[str, Any]:
+    """Ціна для підписників /ws/prices (фоновий пріоритет у лімітах провайдерів)"""
+    with request_priority(PRIORITY_BACKGROUND):
+        return await get_price(symbol)
+
+
+def log_sender_error(task: asyncio.Task) -> None:
+    """Логує помилку відправки оновлень клієнту /ws/prices (від'єднання - не помилка)"""
+    if task.cancelled() or task.exception() is None:
+        return
+    if not isinstance(task.exception(), WebSocketDisconnect):
+        print(f"Помилка відправки цін клієнту WebSocket: {task.exception()}")
+
+
+# Розсилка живих цін: один опитувач на символ для всіх клієнтів /ws/prices
+price_hub = PriceHub(fetch_watched_price, is_known_symbol)
+
+
+@app.websocket("/ws/prices")
+async def prices_websocket(websocket: WebSocket):
+    """
+    Живі ціни через WebSocket.
+
+    Клієнт надсилає {"action": "subscribe" | "unsubscribe", "symbols": [...]},
+    сервер відповідає {"type": "subscribed", "symbols": [...], "rejected": [...]}
+    (невідомі символи та понад ліміти відхиляються) і надсилає
+    оновлення {"type": "prices", "data": {тикер: котирування}}.
+    """
+    await websocket.accept()
+    subscriber = PriceSubscriber(websocket.send_json)
+    sender = asyncio.create_task(subscriber.run())
+    sender.add_done_callback(log_sender_error)
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                action, symbols = message.get("action"), message.get("symbols") or []
+            except (ValueError, AttributeError):
+                await websocket.send_json({"type": "error", "message": "Очікується JSON з полями action та symbols"})
+                continue
+            if not isinstance(symbols, list):
+                symbols = [symbols]
+            rejected = []
+            if action == "subscribe":
+                current, rejected = price_hub.subscribe(subscriber, symbols)
+            elif action == "unsubscribe":
+                current = price_hub.unsubscribe(subscriber, symbols)
+            else:
+                await websocket.send_json({"type": "error", "message": f"Невідома дія: {action}"})
+                continue
+            await websocket.send_json({"type": "subscribed", "symbols": current, "rejected": rejected})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        price_hub.remove(subscriber)
+
+
 async def get_financial_agent():
     """Отримує або створює фінансового агента"""
     global financial_agent
@@ -277,6 +372,33 @@ async def get_financial_agent():
     return financial_agent
 
 
+async def invoke_agent(agent, user_input: str, callbacks: Optional[list] = None) -> Dict[str, Any]:
+    """
+    Виконує агента асинхронно в циклі подій сервера.
+    Інструменти викликаються через _arun без окремих потоків та циклів подій.
+    
+    Args:
+        agent: AgentExecutor
+        user_input: Запит користувача
+        callbacks: Обробники подій LangChain
+        
+    Returns:
+        Результат AgentExecutor
+    """
+    async with agent_semaphore:
+        config = {"callbacks": callbacks} if callbacks else None
+        return await agent.ainvoke({"input": user_input}, config=config)
+
+
+async def get_streaming_financial_agent():
+    """Отримує або створює агента з потоковою генерацією токенів"""
+    global streaming_financial_agent
+    if streaming_financial_agent is None:
+        print("🤖 Створюю потокового LangChain агента...")
+        streaming_financial_agent = create_financial_agent(streaming=True)
+    return streaming_financial_agent
+
+
 def truncate_response(response: str, max_length: int = 3500) -> str:
     """Обрізає відповідь до безпечної довжини для Telegram"""
     if len(response) <= max_length:
@@ -292,6 +414,58 @@ def truncate_response(response: str, max_length: int = 3500) -> str:
     return truncated + "\n\n💬 [Відповідь обрізана для Telegram]"
 
 
+# Лічильники маршрутизації запитів
+router_stats = {"fast_path": 0, "agent": 0}
+
+
+async def route_fast_path(user_input: str) -> Optional[str]:
+    """
+    Детермінований маршрут для простих запитів без LangChain агента.
+
+    Якщо словник розпізнав актив, запит не містить слів про інвестиції, новини
+    чи аналіз, а план складається з однієї дії get_price, ціна отримується
+    напряму. Якщо згадано кілька активів, ціни всіх отримуються одним
+    get_prices. Складені й неоднозначні запити (або помилки API) повертають
+    None і передаються агенту.
+    
+    Args:
+        user_input: Запит користувача
+        
+    Returns:
+        Готова відповідь або None
+    """
+    # "Скільки коштує Tesla і чи варто купувати?" - друга частина потребує агента
+    if needs_analysis(user_input):
+        return None
+    
+    # "Ціна Tesla та Nvidia" - відповідь має містити всі згадані активи
+    tickers = list(dict.fromkeys(
+        match.value for match in get_entity_matcher().find(user_input) if match.kind == "ticker"
+    ))
+    if len(tickers) > 1:
+        prices = await get_prices(tickers)
+        if any(not prices.get(ticker) or prices[ticker].get("error") for ticker in tickers):
+            return None
+        return "\n\n".join(
+            format_price_response(get_entity_display_name(ticker), prices[ticker]) for ticker in tickers
+        )
+    
+    entity_info = await detect_entity(user_input, use_llm=False)
+    if not entity_info["is_financial"] or not entity_info["entity"]:
+        return None
+    
+    action_plan = await plan_actions(user_input, entity_info)
+    actions = action_plan["actions"]
+    if len(actions) != 1 or actions[0]["action"] != "get_price":
+        return None
+    
+    price_data = await get_price(actions[0]["params"]["symbol"])
+    if price_data.get("error"):
+        return None
+    
+    return format_price_response(get_entity_display_name(entity_info["entity"]), price_data)
+
+
 @app.post("/run", response_model=ChatResponse)
 async def run_agent(request: ChatRequest):
     """
@@ -309,6 +483,19 @@ async def run_agent(request: ChatRequest):
                 )
             )
         
+        # Прості цінові запити обробляємо без агента
+        fast_response = await route_fast_path(user_input)
+        if fast_response is not None:
+            router_stats["fast_path"] += 1
+            print(f"⚡ Швидкий маршрут: {user_input}")
+            return ChatResponse(
+                message=Message(
+                    role="assistant",
+                    content=fast_response
+                )
+            )
+        router_stats["agent"] += 1
+        
         print(f"🔍 Обробляю запит через LangChain агента: {user_input}")
         
         # Отримуємо LangChain агента
@@ -318,7 +505,7 @@ async def run_agent(request: ChatRequest):
         try:
             # LangChain AgentExecutor автоматично планує та виконує дії
             result = await asyncio.wait_for(
-                asyncio.to_thread(agent.invoke, {"input": user_input}),
+                invoke_agent(agent, user_input),
                 timeout=60.0
             )
             
@@ -353,6 +540,98 @@ async def run_agent(request: ChatRequest):
         )
 
 
+class SSECallbackHandler(AsyncCallbackHandler):
+    """Передає кроки агента, результати інструментів та токени LLM у чергу SSE подій"""
+    
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+    
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            await self.queue.put(("token", {"token": token}))
+    
+    async def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        await self.queue.put(("step", {"tool": action.tool, "input": action.tool_input}))
+    
+    async def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        await self.queue.put(("tool_result", {"output": str(output)}))
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Форматує подію у форматі Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_agent_events(user_input: str) -> AsyncIterator[str]:
+    """
+    Виконує агента та віддає SSE події в міру їх появи:
+    step, tool_result, token, final або error
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    handler = SSECallbackHandler(queue)
+    
+    async def run():
+        try:
+            # Прості цінові запити обробляємо без агента
+            fast_response = await route_fast_path(user_input)
+            if fast_response is not None:
+                router_stats["fast_path"] += 1
+                await queue.put(("final", {"role": "assistant", "content": fast_response}))
+                return
+            router_stats["agent"] += 1
+            
+            agent = await get_streaming_financial_agent()
+            result = await asyncio.wait_for(
+                invoke_agent(agent, user_input, callbacks=[handler]),
+                timeout=60.0
+            )
+            content = result.get("output", "Не вдалося отримати відповідь від агента.")
+            if len(content) > 3500:
+                content = truncate_response(content)
+            await queue.put(("final", {"role": "assistant", "content": content}))
+        except asyncio.TimeoutError:
+            await queue.put(("error", {"content": "⏰ Запит займає більше часу, ніж очікувалося. Спробуйте пізніше або запитайте щось простіше."}))
+        except Exception as e:
+            print(f"❌ Помилка потокового виконання агента: {e}")
+            await queue.put(("error", {"content": "Вибачте, сталася помилка при аналізі. Спробуйте перефразувати запит."}))
+        finally:
+            await queue.put(None)
+    
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            event, data = item
+            yield format_sse(event, data)
+    finally:
+        # Клієнт відключився - зупиняємо агента
+        if not task.done():
+            task.cancel()
+
+
+@app.post("/run/stream")
+async def run_agent_stream(request: ChatRequest):
+    """
+    Потоковий варіант /run: кроки агента, результати інструментів та токени
+    відповіді надсилаються як Server-Sent Events
+    """
+    user_input = request.messages[-1].content if request.messages else ""
+    
+    if not user_input:
+        async def empty_stream():
+            yield format_sse("final", {"role": "assistant", "content": "Будь ласка, напишіть ваш запит."})
+        return StreamingResponse(empty_stream(), media_type="text/event-stream")
+    
+    print(f"🔍 Обробляю потоковий запит через LangChain агента: {user_input}")
+    return StreamingResponse(
+        stream_agent_events(user_input),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 async def format_intelligent_response(
     user_input: str, 
     entity_info: Dict[str, Any], 
@@ -443,11 +722,27 @@ def format_price_response(entity_name: str, price_data: Dict[str, Any]) -> str:
         sign = "+" if change >= 0 else ""
         response_parts.append(f"{change_emoji} {sign}{change:.2f} ({sign}{change_percent:.2f}%)")
     
-    response_parts.append("⏰ Оновлено: щойно")
+    response_parts.append(f"⏰ Оновлено: {format_quote_age(price_data.get('timestamp'))}")
+    if price_data.get("stale"):
+        response_parts.append("⚠️ API тимчасово недоступне - показано останнє збережене котирування")
     
     return "\n".join(response_parts)
 
 
+def format_quote_age(timestamp: Optional[float]) -> str:
+    """Форматує вік котирування за його unix timestamp"""
+    if not timestamp:
+        return "час невідомий"
+    age = max(0.0, time.time() - float(timestamp))
+    if age < 10:
+        return "щойно"
+    if age < 60:
+        return f"{int(age)} с тому"
+    if age < 3600:
+        return f"{int(age // 60)} хв тому"
+    return f"{int(age // 3600)} год тому"
+
+
 async def format_investment_response(entity_name: str, data: Dict[str, Any]) -> str:
     """Форматує відповідь з інвестиційними порадами"""
     response_parts = [f"📊 **Аналіз {entity_name}**\n"]
@@ -620,9 +915,12 @@ async def handle_news_analysis() -> str:
         if not news_items:
             return "На жаль, не вдалося отримати актуальні новини для аналізу."
         
-        # Аналізуємо тональність новин
-        news_texts = [item["full_text"] for item in news_items]
-        sentiment_results = await analyze_multiple_news(news_texts)
+        # Аналізуємо тональність новин (для новин з локального сховища вона вже розрахована)
+        pending = [i for i, item in enumerate(news_items) if "sentiment" not in item]
+        analyzed = await analyze_multiple_news([news_items[i]["full_text"] for i in pending]) if pending else []
+        sentiment_results = [item.get("sentiment") for item in news_items]
+        for i, result in zip(pending, analyzed):
+            sentiment_results[i] = result
         
         # Формуємо компактний звіт
         bullish_count = sum(1 for s in sentiment_results if s["sentiment"].lower() == "bullish")
@@ -739,32 +1037,27 @@ async def handle_investment_advice() -> str:
 {INVESTMENT_ADVICE_RULES}"""
         
         # Генеруємо поради через LLM
-        import openai
-        client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
         try:
-            response = await asyncio.wait_for(
-                client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": advice_prompt},
-                        {"role": "user", "content": "Дай інвестиційні поради на основі поточної ситуації"}
-                    ],
-                    temperature=0.3,
-                    max_tokens=4096,
-                    stream=False
-                ),
-                timeout=20.0
-            )
+            async with openai_client() as client:
+                response = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        model="gpt-3.5-turbo",
+                        messages=[
+                            {"role": "system", "content": advice_prompt},
+                            {"role": "user", "content": "Дай інвестиційні поради на основі поточної ситуації"}
+                        ],
+                        temperature=0.3,
+                        max_tokens=4096,
+                        stream=False
+                    ),
+                    timeout=20.0
+                )
             
             advice = response.choices[0].message.content.strip()
             advice += "\n\n⚠️ **Дисклеймер:** Це не фінансова консультація. Завжди консультуйтеся з професіоналами."
-            
-            await client.close()
             return advice
             
         except Exception as e:
-            await client.close()
             return f"Помилка генерації порад: {str(e)}"
         
     except Exception as e:
@@ -791,6 +1084,86 @@ def handle_general_chat(user_input: str) -> str:
 Просто напишіть що вас цікавить!"""
 
 
+@app.get("/metrics/router")
+async def router_metrics():
+    """Скільки запитів оброблено швидким маршрутом, а скільки - агентом"""
+    return router_stats
+
+
+@app.get("/metrics/news")
+async def news_metrics():
+    """Метрики кешів загальних та таргетованих новин і фонового інжесту"""
+    return {
+        "general": news_cache.get_stats(),
+        "targeted": news_query_cache.get_stats(),
+        "ingest": news_ingestor.get_stats()
+    }
+
+
+@app.get("/metrics/rate-limits")
+async def rate_limit_metrics():
+    """Стан лімітів запитів і денних квот по провайдерах та API ключах"""
+    return rate_limiter.get_stats()
+
+
+@app.get("/metrics/providers")
+async def provider_metrics():
+    """Стан вимикачів, латентність провайдерів, лічильники хеджованих запитів та вибір маршрутизатора"""
+    return {**provider_health.get_stats(), "router": provider_router.get_stats()}
+
+
+@app.get("/metrics/llm")
+async def llm_metrics():
+    """Метрики використання пулу з'єднань OpenAI"""
+    return get_llm_pool_stats()
+
+
+@app.get("/metrics/quotes")
+async def quote_metrics():
+    """Метрики кешу котирувань"""
+    return quote_cache.get_stats()
+
+
+@app.get("/metrics/stream")
+async def stream_metrics():
+    """Стан потоку цін Twelve Data: підписані символи, з'єднання, кількість подій"""
+    return price_stream.get_stats()
+
+
+@app.get("/metrics/ws")
+async def websocket_metrics():
+    """Розсилка живих цін: символи, клієнти, опитування та доставлені оновлення"""
+    return price_hub.get_stats()
+
+
+@app.get("/metrics/history")
+async def history_metrics():
+    """Запити історії цін: відповіді з локального кешу та довантаження з API"""
+    return price_history.get_stats()
+
+
+@app.get("/metrics/ticks")
+async def tick_metrics():
+    """Розмір сховища тіків: символи в пам'яті, записані тіки, витіснення"""
+    return tick_store.get_stats()
+
+
+@app.get("/metrics/sentiment")
+async def sentiment_metrics():
+    """Метрики кешу тональності та частка ескалацій словника до LLM"""
+    return {
+        "cache": sentiment_cache.get_stats(),
+        "lexicon": get_lexicon_stats()
+    }
+
+
+@app.post("/symbols/reload")
+async def reload_symbols():
+    """Перечитує довідник символів з індексу без перезапуску сервера"""
+    await asyncio.to_thread(refresh_symbols, True)
+    return symbol_master.stats()
+
+
 @app.get("/")
 async def root():
     """Базовий endpoint з інформацією про API"""
@@ -800,7 +1173,23 @@ async def root():
         "description": "GenAI агент для аналізу ринкової тональності",
         "endpoints": {
             "POST /run": "Запустити аналіз ринку",
+            "POST /run/stream": "Аналіз ринку з потоковою відповіддю (SSE)",
             "GET /news": "Отримати останні новини",
+            "POST /prices": "Ціни кількох активів одним запитом",
+            "WS /ws/prices": "Живі ціни за підпискою на символи",
+            "GET /history/{symbol}": "Історичні OHLCV свічки",
+            "POST /symbols/reload": "Перезавантажити довідник символів",
+            "GET /metrics/router": "Статистика швидкого маршруту",
+            "GET /metrics/news": "Метрики кешу новин",
+            "GET /metrics/rate-limits": "Ліміти та квоти провайдерів даних",
+            "GET /metrics/providers": "Стан і латентність провайдерів даних",
+            "GET /metrics/llm": "Метрики пулу OpenAI",
+            "GET /metrics/quotes": "Метрики кешу котирувань",
+            "GET /metrics/stream": "Стан потоку цін (WebSocket)",
+            "GET /metrics/ws": "Метрики розсилки живих цін",
+            "GET /metrics/ticks": "Метрики сховища тіків",
+            "GET /metrics/history": "Метрики кешу історії цін",
+            "GET /metrics/sentiment": "Метрики кешу та словника тональності",
             "GET /docs": "API документація"
         }
     }
@@ -0,0 +1,67 @@
+"""
+Кеш таргетованих новин по запитах (TTL + LRU)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+NEWS_QUERY_TTL = float(os.getenv("NEWS_QUERY_TTL", "300"))
+NEWS_QUERY_CACHE_MAX_SIZE = int(os.getenv("NEWS_QUERY_CACHE_MAX_SIZE", "256"))
+
+
+class NewsQueryCache:
+    """
+    Кеш результатів пошуку новин за нормалізованим ключем запиту.
+    Записи живуть ttl секунд, розмір обмежений max_size (LRU).
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[float, list]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: Hashable) -> Optional[list]:
+        """Повертає копію списку новин або None, якщо запису немає чи він застарів"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return list(entry[1])
+
+    def set(self, key: Hashable, news_items: list) -> None:
+        """Зберігає список новин"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, list(news_items))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Повертає лічильники кешу"""
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "size": size,
+            "max_size": self.max_size
+        }
+
+
+# Глобальний кеш таргетованих новин
+news_query_cache = NewsQueryCache(NEWS_QUERY_TTL, NEWS_QUERY_CACHE_MAX_SIZE)
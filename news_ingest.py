@@ -0,0 +1,284 @@
+"""
+Фоновий інжест новин: інкрементальне опитування джерел за курсорами
+та попередній розрахунок тональності
+"""
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from http_clients import http_client
+from news_pipeline import parse_published_at
+from news_store import NewsStore
+
+load_dotenv()
+
+NEWS_INGEST_ENABLED = os.getenv("NEWS_INGEST_ENABLED", "false").lower() in ("1", "true", "yes")
+# Інтервал опитування джерел (секунди)
+NEWS_INGEST_INTERVAL = float(os.getenv("NEWS_INGEST_INTERVAL", "300"))
+# Максимум сторінок NewsData.io за одне опитування
+NEWS_INGEST_MAX_PAGES = int(os.getenv("NEWS_INGEST_MAX_PAGES", "3"))
+# Скільки статей аналізувати за один прохід тональності
+NEWS_INGEST_SENTIMENT_BATCH = int(os.getenv("NEWS_INGEST_SENTIMENT_BATCH", "20"))
+
+
+def _timestamp(value: Any) -> float:
+    published = parse_published_at(value)
+    return published.timestamp() if published else 0.0
+
+
+class IngestSource(ABC):
+    """
+    Джерело для інжесту. Курсор - час публікації найновішої вже отриманої
+    статті (unix timestamp рядком); джерело повертає лише новіші статті.
+    """
+
+    name = ""
+
+    @abstractmethod
+    async def fetch_since(self, cursor: Optional[str]) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Args:
+            cursor: Курсор попереднього опитування (None - перше опитування)
+
+        Returns:
+            (нові статті, новий курсор)
+        """
+
+
+class NewsDataSource(IngestSource):
+    """NewsData.io: проходимо сторінки за nextPage, поки не дійдемо до вже відомих статей"""
+
+    name = "NewsData.io"
+    url = "https://newsdata.io/api/1/news"
+
+    def __init__(self, max_pages: int):
+        self.max_pages = max_pages
+
+    async def fetch_since(self, cursor: Optional[str]) -> Tuple[List[Dict], Optional[str]]:
+        api_key = os.getenv("NEWSDATA_API_KEY")
+        if not api_key:
+            return [], cursor
+
+        since = float(cursor) if cursor else None
+        params = {"apikey": api_key, "category": "business,top", "language": "en"}
+        items: List[Dict] = []
+        newest = since or 0.0
+
+        async with http_client(self.url) as client:
+            # Перше опитування - лише одна сторінка, далі - до max_pages
+            for _ in range(self.max_pages if since is not None else 1):
+                response = await client.get(self.url, params=params)
+                response.raise_for_status()
+                data = response.json()
+
+                reached_known = False
+                for article in data.get("results", []):
+                    if not (article.get("title") and article.get("description")):
+                        continue
+                    published_ts = _timestamp(article.get("pubDate"))
+                    # Статті з тим самим часом повторно відсіє сховище
+                    if since is not None and published_ts < since:
+                        reached_known = True
+                        continue
+                    newest = max(newest, published_ts)
+                    items.append({
+                        "title": article["title"],
+                        "description": article["description"],
+                        "source": self.name,
+                        "published_at": article.get("pubDate", ""),
+                        "url": article.get("link"),
+                        "full_text": f"{article['title']}. {article['description']}"
+                    })
+
+                next_page = data.get("nextPage")
+                if reached_known or not next_page:
+                    break
+                params["page"] = next_page
+
+        return items, str(newest) if newest else cursor
+
+
+class FinageNewsSource(IngestSource):
+    """Finage: курсор на боці API не підтримується, тож фільтруємо за датою локально"""
+
+    name = "Finage"
+    url = "https://api.finage.co.uk/news/forex"
+
+    def __init__(self, limit: int = 50):
+        self.limit = limit
+
+    async def fetch_since(self, cursor: Optional[str]) -> Tuple[List[Dict], Optional[str]]:
+        api_key = os.getenv("FINAGE_API_KEY")
+        if not api_key:
+            return [], cursor
+
+        since = float(cursor) if cursor else 0.0
+        async with http_client(self.url) as client:
+            response = await client.get(self.url, params={"apikey": api_key, "limit": str(self.limit)})
+            response.raise_for_status()
+            data = response.json()
+
+        items: List[Dict] = []
+        newest = since
+        articles = data if isinstance(data, list) else data.get("news", [])
+        for article in articles:
+            if not article.get("title"):
+                continue
+            published_ts = _timestamp(article.get("date"))
+            if published_ts < since:
+                continue
+            newest = max(newest, published_ts)
+            description = article.get("description", "") or article.get("summary", "")
+            items.append({
+                "title": article["title"],
+                "description": description,
+                "source": self.name,
+                "published_at": article.get("date", ""),
+                "url": article.get("url"),
+                "full_text": f"{article['title']}. {description}"
+            })
+
+        return items, str(newest) if newest else cursor
+
+
+class NewsIngestor:
+    """
+    Фоновий сервіс: опитує джерела за розкладом, зберігає нові статті
+    в NewsStore і розраховує для них тональність. Робота з SQLite (запис
+    статей з індексом FTS5, курсори, очищення) виконується в пулі потоків,
+    щоб не блокувати цикл подій, який обслуговує запити.
+    """
+
+    def __init__(
+        self,
+        store: NewsStore,
+        sources: List[IngestSource],
+        interval: float,
+        sentiment_analyzer: Optional[Callable[[List[str]], Awaitable[List[Dict]]]] = None,
+        sentiment_batch: int = NEWS_INGEST_SENTIMENT_BATCH,
+        entity_extractor: Optional[Callable[[str], List[str]]] = None
+    ):
+        """
+        Args:
+            store: Сховище статей
+            sources: Джерела новин
+            interval: Інтервал опитування (секунди)
+            sentiment_analyzer: Корутина, що аналізує список текстів (як analyze_multiple_news)
+            sentiment_batch: Скільки статей аналізувати за прохід
+            entity_extractor: Функція, що знаходить тикери в тексті статті (для пошукового індексу)
+        """
+        self.store = store
+        self.sources = sources
+        self.interval = interval
+        self.sentiment_analyzer = sentiment_analyzer
+        self.sentiment_batch = sentiment_batch
+        self.entity_extractor = entity_extractor
+        self._sentiment_task: Optional[asyncio.Task] = None
+        self.stats = {"polls": 0, "poll_errors": 0, "ingested": 0, "sentiment_computed": 0, "sentiment_errors": 0}
+
+    async def poll_source(self, source: IngestSource) -> int:
+        """Опитує одне джерело від збереженого курсора, повертає кількість нових статей"""
+        cursor = await asyncio.to_thread(self.store.get_cursor, source.name)
+        items, new_cursor = await source.fetch_since(cursor)
+        added = await asyncio.to_thread(self._store_items, items) if items else 0
+        if new_cursor and new_cursor != cursor:
+            await asyncio.to_thread(self.store.set_cursor, source.name, new_cursor)
+        return added
+
+    def _store_items(self, items: List[Dict]) -> int:
+        """Знаходить тикери в статтях і зберігає їх (блокує - виконується в пулі потоків)"""
+        if self.entity_extractor is not None:
+            for item in items:
+                item["entities"] = self.entity_extractor(item["full_text"])
+        return self.store.add_articles(items)
+
+    async def poll_once(self) -> int:
+        """Опитує всі джерела паралельно"""
+        self.stats["polls"] += 1
+        results = await asyncio.gather(
+            *(self.poll_source(source) for source in self.sources), return_exceptions=True
+        )
+
+        added = 0
+        succeeded = False
+        for source, result in zip(self.sources, results):
+            if isinstance(result, Exception):
+                self.stats["poll_errors"] += 1
+                print(f"Помилка інжесту новин з {source.name}: {result}")
+                continue
+            succeeded = True
+            added += result
+
+        if succeeded:
+            self.store.mark_synced()
+        self.stats["ingested"] += added
+        return added
+
+    async def precompute_sentiment(self) -> int:
+        """Розраховує тональність для статей, де її ще немає"""
+        if self.sentiment_analyzer is None:
+            return 0
+
+        computed = 0
+        while True:
+            pending = await asyncio.to_thread(self.store.pending_sentiment, self.sentiment_batch)
+            if not pending:
+                return computed
+            try:
+                results = await self.sentiment_analyzer([text for _, text in pending])
+            except Exception as e:
+                self.stats["sentiment_errors"] += 1
+                print(f"Помилка попереднього аналізу тональності: {e}")
+                return computed
+            # Результати-заглушки після помилок (confidence 0) не зберігаємо - спробуємо наступного циклу
+            valid = [
+                (article, result) for (article, _), result in zip(pending, results)
+                if result and result.get("confidence", 0) > 0
+            ]
+            await asyncio.to_thread(self.store.set_sentiments, valid)
+            computed += len(valid)
+            self.stats["sentiment_computed"] += len(valid)
+            if len(valid) < len(pending):
+                return computed
+
+    def _schedule_sentiment(self) -> None:
+        # Тональність рахується окремою задачею і не затримує наступне опитування
+        if self._sentiment_task is None or self._sentiment_task.done():
+            self._sentiment_task = asyncio.create_task(self.precompute_sentiment())
+
+    def is_fresh(self, max_age: Optional[float] = None) -> bool:
+        """Чи було успішне опитування нещодавно (за замовчуванням - протягом трьох інтервалів)"""
+        age = self.store.sync_age()
+        max_age = max_age if max_age is not None else self.interval * 3
+        return age is not None and age < max_age
+
+    async def run(self) -> None:
+        """Фоновий цикл опитування"""
+        try:
+            while True:
+                try:
+                    added = await self.poll_once()
+                    if added:
+                        print(f"📥 Інжест новин: {added} нових статей")
+                    await asyncio.to_thread(self.store.prune)
+                    self._schedule_sentiment()
+                except Exception as e:
+                    # Помилка одного циклу не зупиняє сервіс
+                    print(f"Помилка циклу інжесту новин: {e}")
+                await asyncio.sleep(self.interval)
+        finally:
+            if self._sentiment_task is not None:
+                self._sentiment_task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Лічильники інжесту та стан сховища"""
+        age = self.store.sync_age()
+        return {
+            **self.stats,
+            **self.store.get_stats(),
+            "enabled": NEWS_INGEST_ENABLED,
+            "last_success_age": round(age, 1) if age is not None else None
+        }
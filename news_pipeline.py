@@ -0,0 +1,174 @@
+"""
+Агрегація новин з кількох джерел: дедуплікація (MinHash) та ранжування
+"""
+import asyncio
+import math
+import os
+import random
+import re
+import zlib
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Скільки новин запитувати в кожного джерела (з запасом під дедуплікацію)
+NEWS_PROVIDER_FETCH_SIZE = int(os.getenv("NEWS_PROVIDER_FETCH_SIZE", "10"))
+# Скільки новин після дедуплікації та ранжування передається далі (в LLM)
+NEWS_AGGREGATE_LIMIT = int(os.getenv("NEWS_AGGREGATE_LIMIT", "5"))
+# Новини зі схожістю від цього порогу вважаються дублікатами
+NEWS_DUPLICATE_THRESHOLD = float(os.getenv("NEWS_DUPLICATE_THRESHOLD", "0.6"))
+
+# Параметри MinHash
+MINHASH_PERMUTATIONS = 64
+SHINGLE_SIZE = 3
+
+# Період напіврозпаду "свіжості" новини (години)
+RECENCY_HALF_LIFE_HOURS = 12.0
+RECENCY_WEIGHT = 0.7
+SOURCE_WEIGHT = 0.3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(42)
+_HASH_PARAMS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class NewsProvider:
+    """
+    Джерело новин для агрегатора.
+
+    Args:
+        name: Назва джерела
+        fetcher: Корутина-фабрика, що повертає список новин у форматі
+            {"title", "description", "source", "published_at", "full_text"}
+        weight: Якість джерела від 0 до 1 (впливає на ранжування)
+    """
+
+    def __init__(self, name: str, fetcher: Callable[[], Awaitable[List[Dict]]], weight: float = 0.5):
+        self.name = name
+        self.fetcher = fetcher
+        self.weight = weight
+
+    async def fetch(self) -> List[Dict]:
+        return await self.fetcher()
+
+
+def _shingles(text: str) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> List[int]:
+    """Обчислює MinHash підпис тексту за словесними шинглами"""
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in _shingles(text)]
+    if not hashes:
+        return [_MAX_HASH] * MINHASH_PERMUTATIONS
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _HASH_PARAMS
+    ]
+
+
+def estimate_similarity(signature_a: List[int], signature_b: List[int]) -> float:
+    """Оцінка схожості Жаккара за двома MinHash підписами"""
+    matches = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+    return matches / len(signature_a)
+
+
+def parse_published_at(value) -> Optional[datetime]:
+    """Розбирає дату публікації (NewsData: '2024-01-15 10:30:00', ISO 8601 або unix timestamp)"""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.isdigit()):
+        timestamp = float(value)
+        # Finage може повертати мілісекунди
+        if timestamp > 1e12:
+            timestamp /= 1000
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    text = str(value).strip().replace("Z", "+00:00")
+    for parser in (datetime.fromisoformat, lambda v: datetime.strptime(v, "%Y-%m-%d %H:%M:%S")):
+        try:
+            parsed = parser(text)
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+
+def _recency_score(published_at, now: datetime) -> float:
+    published = parse_published_at(published_at)
+    if published is None:
+        return 0.0
+    age_hours = max((now - published).total_seconds() / 3600, 0.0)
+    return math.pow(0.5, age_hours / RECENCY_HALF_LIFE_HOURS)
+
+
+def rank_news(news_items: List[Dict], source_weights: Optional[Dict[str, float]] = None, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Прибирає майже-дублікати та сортує новини за свіжістю і якістю джерела
+
+    Args:
+        news_items: Список новин (можуть бути з різних джерел)
+        source_weights: Вага джерела за назвою (поле "source")
+        limit: Скільки новин повернути
+
+    Returns:
+        Відсортований список унікальних новин
+    """
+    source_weights = source_weights or {}
+    now = datetime.now(timezone.utc)
+
+    scored = []
+    for item in news_items:
+        score = (
+            RECENCY_WEIGHT * _recency_score(item.get("published_at"), now)
+            + SOURCE_WEIGHT * source_weights.get(item.get("source"), 0.5)
+        )
+        scored.append((score, item))
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+
+    # Жадібно залишаємо найкращу новину з кожної групи дублікатів
+    kept: List[Dict] = []
+    kept_signatures: List[List[int]] = []
+    for _, item in scored:
+        signature = minhash_signature(item.get("full_text") or item.get("title", ""))
+        if any(estimate_similarity(signature, other) >= NEWS_DUPLICATE_THRESHOLD for other in kept_signatures):
+            continue
+        kept.append(item)
+        kept_signatures.append(signature)
+        if limit is not None and len(kept) >= limit:
+            break
+    return kept
+
+
+async def aggregate_news(providers: List[NewsProvider], limit: int) -> List[Dict]:
+    """
+    Збирає новини з усіх джерел паралельно, прибирає дублікати та ранжує
+
+    Args:
+        providers: Джерела новин
+        limit: Скільки новин повернути
+
+    Returns:
+        Список найкращих унікальних новин
+    """
+    results = await asyncio.gather(*(provider.fetch() for provider in providers), return_exceptions=True)
+
+    all_news = []
+    for provider, result in zip(providers, results):
+        if isinstance(result, Exception):
+            print(f"Помилка джерела новин {provider.name}: {result}")
+            continue
+        all_news.extend(result)
+
+    source_weights = {provider.name: provider.weight for provider in providers}
+    return rank_news(all_news, source_weights, limit)
@@ -0,0 +1,280 @@
+"""
+Локальне сховище новин (SQLite): статті, попередньо розрахована тональність та курсори джерел
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from news_pipeline import parse_published_at
+
+load_dotenv()
+
+NEWS_STORE_PATH = os.getenv("NEWS_STORE_PATH", "news_store.sqlite3")
+# Скільки днів зберігати статті
+NEWS_STORE_RETENTION_DAYS = float(os.getenv("NEWS_STORE_RETENTION_DAYS", "7"))
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS articles (
+        id TEXT PRIMARY KEY,
+        source TEXT NOT NULL,
+        title TEXT NOT NULL,
+        description TEXT NOT NULL,
+        full_text TEXT NOT NULL,
+        url TEXT,
+        published_at TEXT NOT NULL,
+        published_ts REAL NOT NULL,
+        ingested_at REAL NOT NULL,
+        sentiment TEXT,
+        entities TEXT NOT NULL DEFAULT ''
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published_ts)",
+    "CREATE INDEX IF NOT EXISTS idx_articles_pending ON articles(ingested_at) WHERE sentiment IS NULL",
+    """CREATE TABLE IF NOT EXISTS ingest_cursors (
+        provider TEXT PRIMARY KEY,
+        cursor TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    )""",
+)
+
+# Повнотекстовий індекс (FTS5) по заголовку, опису та тикерам статті.
+# Індекс синхронізується з таблицею articles тригерами.
+_FTS_SCHEMA = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+        title, description, entities, content='articles', content_rowid='rowid'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts(rowid, title, description, entities)
+        VALUES (new.rowid, new.title, new.description, new.entities);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, description, entities)
+        VALUES ('delete', old.rowid, old.title, old.description, old.entities);
+    END""",
+)
+# Ваги колонок для BM25: title, description, entities
+_BM25_WEIGHTS = (10.0, 3.0, 5.0)
+
+_ARTICLE_COLUMNS = "id, source, title, description, full_text, url, published_at, sentiment"
+
+
+def _fts_phrase(term: str) -> str:
+    """Екранує термін як фразу FTS5"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def article_id(item: Dict) -> str:
+    """Стабільний ідентифікатор статті: за посиланням, інакше за джерелом і заголовком"""
+    key = item.get("url") or f"{item.get('source', '')}\n{item.get('title', '').strip().lower()}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _row_to_item(row: tuple) -> Dict:
+    item = dict(zip(("id", "source", "title", "description", "full_text", "url", "published_at"), row[:7]))
+    if row[7]:
+        item["sentiment"] = json.loads(row[7])
+    return item
+
+
+class NewsStore:
+    """
+    Сховище статей, зібраних фоновим інжестом.
+
+    Статті ідентифікуються за посиланням (повтори ігноруються), індексовані
+    за часом публікації; тональність дописується пізніше окремим проходом.
+    """
+
+    def __init__(self, path: str, retention_days: float):
+        self.path = path
+        self.retention = retention_days * 86400
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last_sync: Optional[float] = None
+        # False, якщо SQLite зібрано без FTS5 - тоді пошук завжди йде до API
+        self.fts_enabled = True
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(articles)")}
+            if "entities" not in columns:
+                conn.execute("ALTER TABLE articles ADD COLUMN entities TEXT NOT NULL DEFAULT ''")
+            self._init_fts(conn)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _init_fts(self, conn: sqlite3.Connection) -> None:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_fts'"
+        ).fetchone()
+        try:
+            for statement in _FTS_SCHEMA:
+                conn.execute(statement)
+        except sqlite3.OperationalError as e:
+            self.fts_enabled = False
+            print(f"⚠️ FTS5 недоступний, локальний пошук новин вимкнено: {e}")
+            return
+        if not exists:
+            # Індексуємо статті, збережені до появи індексу
+            conn.execute("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+
+    def add_articles(self, items: List[Dict]) -> int:
+        """
+        Зберігає нові статті (вже відомі пропускаються)
+
+        Returns:
+            Кількість доданих статей
+        """
+        now = time.time()
+        rows = []
+        for item in items:
+            published = parse_published_at(item.get("published_at"))
+            rows.append((
+                article_id(item),
+                item.get("source", ""),
+                item["title"],
+                item.get("description", ""),
+                item.get("full_text") or item["title"],
+                item.get("url"),
+                str(item.get("published_at", "")),
+                published.timestamp() if published else now,
+                now,
+                " ".join(item.get("entities", [])),
+            ))
+        with self._lock:
+            conn = self._connection()
+            # rowcount не враховує зміни, зроблені тригерами (індекс FTS)
+            added = conn.executemany(
+                "INSERT OR IGNORE INTO articles (id, source, title, description, full_text, url, "
+                "published_at, published_ts, ingested_at, entities) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            ).rowcount
+            conn.commit()
+            return added
+
+    def recent(self, limit: int, since: Optional[float] = None) -> List[Dict]:
+        """
+        Повертає найсвіжіші статті
+
+        Args:
+            limit: Максимум статей
+            since: Лише статті, опубліковані після цього часу (unix timestamp)
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {_ARTICLE_COLUMNS} FROM articles WHERE published_ts >= ? "
+                "ORDER BY published_ts DESC LIMIT ?",
+                (since or 0.0, limit)
+            ).fetchall()
+        return [_row_to_item(row) for row in rows]
+
+    def search(self, terms: List[str], limit: int, since: Optional[float] = None) -> List[Dict]:
+        """
+        Повнотекстовий пошук статей (BM25) за будь-яким з термінів
+
+        Args:
+            terms: Пошукові терміни (слова запиту, тикери)
+            limit: Максимум статей
+            since: Лише статті, опубліковані після цього часу (unix timestamp)
+
+        Returns:
+            Статті від найрелевантніших
+        """
+        terms = [term for term in terms if term.strip()]
+        if not self.fts_enabled or not terms:
+            return []
+        query = " OR ".join(_fts_phrase(term) for term in terms)
+        columns = ", ".join(f"a.{column.strip()}" for column in _ARTICLE_COLUMNS.split(","))
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {columns} FROM articles_fts JOIN articles a ON a.rowid = articles_fts.rowid "
+                "WHERE articles_fts MATCH ? AND a.published_ts >= ? "
+                "ORDER BY bm25(articles_fts, ?, ?, ?) LIMIT ?",
+                (query, since or 0.0, *_BM25_WEIGHTS, limit)
+            ).fetchall()
+        return [_row_to_item(row) for row in rows]
+
+    def mark_synced(self) -> None:
+        """Позначає успішну синхронізацію з джерелами (викликає інжест)"""
+        self._last_sync = time.monotonic()
+
+    def sync_age(self) -> Optional[float]:
+        """Скільки секунд минуло від останньої синхронізації (None - не було)"""
+        if self._last_sync is None:
+            return None
+        return time.monotonic() - self._last_sync
+
+    def pending_sentiment(self, limit: int) -> List[Tuple[str, str]]:
+        """Повертає (id, текст) статей без розрахованої тональності, найновіші першими"""
+        with self._lock:
+            return self._connection().execute(
+                "SELECT id, full_text FROM articles WHERE sentiment IS NULL ORDER BY ingested_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+    def set_sentiments(self, results: List[Tuple[str, Dict]]) -> None:
+        """Зберігає результати аналізу тональності (id, результат)"""
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "UPDATE articles SET sentiment = ? WHERE id = ?",
+                ((json.dumps(result, ensure_ascii=False), article) for article, result in results)
+            )
+            conn.commit()
+
+    def get_cursor(self, provider: str) -> Optional[str]:
+        """Повертає збережений курсор джерела"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT cursor FROM ingest_cursors WHERE provider = ?", (provider,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, provider: str, cursor: str) -> None:
+        """Зберігає курсор джерела"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO ingest_cursors (provider, cursor, updated_at) VALUES (?, ?, ?)",
+                (provider, cursor, time.time())
+            )
+            conn.commit()
+
+    def prune(self) -> int:
+        """Видаляє статті, старші за термін зберігання"""
+        with self._lock:
+            conn = self._connection()
+            deleted = conn.execute(
+                "DELETE FROM articles WHERE published_ts < ?", (time.time() - self.retention,)
+            ).rowcount
+            conn.commit()
+        return deleted
+
+    def get_stats(self) -> Dict[str, int]:
+        """Кількість статей та статей без тональності"""
+        with self._lock:
+            (total, pending) = self._connection().execute(
+                "SELECT COUNT(*), COUNT(*) - COUNT(sentiment) FROM articles"
+            ).fetchone()
+        return {"articles": total, "pending_sentiment": pending}
+
+    def close(self) -> None:
+        """Закриває з'єднання з базою"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Глобальне сховище новин
+news_store = NewsStore(NEWS_STORE_PATH, NEWS_STORE_RETENTION_DAYS)
@@ -0,0 +1,334 @@
+"""
+Історичні OHLCV свічки: локальний колонковий кеш на диску (mmap) та
+інкрементальне довантаження лише відсутніх діапазонів
+"""
+import asyncio
+import json
+import mmap
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from quote_cache import normalize_symbol
+
+load_dotenv()
+
+HISTORY_CACHE_DIR = os.getenv("HISTORY_CACHE_DIR", "history_cache")
+# Максимум свічок в одному запиті до API (ліміт Twelve Data /time_series - 5000)
+HISTORY_MAX_BARS_PER_REQUEST = int(os.getenv("HISTORY_MAX_BARS_PER_REQUEST", "5000"))
+# Максимум свічок в одному запиті історії (обмежує кількість звернень до API на запит)
+HISTORY_MAX_BARS = int(os.getenv("HISTORY_MAX_BARS", "5000"))
+# Скільки секунд поточна (незакрита) свічка вважається свіжою, перш ніж її перезапитати
+HISTORY_TAIL_TTL = float(os.getenv("HISTORY_TAIL_TTL", "60"))
+# На Windows файл з відкритим відображенням не можна замінити - колонки читаються копією
+HISTORY_USE_MMAP = os.name != "nt"
+
+# Інтервали свічок (формат Twelve Data) -> тривалість у секундах
+HISTORY_INTERVALS = {
+    "1min": 60,
+    "5min": 300,
+    "15min": 900,
+    "30min": 1800,
+    "1h": 3600,
+    "4h": 14400,
+    "1day": 86400,
+    "1week": 604800,
+}
+
+# Колонки: назва -> код типу array (час - цілі секунди, ціни та обсяг - double)
+COLUMNS = (("ts", "q"), ("open", "d"), ("high", "d"), ("low", "d"), ("close", "d"), ("volume", "d"))
+
+
+class HistoryFetchError(Exception):
+    """Провайдер не віддав свічки (діапазон не позначається завантаженим)"""
+
+
+# Фабрика завантаження: (тикер, інтервал, початок, кінець) -> список свічок;
+# порожній список - даних за діапазон немає, помилка - HistoryFetchError
+BarFetcher = Callable[[str, str, int, int], Awaitable[List[Dict[str, float]]]]
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Об'єднує діапазони, що перетинаються або стикуються"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(covered: List[Tuple[int, int]], start: int, end: int) -> List[Tuple[int, int]]:
+    """
+    Частини [start, end), яких немає серед завантажених діапазонів
+
+    Args:
+        covered: Відсортовані завантажені діапазони [start, end)
+        start: Початок запиту (unix timestamp)
+        end: Кінець запиту (unix timestamp, не включно)
+    """
+    gaps = []
+    cursor = start
+    for range_start, range_end in covered:
+        if range_end <= cursor:
+            continue
+        if range_start >= end:
+            break
+        if range_start > cursor:
+            gaps.append((cursor, range_start))
+        cursor = max(cursor, range_end)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class Bars:
+    """
+    Свічки в діапазоні: колонки - memoryview на відображені в пам'ять файли
+    (читання без копіювання). Дійсні, доки існує об'єкт.
+    """
+
+    def __init__(self, columns: Dict[str, memoryview]):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns["ts"])
+
+    def __getattr__(self, name: str) -> memoryview:
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def to_rows(self) -> List[Dict[str, float]]:
+        """Свічки як список словників (для JSON відповідей)"""
+        names = [name for name, _ in COLUMNS]
+        return [dict(zip(names, values)) for values in zip(*(self.columns[name] for name in names))]
+
+
+class _Series:
+    """Відображені в пам'ять колонки однієї серії (символ + інтервал)"""
+
+    def __init__(self, directory: str):
+        self.columns: Dict[str, memoryview] = {}
+        for name, typecode in COLUMNS:
+            path = os.path.join(directory, f"{name}.col")
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                self.columns[name] = memoryview(array(typecode))
+                continue
+            with open(path, "rb") as f:
+                if not HISTORY_USE_MMAP:
+                    values = array(typecode)
+                    values.frombytes(f.read())
+                    self.columns[name] = memoryview(values)
+                    continue
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # Відображення закривається збирачем сміття разом з останнім memoryview
+            self.columns[name] = memoryview(mapped).cast(typecode)
+
+    def slice(self, start: int, end: int) -> Bars:
+        ts = self.columns["ts"]
+        lo, hi = bisect_left(ts, start), bisect_left(ts, end)
+        return Bars({name: column[lo:hi] for name, column in self.columns.items()})
+
+
+class HistoryStore:
+    """
+    Колонковий кеш свічок на диску.
+
+    Кожна серія - каталог з файлами колонок (сирі масиви фіксованої ширини,
+    відсортовані за часом) та meta.json зі списком завантажених діапазонів.
+    Читання - бінарний пошук по відображеній колонці часу і зрізи memoryview.
+    Свічки після останньої дописуються в кінець файлів; інакше зливається лише
+    зачеплений діапазон, а решта колонки копіюється байтами і файл атомарно
+    замінюється (відкриті відображення старого файлу лишаються дійсними).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.directory, normalize_symbol(symbol), interval)
+
+    def _load(self, symbol: str, interval: str) -> _Series:
+        key = (normalize_symbol(symbol), interval)
+        series = self._series.get(key)
+        if series is None:
+            series = _Series(self._path(symbol, interval))
+            self._series[key] = series
+        return series
+
+    def coverage(self, symbol: str, interval: str) -> List[Tuple[int, int]]:
+        """Завантажені діапазони серії [start, end)"""
+        path = os.path.join(self._path(symbol, interval), "meta.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return [tuple(item) for item in json.load(f)["covered"]]
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def read(self, symbol: str, interval: str, start: int, end: int) -> Bars:
+        """
+        Свічки з часом відкриття в [start, end)
+
+        Args:
+            symbol: Тикер
+            interval: Інтервал (1min ... 1week)
+            start: Початок (unix timestamp)
+            end: Кінець (unix timestamp, не включно)
+        """
+        with self._lock:
+            return self._load(symbol, interval).slice(start, end)
+
+    def write(self, symbol: str, interval: str, bars: List[Dict[str, float]], covered: Tuple[int, int]) -> int:
+        """
+        Додає свічки (наявні з тим самим часом замінюються) і позначає діапазон завантаженим
+
+        Args:
+            symbol: Тикер
+            interval: Інтервал
+            bars: Свічки {ts, open, high, low, close, volume}
+            covered: Діапазон [start, end), повністю завантажений з API
+
+        Returns:
+            Кількість свічок у серії
+        """
+        directory = self._path(symbol, interval)
+        incoming = {int(bar["ts"]): bar for bar in bars}
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            columns = self._load(symbol, interval).columns
+            ts = columns["ts"]
+            if incoming:
+                lo = bisect_left(ts, min(incoming))
+                hi = bisect_right(ts, max(incoming))
+                if lo == len(ts):
+                    # Нові свічки після останньої - дописуємо в кінець файлів
+                    self._append(directory, [incoming[t] for t in sorted(incoming)])
+                else:
+                    self._replace_range(directory, columns, lo, hi, incoming)
+
+            ranges = self.coverage(symbol, interval)
+            if covered[1] > covered[0]:
+                ranges = _merge_ranges(ranges + [covered])
+            tmp_path = os.path.join(directory, "meta.json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"covered": ranges}, f)
+            os.replace(tmp_path, os.path.join(directory, "meta.json"))
+
+            self._series.pop((normalize_symbol(symbol), interval), None)
+            return len(self._load(symbol, interval).columns["ts"])
+
+    @staticmethod
+    def _column_values(typecode: str, name: str, bars: List[Dict[str, float]]) -> array:
+        if typecode == "q":
+            return array(typecode, (int(bar[name]) for bar in bars))
+        return array(typecode, (float(bar.get(name) or 0.0) for bar in bars))
+
+    def _append(self, directory: str, bars: List[Dict[str, float]]) -> None:
+        for name, typecode in COLUMNS:
+            with open(os.path.join(directory, f"{name}.col"), "ab") as f:
+                self._column_values(typecode, name, bars).tofile(f)
+
+    def _replace_range(
+        self,
+        directory: str,
+        columns: Dict[str, memoryview],
+        lo: int,
+        hi: int,
+        incoming: Dict[int, Dict[str, float]]
+    ) -> None:
+        """Зливає свічки [lo, hi) з новими; решта колонок копіюється без розбору"""
+        affected = Bars({name: column[lo:hi] for name, column in columns.items()}).to_rows()
+        merged = {int(row["ts"]): row for row in affected}
+        merged.update(incoming)
+        ordered = [merged[t] for t in sorted(merged)]
+        for name, typecode in COLUMNS:
+            column = columns[name]
+            tmp_path = os.path.join(directory, f"{name}.col.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(column[:lo])
+                self._column_values(typecode, name, ordered).tofile(f)
+                f.write(column[hi:])
+            os.replace(tmp_path, os.path.join(directory, f"{name}.col"))
+
+
+class PriceHistory:
+    """
+    Історія цін: відповідь з локального кешу, до API - лише за відсутні діапазони.
+    Одночасні запити однієї серії чекають на одне довантаження.
+    """
+
+    def __init__(self, store: HistoryStore, fetcher: BarFetcher):
+        self.store = store
+        self.fetcher = fetcher
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        # Коли востаннє запитувалась незакрита свічка серії (time.monotonic)
+        self._tail_fetched: Dict[Tuple[str, str], float] = {}
+        self.stats = {"requests": 0, "local": 0, "fetches": 0, "bars_fetched": 0}
+
+    async def get_bars(self, symbol: str, interval: str, start: int, end: Optional[int] = None) -> Bars:
+        """
+        Свічки символу за діапазон
+
+        Args:
+            symbol: Тикер
+            interval: Інтервал (ключ HISTORY_INTERVALS)
+            start: Початок (unix timestamp)
+            end: Кінець (unix timestamp, не включно), за замовчуванням - зараз
+
+        Raises:
+            ValueError: Невідомий інтервал або діапазон довший за HISTORY_MAX_BARS свічок
+            HistoryFetchError: Відсутній діапазон не вдалося завантажити
+        """
+        step = HISTORY_INTERVALS.get(interval)
+        if step is None:
+            raise ValueError(f"Невідомий інтервал: {interval}. Доступні: {', '.join(HISTORY_INTERVALS)}")
+        now = int(time.time())
+        end = min(end if end is not None else now, now)
+        if (end - start) > step * HISTORY_MAX_BARS:
+            raise ValueError(f"Діапазон задовгий: максимум {HISTORY_MAX_BARS} свічок інтервалу {interval}")
+        # Поточна свічка ще формується і може починатися не на межі, кратній step
+        # (годинні свічки акцій о :30, тижневі - з понеділка), тож завантаженим
+        # вважається лише діапазон до початку попереднього кроку
+        closed_until = now - now % step - step
+        self.stats["requests"] += 1
+
+        key = (normalize_symbol(symbol), interval)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            gaps = missing_ranges(self.store.coverage(symbol, interval), start, end)
+            tail_age = time.monotonic() - self._tail_fetched.get(key, float("-inf"))
+            if gaps and gaps[-1][0] >= closed_until and tail_age < HISTORY_TAIL_TTL:
+                # Бракує лише нещодавно запитаної незакритої свічки
+                gaps.pop()
+            if not gaps:
+                self.stats["local"] += 1
+            for gap_start, gap_end in gaps:
+                await self._fetch_range(symbol, interval, step, gap_start, gap_end, closed_until)
+                if gap_end > closed_until:
+                    self._tail_fetched[key] = time.monotonic()
+        return await asyncio.to_thread(self.store.read, symbol, interval, start, end)
+
+    async def _fetch_range(self, symbol: str, interval: str, step: int, start: int, end: int, closed_until: int) -> None:
+        chunk = step * HISTORY_MAX_BARS_PER_REQUEST
+        for chunk_start in range(start, end, chunk):
+            chunk_end = min(chunk_start + chunk, end)
+            self.stats["fetches"] += 1
+            bars = await self.fetcher(symbol, interval, chunk_start, chunk_end)
+            self.stats["bars_fetched"] += len(bars)
+            covered_end = max(min(chunk_end, closed_until), chunk_start)
+            if bars or covered_end > chunk_start:
+                await asyncio.to_thread(self.store.write, symbol, interval, bars, (chunk_start, covered_end))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Лічильники запитів історії"""
+        return dict(self.stats)
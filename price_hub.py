@@ -0,0 +1,208 @@
+"""
+Розсилка живих котирувань підписникам WebSocket: один опитувач на символ,
+об'єднання оновлень та обмеження частоти відправки для кожного клієнта
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Set, Tuple
+
+from dotenv import load_dotenv
+
+from quote_cache import normalize_symbol
+
+load_dotenv()
+
+# Як часто опитувач символу читає ціну (секунди); до API запит іде лише після TTL кешу котирувань
+PRICE_HUB_POLL_INTERVAL = float(os.getenv("PRICE_HUB_POLL_INTERVAL", "1.0"))
+# Мінімальний інтервал між повідомленнями одному клієнту (секунди)
+PRICE_WS_PUSH_INTERVAL = float(os.getenv("PRICE_WS_PUSH_INTERVAL", "0.5"))
+# Максимум символів у підписці одного клієнта
+PRICE_WS_MAX_SYMBOLS = int(os.getenv("PRICE_WS_MAX_SYMBOLS", "50"))
+# Максимум символів, що опитуються одночасно (для всіх клієнтів разом)
+PRICE_HUB_MAX_SYMBOLS = int(os.getenv("PRICE_HUB_MAX_SYMBOLS", "200"))
+# Максимальна затримка опитування символу, що повертає помилки (секунди)
+PRICE_HUB_MAX_BACKOFF = float(os.getenv("PRICE_HUB_MAX_BACKOFF", "60"))
+
+
+class PriceSubscriber:
+    """
+    Клієнт розсилки.
+
+    Для кожного символу зберігається лише останнє непередане котирування,
+    тож повільний клієнт отримує найсвіжіші ціни, а не чергу застарілих.
+    Оновлення відправляються одним повідомленням не частіше за push_interval.
+    """
+
+    def __init__(self, send: Callable[[Dict[str, Any]], Awaitable[None]], push_interval: float = PRICE_WS_PUSH_INTERVAL):
+        """
+        Args:
+            send: Корутина відправки повідомлення клієнту (наприклад, websocket.send_json)
+            push_interval: Мінімальний інтервал між повідомленнями (секунди)
+        """
+        self.send = send
+        self.push_interval = push_interval
+        self.symbols: Set[str] = set()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, symbol: str, quote: Dict[str, Any]) -> None:
+        """Ставить котирування на відправку (замінює ще не відправлене)"""
+        self._pending[symbol] = quote
+        self._ready.set()
+
+    async def run(self) -> None:
+        """Цикл відправки оновлень клієнту"""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            batch, self._pending = self._pending, {}
+            if batch:
+                await self.send({"type": "prices", "data": batch})
+            await asyncio.sleep(self.push_interval)
+
+
+class PriceHub:
+    """
+    Реєстр підписок на ціни.
+
+    Для символу, на який підписаний хоча б один клієнт, працює рівно один
+    опитувач; змінені котирування розсилаються всім підписникам символу.
+    Коли останній підписник відписується, опитувач зупиняється. Опитуються
+    лише відомі символи (validator), не більше max_symbols одночасно; якщо
+    символ повертає помилки, інтервал його опитування подвоюється.
+    """
+
+    def __init__(
+        self,
+        fetcher: Callable[[str], Awaitable[Dict[str, Any]]],
+        validator: Callable[[str], bool],
+        poll_interval: float = PRICE_HUB_POLL_INTERVAL,
+        max_symbols: int = PRICE_HUB_MAX_SYMBOLS
+    ):
+        """
+        Args:
+            fetcher: Корутина отримання ціни символу (get_price)
+            validator: Перевірка, що символ відомий (інакше підписка відхиляється)
+            poll_interval: Інтервал опитування (секунди)
+            max_symbols: Максимум символів, що опитуються одночасно
+        """
+        self.fetcher = fetcher
+        self.validator = validator
+        self.poll_interval = poll_interval
+        self.max_symbols = max_symbols
+        self._subscribers: Dict[str, Set[PriceSubscriber]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"polls": 0, "poll_errors": 0, "updates": 0, "deliveries": 0, "rejected": 0}
+
+    def subscribe(self, subscriber: PriceSubscriber, symbols: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Підписує клієнта на символи (в межах PRICE_WS_MAX_SYMBOLS)
+
+        Returns:
+            (символи, на які клієнт підписаний після виклику; відхилені символи)
+        """
+        rejected = []
+        for raw_symbol in symbols:
+            symbol = str(raw_symbol).strip().upper()
+            if not symbol or symbol in subscriber.symbols:
+                continue
+            key = normalize_symbol(symbol)
+            if (
+                len(subscriber.symbols) >= PRICE_WS_MAX_SYMBOLS
+                or not self.validator(symbol)
+                or (key not in self._pollers and len(self._pollers) >= self.max_symbols)
+            ):
+                rejected.append(symbol)
+                self.stats["rejected"] += 1
+                continue
+            subscriber.symbols.add(symbol)
+            self._subscribers.setdefault(key, set()).add(subscriber)
+            if key in self._last:
+                # Новий підписник одразу отримує останню відому ціну
+                subscriber.offer(symbol, self._last[key])
+            if key not in self._pollers:
+                self._pollers[key] = asyncio.create_task(self._poll(key, symbol))
+        return sorted(subscriber.symbols), rejected
+
+    def unsubscribe(self, subscriber: PriceSubscriber, symbols: Iterable[str]) -> List[str]:
+        """
+        Відписує клієнта від символів
+
+        Returns:
+            Символи, на які клієнт лишається підписаним
+        """
+        for raw_symbol in symbols:
+            symbol = str(raw_symbol).strip().upper()
+            if symbol not in subscriber.symbols:
+                continue
+            subscriber.symbols.discard(symbol)
+            key = normalize_symbol(symbol)
+            if any(normalize_symbol(other) == key for other in subscriber.symbols):
+                # Клієнт підписаний на той самий символ під іншим написанням (BTC/USD і BTCUSD)
+                continue
+            watchers = self._subscribers.get(key)
+            if watchers is not None:
+                watchers.discard(subscriber)
+                if not watchers:
+                    self._stop(key)
+        return sorted(subscriber.symbols)
+
+    def remove(self, subscriber: PriceSubscriber) -> None:
+        """Прибирає всі підписки клієнта (після від'єднання)"""
+        self.unsubscribe(subscriber, list(subscriber.symbols))
+
+    def _stop(self, key: str) -> None:
+        self._subscribers.pop(key, None)
+        self._last.pop(key, None)
+        poller = self._pollers.pop(key, None)
+        if poller is not None:
+            poller.cancel()
+
+    def publish(self, key: str, quote: Dict[str, Any]) -> None:
+        """Розсилає котирування підписникам, якщо воно змінилося"""
+        last = self._last.get(key)
+        if last is not None and last.get("price") == quote.get("price") and last.get("error") == quote.get("error"):
+            return
+        self._last[key] = quote
+        self.stats["updates"] += 1
+        for subscriber in self._subscribers.get(key, ()):
+            # Клієнт отримує котирування під тим тикером, на який підписався
+            for symbol in subscriber.symbols:
+                if normalize_symbol(symbol) == key:
+                    subscriber.offer(symbol, quote)
+                    self.stats["deliveries"] += 1
+
+    async def _poll(self, key: str, symbol: str) -> None:
+        delay = self.poll_interval
+        while True:
+            try:
+                quote = await self.fetcher(symbol)
+            except Exception as e:
+                quote = {"error": f"Помилка отримання ціни: {str(e)}"}
+            self.stats["polls"] += 1
+            self.publish(key, quote)
+            if quote.get("error"):
+                # Помилки не кешуються - без затримки кожне опитування йшло б до API
+                self.stats["poll_errors"] += 1
+                delay = min(delay * 2, PRICE_HUB_MAX_BACKOFF)
+            else:
+                delay = self.poll_interval
+            await asyncio.sleep(delay)
+
+    async def close(self) -> None:
+        """Зупиняє всі опитувачі (при зупинці сервера)"""
+        pollers = list(self._pollers.values())
+        self._pollers.clear()
+        self._subscribers.clear()
+        self._last.clear()
+        for poller in pollers:
+            poller.cancel()
+        await asyncio.gather(*pollers, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Кількість символів, клієнтів і розісланих оновлень"""
+        clients = set()
+        for watchers in self._subscribers.values():
+            clients.update(watchers)
+        return {**self.stats, "symbols": len(self._pollers), "clients": len(clients)}
@@ -0,0 +1,302 @@
+"""
+Потокові котирування Twelve Data (WebSocket) для гарячих символів:
+одна підписка, що підлаштовується під частоту запитів, пише в quote_cache та tick_store
+"""
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from quote_cache import QuoteCache, normalize_symbol, quote_cache
+from tick_store import TickStore, tick_store
+
+load_dotenv()
+
+PRICE_STREAM_ENABLED = os.getenv("PRICE_STREAM_ENABLED", "false").lower() in ("1", "true", "yes")
+TWELVE_DATA_WS_URL = os.getenv("TWELVE_DATA_WS_URL", "wss://ws.twelvedata.com/v1/quotes/price")
+# Скільки символів тримати в підписці (ліміт тарифу Twelve Data)
+PRICE_STREAM_MAX_SYMBOLS = int(os.getenv("PRICE_STREAM_MAX_SYMBOLS", "8"))
+# Скільки запитів за вікно робить символ гарячим
+PRICE_STREAM_MIN_REQUESTS = int(os.getenv("PRICE_STREAM_MIN_REQUESTS", "3"))
+# Вікно підрахунку запитів (секунди)
+PRICE_STREAM_WINDOW = float(os.getenv("PRICE_STREAM_WINDOW", "300"))
+# Як часто переглядати склад підписки (секунди)
+PRICE_STREAM_REBALANCE_INTERVAL = float(os.getenv("PRICE_STREAM_REBALANCE_INTERVAL", "10"))
+# Twelve Data закриває з'єднання без heartbeat частіше ніж раз на 10 секунд
+PRICE_STREAM_HEARTBEAT_INTERVAL = 10.0
+# Затримка перед повторним підключенням (секунди, подвоюється до максимуму)
+PRICE_STREAM_RECONNECT_DELAY = 1.0
+PRICE_STREAM_MAX_RECONNECT_DELAY = 60.0
+# Скільки символів відстежувати для підрахунку частоти запитів
+PRICE_STREAM_TRACKED_SYMBOLS = 1000
+
+
+def _websocket_connect(url: str) -> Any:
+    """Фабрика з'єднань за замовчуванням (пакет websockets)"""
+    import websockets
+    return websockets.connect(url)
+
+
+def websockets_available() -> bool:
+    """Перевіряє, чи встановлено пакет websockets"""
+    try:
+        import websockets  # noqa: F401
+        return True
+    except ImportError:
+        print("⚠️ PRICE_STREAM_ENABLED=true, але пакет websockets не встановлено. Потокові ціни вимкнено")
+        return False
+
+
+class PriceStream:
+    """
+    Клієнт WebSocket котирувань Twelve Data.
+
+    get_price повідомляє про кожен запит символу (note_request); символи, які
+    запитують найчастіше, потрапляють у підписку, холодні - виходять з неї.
+    Кожна подія ціни оновлює кеш котирувань і сховище тіків, тож get_price
+    для підписаних символів читає ціну з пам'яті без звернення до API.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        cache: QuoteCache,
+        ticks: TickStore,
+        max_symbols: int = PRICE_STREAM_MAX_SYMBOLS,
+        min_requests: int = PRICE_STREAM_MIN_REQUESTS,
+        window: float = PRICE_STREAM_WINDOW,
+        connect: Callable[[str], Any] = _websocket_connect
+    ):
+        """
+        Args:
+            url: Адреса WebSocket (без API ключа)
+            cache: Кеш котирувань, куди пишуться ціни
+            ticks: Сховище тіків
+            max_symbols: Максимум символів у підписці
+            min_requests: Мінімум запитів за вікно для підписки
+            window: Вікно підрахунку запитів (секунди)
+            connect: Фабрика з'єднань url -> async context manager з send/recv
+                (для тестів - локальний замінник сервера)
+        """
+        self.url = url
+        self.cache = cache
+        self.ticks = ticks
+        self.max_symbols = max_symbols
+        self.min_requests = min_requests
+        self.window = window
+        self.connect = connect
+        # ключ символу -> часи запитів за вікно
+        self._requests: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        # ключ символу -> (тикер, клас активу, тикер Twelve Data)
+        self._symbols: Dict[str, Tuple[str, str, str]] = {}
+        # тикер Twelve Data -> ключ символу
+        self._by_stream_symbol: Dict[str, str] = {}
+        self._day_volume: Dict[str, float] = {}
+        # Символи, які сервер відмовився підписати (недоступні на тарифі)
+        self._rejected: Set[str] = set()
+        self.subscribed: Set[str] = set()
+        self._ws: Optional[Any] = None
+        self.connected = False
+        self.stats = {"events": 0, "connects": 0, "disconnects": 0, "subscribed": 0, "unsubscribed": 0, "rejected": 0}
+
+    def note_request(self, symbol: str, asset_class: str, stream_symbol: str) -> None:
+        """
+        Враховує запит ціни символу
+
+        Args:
+            symbol: Тикер
+            asset_class: Клас активу (stocks / crypto / forex)
+            stream_symbol: Тикер у форматі Twelve Data (BTC/USD)
+        """
+        key = normalize_symbol(symbol)
+        now = time.monotonic()
+        times = self._requests.get(key)
+        if times is None:
+            times = deque()
+            self._requests[key] = times
+            while len(self._requests) > PRICE_STREAM_TRACKED_SYMBOLS:
+                evicted, _ = self._requests.popitem(last=False)
+                if evicted not in self.subscribed:
+                    self._forget_symbol(evicted)
+        self._requests.move_to_end(key)
+        times.append(now)
+        self._trim(times, now)
+        if key not in self._symbols:
+            self._symbols[key] = (symbol.upper(), asset_class, stream_symbol)
+            self._by_stream_symbol[stream_symbol.upper()] = key
+
+    def _forget_symbol(self, key: str) -> None:
+        entry = self._symbols.pop(key, None)
+        if entry is not None:
+            self._by_stream_symbol.pop(entry[2].upper(), None)
+        self._day_volume.pop(key, None)
+        self._rejected.discard(key)
+
+    def _trim(self, times: Deque[float], now: float) -> None:
+        while times and times[0] <= now - self.window:
+            times.popleft()
+
+    def hot_symbols(self) -> Set[str]:
+        """
+        Символи, що мають бути в підписці: найчастіше запитувані за вікно.
+        Вже підписаним символам достатньо одного запиту (гістерезис), новим - min_requests.
+        """
+        now = time.monotonic()
+        counts = []
+        for key, times in self._requests.items():
+            self._trim(times, now)
+            threshold = 1 if key in self.subscribed else self.min_requests
+            if key not in self._rejected and len(times) >= threshold:
+                counts.append((len(times), key in self.subscribed, key))
+        counts.sort(reverse=True)
+        return {key for _, _, key in counts[:self.max_symbols]}
+
+    def is_streaming(self, symbol: str) -> bool:
+        """Чи надходять ціни символу з потоку"""
+        return self.connected and normalize_symbol(symbol) in self.subscribed
+
+    async def _send(self, action: str, keys: Set[str]) -> None:
+        symbols = ",".join(sorted(self._symbols[key][2] for key in keys))
+        await self._ws.send(json.dumps({"action": action, "params": {"symbols": symbols}}))
+
+    async def rebalance(self) -> None:
+        """Приводить підписку у відповідність до гарячих символів"""
+        if self._ws is None or not self.connected:
+            return
+        target = self.hot_symbols()
+        removed = self.subscribed - target
+        added = target - self.subscribed
+        if removed:
+            await self._send("unsubscribe", removed)
+        if added:
+            await self._send("subscribe", added)
+        self.stats["unsubscribed"] += len(removed)
+        self.stats["subscribed"] += len(added)
+        self.subscribed = target
+        for key in removed:
+            if key in self._requests:
+                self._day_volume.pop(key, None)
+            else:
+                self._forget_symbol(key)
+
+    def handle_message(self, message: str) -> None:
+        """Обробляє повідомлення сервера"""
+        try:
+            data = json.loads(message)
+        except (TypeError, ValueError):
+            return
+        event = data.get("event")
+        if event == "price":
+            self._handle_price(data)
+        elif event == "subscribe-status":
+            for failed in data.get("fails") or []:
+                # Символ недоступний на тарифі - більше не пробуємо його підписати
+                key = self._by_stream_symbol.get(str(failed.get("symbol", "")).upper())
+                if key is not None:
+                    self.stats["rejected"] += 1
+                    self.subscribed.discard(key)
+                    self._rejected.add(key)
+
+    def _handle_price(self, data: Dict[str, Any]) -> None:
+        key = self._by_stream_symbol.get(str(data.get("symbol", "")).upper())
+        if key is None or key not in self.subscribed:
+            return
+        try:
+            price = float(data["price"])
+        except (KeyError, TypeError, ValueError):
+            return
+        symbol, asset_class, _ = self._symbols[key]
+        timestamp = float(data.get("timestamp") or time.time())
+
+        # Обсяг тіку - приріст денного обсягу (для VWAP)
+        volume = 0.0
+        day_volume = data.get("day_volume")
+        if day_volume is not None:
+            previous = self._day_volume.get(key)
+            if previous is not None:
+                volume = max(float(day_volume) - previous, 0.0)
+            self._day_volume[key] = float(day_volume)
+
+        self.stats["events"] += 1
+        self.ticks.record(symbol, price, timestamp, volume)
+        self.cache.set(symbol, asset_class, {
+            "symbol": symbol,
+            "price": price,
+            "currency": data.get("currency") or "USD",
+            "timestamp": timestamp
+        })
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(PRICE_STREAM_HEARTBEAT_INTERVAL)
+            await self._ws.send(json.dumps({"action": "heartbeat"}))
+
+    async def _rebalancer(self) -> None:
+        while True:
+            await self.rebalance()
+            await asyncio.sleep(PRICE_STREAM_REBALANCE_INTERVAL)
+
+    async def _session(self, url: str) -> None:
+        """Одне з'єднання: підписка, heartbeat та читання подій до розриву"""
+        async with self.connect(url) as ws:
+            self._ws = ws
+            self.connected = True
+            self.stats["connects"] += 1
+            # Після перепідключення підписка на сервері порожня - відновлюємо попередню,
+            # щоб символи не чекали min_requests нових запитів
+            previous = {key for key in self.subscribed if key in self._symbols and key not in self._rejected}
+            self.subscribed = set()
+            # Денний обсяг за час розриву не належить першому тіку
+            self._day_volume.clear()
+            helpers = []
+            try:
+                if previous:
+                    await self._send("subscribe", previous)
+                    self.subscribed = previous
+                helpers = [asyncio.create_task(self._heartbeat()), asyncio.create_task(self._rebalancer())]
+                while True:
+                    self.handle_message(await ws.recv())
+            finally:
+                for task in helpers:
+                    task.cancel()
+                self.connected = False
+                self._ws = None
+
+    async def run(self) -> None:
+        """Фоновий цикл: з'єднання з повторним підключенням після збоїв"""
+        api_key = os.getenv("TWELVE_DATA_API_KEY", "")
+        url = f"{self.url}?apikey={api_key}" if api_key else self.url
+        delay = PRICE_STREAM_RECONNECT_DELAY
+        while True:
+            started = time.monotonic()
+            try:
+                await self._session(url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Ціни тимчасово знову запитуються через REST (кеш спливає за TTL)
+                print(f"Потік цін Twelve Data розірвано: {e}")
+            self.stats["disconnects"] += 1
+            if time.monotonic() - started > PRICE_STREAM_MAX_RECONNECT_DELAY:
+                delay = PRICE_STREAM_RECONNECT_DELAY
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, PRICE_STREAM_MAX_RECONNECT_DELAY)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Стан підписки та лічильники подій"""
+        return {
+            **self.stats,
+            "enabled": PRICE_STREAM_ENABLED,
+            "connected": self.connected,
+            "symbols": sorted(self._symbols[key][0] for key in self.subscribed if key in self._symbols),
+            "tracked": len(self._requests),
+            "rejected_symbols": sorted(self._symbols[key][0] for key in self._rejected if key in self._symbols)
+        }
+
+
+# Глобальний потік котирувань
+price_stream = PriceStream(TWELVE_DATA_WS_URL, quote_cache, tick_store)
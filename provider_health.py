@@ -0,0 +1,303 @@
+"""
+Стан провайдерів даних: автоматичні вимикачі (circuit breaker), латентність
+та хеджовані запити до резервного провайдера
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from rate_limiter import PROVIDER_HOSTS
+
+load_dotenv()
+
+# Скільки помилок поспіль відкривають вимикач
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+# Через скільки секунд відкритий вимикач пропускає пробний запит
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Межі затримки перед хеджованим запитом (секунди); сама затримка - p95 латентності провайдера
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.3"))
+HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", "3.0"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "1.0"))
+
+# Скільки останніх вимірів латентності зберігати для p95
+LATENCY_WINDOW = 200
+# Коефіцієнт згладжування EWMA латентності та частки помилок
+PROVIDER_EWMA_ALPHA = float(os.getenv("PROVIDER_EWMA_ALPHA", "0.2"))
+
+
+class CircuitOpenError(Exception):
+    """Провайдер вважається недоступним - запит відхилено без звернення до мережі"""
+
+
+# Тимчасові збої (таймаут, мережа, 5xx, 429, відкритий вимикач, ліміт запитів) поточного
+# хеджованого запиту. Адаптери перетворюють винятки на {"error": ...}, тож лише за цим
+# списком можна відрізнити збій провайдера від помилки запиту (невідомий тикер)
+_transient_failures: ContextVar[Optional[List[str]]] = ContextVar("transient_failures", default=None)
+
+
+def mark_transient_failure(reason: str) -> None:
+    """Позначає, що поточний запит до провайдера не вдався з тимчасової причини"""
+    failures = _transient_failures.get()
+    if failures is not None:
+        failures.append(reason)
+
+
+class CircuitBreaker:
+    """
+    Вимикач з трьома станами:
+    closed - запити проходять; open - запити відхиляються одразу;
+    half_open - після reset_timeout пропускається один пробний запит.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Чи можна відправити запит зараз"""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self._trial_in_flight = False
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self) -> None:
+        """Пробний запит скасовано без результату - наступний запит знову може бути пробним"""
+        self._trial_in_flight = False
+
+    def is_open(self) -> bool:
+        """Чи відхиляються запити зараз (без зміни стану)"""
+        return self.state == "open" and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class ProviderHealth:
+    """Вимикач, EWMA латентності та частки помилок одного провайдера"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.ewma_latency: Optional[float] = None
+        self.ewma_error_rate = 0.0
+        self.stats = {"requests": 0, "failures": 0, "short_circuited": 0}
+
+    def record(self, latency: float, ok: bool) -> None:
+        """Враховує результат запиту"""
+        self.stats["requests"] += 1
+        self._latencies.append(latency)
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency += PROVIDER_EWMA_ALPHA * (latency - self.ewma_latency)
+        self.ewma_error_rate += PROVIDER_EWMA_ALPHA * ((0.0 if ok else 1.0) - self.ewma_error_rate)
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.stats["failures"] += 1
+            self.breaker.record_failure()
+
+    def p95(self) -> Optional[float]:
+        """95-й перцентиль латентності за останні запити"""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def hedge_delay(self) -> float:
+        """Затримка перед хеджованим запитом: p95 в межах [HEDGE_MIN_DELAY, HEDGE_MAX_DELAY]"""
+        p95 = self.p95()
+        if p95 is None:
+            return HEDGE_DEFAULT_DELAY
+        return min(max(p95, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+    def get_stats(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            **self.stats,
+            "state": self.breaker.state,
+            "p95_latency": round(p95, 3) if p95 is not None else None,
+            "ewma_latency": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "ewma_error_rate": round(self.ewma_error_rate, 3)
+        }
+
+
+class ProviderHealthRegistry:
+    """Стан усіх провайдерів (за хостом API)"""
+
+    def __init__(self, hosts: Dict[str, str]):
+        self.hosts = hosts
+        self._providers: Dict[str, ProviderHealth] = {}
+        self.stats = {"hedges": 0, "hedge_wins": 0, "fallbacks": 0, "client_errors": 0}
+
+    def get(self, provider: str) -> ProviderHealth:
+        health = self._providers.get(provider)
+        if health is None:
+            health = ProviderHealth(provider)
+            self._providers[provider] = health
+        return health
+
+    def for_host(self, host: str) -> Optional[ProviderHealth]:
+        provider = self.hosts.get(host)
+        return self.get(provider) if provider else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "providers": {name: health.get_stats() for name, health in self._providers.items()},
+            **self.stats
+        }
+
+
+# Глобальний реєстр стану провайдерів
+provider_health = ProviderHealthRegistry(PROVIDER_HOSTS)
+
+
+class HealthTrackingTransport(httpx.AsyncBaseTransport):
+    """
+    Транспорт httpx, що вимірює латентність запитів до відомих провайдерів
+    та відхиляє запити, поки вимикач провайдера відкритий.
+    Помилками вважаються мережеві збої, таймаути та відповіді 5xx;
+    вони, як і 429, позначаються для hedged_request як тимчасові.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, registry: ProviderHealthRegistry):
+        self.inner = inner
+        self.registry = registry
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        health = self.registry.for_host(request.url.host)
+        if health is None:
+            return await self.inner.handle_async_request(request)
+
+        if not health.breaker.allow():
+            health.stats["short_circuited"] += 1
+            mark_transient_failure("circuit_open")
+            raise CircuitOpenError(f"Провайдер {health.name} тимчасово недоступний")
+
+        started = time.monotonic()
+        try:
+            response = await self.inner.handle_async_request(request)
+        except asyncio.CancelledError:
+            # Скасований (наприклад, програвший хеджований) запит - не ознака збою
+            health.breaker.release_trial()
+            raise
+        except Exception as e:
+            health.record(time.monotonic() - started, ok=False)
+            mark_transient_failure("timeout" if isinstance(e, httpx.TimeoutException) else "network")
+            raise
+        health.record(time.monotonic() - started, ok=response.status_code < 500)
+        if response.status_code >= 500 or response.status_code == 429:
+            mark_transient_failure(f"http_{response.status_code}")
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def _as_result(task: "asyncio.Task") -> Dict[str, Any]:
+    if task.cancelled():
+        return {"error": "Запит скасовано"}
+    if task.exception() is not None:
+        return {"error": str(task.exception())}
+    return task.result()
+
+
+async def hedged_request(
+    primary: Callable[[], Awaitable[Dict[str, Any]]],
+    fallback: Callable[[], Awaitable[Dict[str, Any]]],
+    primary_provider: str,
+    fallback_on_any_error: bool = False
+) -> Dict[str, Any]:
+    """
+    Хеджований запит: якщо основний провайдер не відповів за p95 своєї
+    латентності (або відповів тимчасовою помилкою - таймаут, 5xx, 429,
+    відкритий вимикач), паралельно запитується резервний; повертається
+    перша успішна відповідь. Помилку запиту (невідомий тикер) основного
+    провайдера резервний не перекриває - вона повертається як є
+    (крім fallback_on_any_error: основний провайдер ще не перевірений).
+
+    Args:
+        primary: Корутина-фабрика основного запиту (повертає словник, помилка - ключ "error")
+        fallback: Корутина-фабрика резервного запиту
+        primary_provider: Назва основного провайдера (для затримки хеджування)
+        fallback_on_any_error: Звертатися до резервного після будь-якої помилки основного
+
+    Returns:
+        Перша успішна відповідь або помилка основного запиту
+    """
+    if not HEDGE_ENABLED:
+        return await primary()
+
+    health = provider_health.get(primary_provider)
+    # Задача основного запиту отримує копію контексту зі своїм списком збоїв
+    failures: List[str] = []
+    token = _transient_failures.set(failures)
+    try:
+        primary_task = asyncio.ensure_future(primary())
+    finally:
+        _transient_failures.reset(token)
+    tasks = {primary_task}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=health.hedge_delay())
+        if done:
+            result = _as_result(primary_task)
+            if not result.get("error"):
+                return result
+            if not failures and not fallback_on_any_error:
+                provider_health.stats["client_errors"] += 1
+                return result
+            # Основний провайдер швидко відповів тимчасовою помилкою (або вимикач відкритий)
+            provider_health.stats["fallbacks"] += 1
+            fallback_result = await fallback()
+            return fallback_result if not fallback_result.get("error") else result
+
+        provider_health.stats["hedges"] += 1
+        hedge_task = asyncio.ensure_future(fallback())
+        tasks.add(hedge_task)
+        first_error: Optional[Dict[str, Any]] = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = _as_result(task)
+                if not result.get("error"):
+                    if task is hedge_task:
+                        provider_health.stats["hedge_wins"] += 1
+                    return result
+                if task is primary_task and not failures and not fallback_on_any_error:
+                    provider_health.stats["client_errors"] += 1
+                    return result
+                if task is primary_task or first_error is None:
+                    first_error = result
+        return first_error or {"error": "Немає відповіді від провайдерів"}
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,151 @@
+"""
+Вибір провайдера ринкових даних за можливостями, латентністю та часткою помилок
+"""
+import os
+import random
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+from provider_health import ProviderHealthRegistry, provider_health
+
+load_dotenv()
+
+# Латентність провайдера без вимірів (секунди) - нові провайдери теж отримують запити
+ROUTER_DEFAULT_LATENCY = float(os.getenv("ROUTER_DEFAULT_LATENCY", "0.5"))
+# Наскільки частка помилок погіршує оцінку: latency * (1 + penalty * error_rate)
+ROUTER_ERROR_PENALTY = float(os.getenv("ROUTER_ERROR_PENALTY", "5"))
+# Частка запитів, що йдуть до другого за оцінкою провайдера (щоб оновлювати його статистику)
+ROUTER_EXPLORE_RATE = float(os.getenv("ROUTER_EXPLORE_RATE", "0.05"))
+
+
+class ProviderAdapter:
+    """
+    Адаптер провайдера даних.
+
+    Можливості задаються обробниками (price, prices, news, news_search)
+    та класами активів; назва збігається з ключем у provider_health.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        asset_classes: Iterable[str] = (),
+        batch_size: int = 0,
+        freshness: float = 0.0,
+        label: Optional[str] = None,
+        weight: float = 0.5,
+        credentials: Iterable[str] = (),
+        **handlers: Callable[..., Awaitable[Any]]
+    ):
+        """
+        Args:
+            name: Ключ провайдера (twelve_data, finage, newsdata)
+            asset_classes: Класи активів, для яких є ціни
+            batch_size: Максимум символів у пакетному запиті (для обробника prices)
+            freshness: Типова затримка даних провайдера (секунди)
+            label: Назва джерела у відповідях (наприклад, "NewsData.io")
+            weight: Якість джерела для ранжування новин
+            credentials: Змінні середовища з ключами API (без них адаптер не обирається)
+            **handlers: Обробники можливостей, наприклад price=fn(symbol, asset_class)
+        """
+        self.name = name
+        self.asset_classes = frozenset(asset_classes)
+        self.batch_size = batch_size
+        self.freshness = freshness
+        self.label = label or name
+        self.weight = weight
+        self.credentials = tuple(credentials)
+        self.handlers = handlers
+
+    def is_configured(self) -> bool:
+        """Чи задані ключі API провайдера"""
+        return all(os.getenv(name) for name in self.credentials)
+
+    def supports(self, capability: str, asset_class: Optional[str] = None) -> bool:
+        """Чи має адаптер обробник для можливості (і для класу активу, якщо задано)"""
+        if capability not in self.handlers:
+            return False
+        return asset_class is None or asset_class in self.asset_classes
+
+    async def call(self, capability: str, *args: Any) -> Any:
+        """Викликає обробник можливості"""
+        return await self.handlers[capability](*args)
+
+
+class ProviderRouter:
+    """
+    Маршрутизатор: для кожного запиту впорядковує налаштовані адаптери, що його
+    підтримують, від найшвидшого здорового (EWMA латентності з поправкою на помилки)
+    до провайдерів з відкритим вимикачем.
+    """
+
+    def __init__(self, registry: ProviderHealthRegistry):
+        self.registry = registry
+        self.adapters: List[ProviderAdapter] = []
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def register(self, adapter: ProviderAdapter) -> ProviderAdapter:
+        """Додає адаптер"""
+        self.adapters.append(adapter)
+        return adapter
+
+    def score(self, adapter: ProviderAdapter) -> float:
+        """Оцінка провайдера (менше - краще)"""
+        health = self.registry.get(adapter.name)
+        latency = health.ewma_latency if health.ewma_latency is not None else ROUTER_DEFAULT_LATENCY
+        return latency * (1 + ROUTER_ERROR_PENALTY * health.ewma_error_rate)
+
+    def is_available(self, name: str) -> bool:
+        """Чи не відкритий вимикач провайдера"""
+        return not self.registry.get(name).breaker.is_open()
+
+    def candidates(self, capability: str, asset_class: Optional[str] = None) -> List[ProviderAdapter]:
+        """
+        Адаптери для можливості в порядку пріоритету
+
+        Args:
+            capability: Можливість (price, prices, news, news_search)
+            asset_class: Клас активу (для цін)
+
+        Returns:
+            Доступні провайдери від найкращого, в кінці - з відкритим вимикачем
+        """
+        supported = [
+            adapter for adapter in self.adapters
+            if adapter.supports(capability, asset_class) and adapter.is_configured()
+        ]
+        available = sorted((a for a in supported if self.is_available(a.name)), key=self.score)
+        unavailable = [a for a in supported if not self.is_available(a.name)]
+
+        if len(available) > 1 and random.random() < ROUTER_EXPLORE_RATE:
+            available[0], available[1] = available[1], available[0]
+
+        if available:
+            counters = self.stats.setdefault(capability, {})
+            counters[available[0].name] = counters.get(available[0].name, 0) + 1
+        return available + unavailable
+
+    def is_proven(self, adapter: ProviderAdapter, candidates: List[ProviderAdapter]) -> bool:
+        """
+        Чи обрано адаптер за вимірами: він має статистику латентності і є найкращим
+        за оцінкою (а не обраний дослідницьки чи за латентністю за замовчуванням).
+        Помилку неперевіреного провайдера варто перекривати наступним кандидатом.
+        """
+        if self.registry.get(adapter.name).ewma_latency is None:
+            return False
+        available = [a for a in candidates if self.is_available(a.name)]
+        return not available or min(available, key=self.score) is adapter
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Оцінки адаптерів та розподіл запитів по провайдерах"""
+        return {
+            "scores": {
+                adapter.name: round(self.score(adapter), 3) for adapter in self.adapters
+            },
+            "selected": self.stats
+        }
+
+
+# Глобальний маршрутизатор провайдерів
+provider_router = ProviderRouter(provider_health)
@@ -0,0 +1,156 @@
+"""
+Кеш котирувань з TTL по класах активів, LRU витісненням та об'єднанням
+одночасних запитів (single-flight)
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Час життя котирувань (секунди) по класах активів
+QUOTE_TTLS = {
+    "crypto": float(os.getenv("QUOTE_TTL_CRYPTO", "5")),
+    "stocks": float(os.getenv("QUOTE_TTL_STOCKS", "15")),
+    "forex": float(os.getenv("QUOTE_TTL_FOREX", "10"))
+}
+QUOTE_CACHE_MAX_SIZE = int(os.getenv("QUOTE_CACHE_MAX_SIZE", "1000"))
+# Скільки секунд після TTL котирування ще можна віддати, якщо API недоступне (ліміти, помилки)
+QUOTE_MAX_STALE = float(os.getenv("QUOTE_MAX_STALE", "300"))
+
+
+def normalize_symbol(symbol: str) -> str:
+    """Приводить тикер до єдиного формату ключа (BTC/USD, btcusd -> BTCUSD)"""
+    return symbol.strip().upper().replace("/", "").replace("-", "")
+
+
+def quote_key(symbol: str, asset_class: str) -> Tuple[str, str]:
+    """Ключ котирування: клас активу + тикер (ETH акція і ETH/USD - різні котирування)"""
+    return asset_class, normalize_symbol(symbol)
+
+
+class QuoteCache:
+    """
+    In-process кеш котирувань.
+
+    Ключ - клас активу та нормалізований тикер. Записи живуть TTL свого класу активу, розмір обмежений max_size
+    (витісняються найдавніше використані). Одночасні промахи по одному
+    символу в межах циклу подій чекають на один запит до API. Усі звернення
+    відбуваються в циклі подій, тому блокування не потрібне.
+    """
+
+    def __init__(self, ttls: Dict[str, float], max_size: int, max_stale: float = QUOTE_MAX_STALE):
+        self.ttls = ttls
+        self.max_size = max_size
+        self.max_stale = max_stale
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "stale_served": 0}
+
+    def get(self, symbol: str, asset_class: str) -> Optional[Dict[str, Any]]:
+        """Повертає копію свіжого котирування або None"""
+        key = quote_key(symbol, asset_class)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, quote = entry
+        # Прострочений запис лишається в кеші як резерв для get_stale
+        if expires_at <= time.monotonic():
+            return None
+        self._entries.move_to_end(key)
+        return dict(quote)
+
+    def get_stale(self, symbol: str, asset_class: str) -> Optional[Dict[str, Any]]:
+        """Повертає прострочене (не більше ніж на max_stale) котирування або None"""
+        key = quote_key(symbol, asset_class)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] + self.max_stale <= time.monotonic():
+            return None
+        return dict(entry[1])
+
+    def set(self, symbol: str, asset_class: str, quote: Dict[str, Any]) -> None:
+        """Зберігає котирування з TTL відповідного класу активу (без timestamp - позначається часом збереження)"""
+        quote.setdefault("timestamp", time.time())
+        key = quote_key(symbol, asset_class)
+        ttl = self.ttls.get(asset_class, min(self.ttls.values()))
+        self._entries[key] = (time.monotonic() + ttl, dict(quote))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get_or_fetch(
+        self,
+        symbol: str,
+        asset_class: str,
+        fetcher: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Повертає котирування з кешу або завантажує його через fetcher
+
+        Args:
+            symbol: Тикер активу
+            asset_class: Клас активу (stocks / crypto / forex)
+            fetcher: Корутина-фабрика, що звертається до API
+
+        Returns:
+            Словник з інформацією про ціну (помилки не кешуються; якщо API
+            повернуло помилку, віддається нещодавнє котирування з позначкою stale)
+        """
+        cached = self.get(symbol, asset_class)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+
+        key = quote_key(symbol, asset_class)
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+
+        # Задача прив'язана до свого циклу подій - чекати її можна лише з нього
+        if task is not None and not task.done() and task.get_loop() is loop:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            task = loop.create_task(self._fetch_and_store(symbol, asset_class, fetcher))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        # shield: скасування одного очікувача не скасовує спільний запит
+        return dict(await asyncio.shield(task))
+
+    async def _fetch_and_store(
+        self,
+        symbol: str,
+        asset_class: str,
+        fetcher: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        quote = await fetcher()
+        if not quote.get("error"):
+            self.set(symbol, asset_class, quote)
+            return quote
+
+        stale = self.get_stale(symbol, asset_class)
+        if stale is not None:
+            self.stats["stale_served"] += 1
+            return {**stale, "stale": True}
+        return quote
+
+    def _forget(self, key: Tuple[str, str], task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def clear(self) -> None:
+        """Очищає кеш"""
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Повертає лічильники кешу"""
+        return {**self.stats, "size": len(self._entries), "max_size": self.max_size, "inflight": len(self._inflight)}
+
+
+# Глобальний кеш котирувань
+quote_cache = QuoteCache(QUOTE_TTLS, QUOTE_CACHE_MAX_SIZE)
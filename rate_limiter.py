@@ -0,0 +1,253 @@
+"""
+Ліміти запитів до зовнішніх API: token bucket по провайдеру та API ключу,
+пріоритетна черга і денні квоти
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Пріоритети запитів: менше значення - вищий пріоритет
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Скільки секунд запит може чекати в черзі (запити користувачів / фонові)
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "5"))
+RATE_LIMIT_BACKGROUND_MAX_WAIT = float(os.getenv("RATE_LIMIT_BACKGROUND_MAX_WAIT", "60"))
+# Частка денної квоти, доступна фоновим запитам (решта - для користувачів)
+RATE_LIMIT_BACKGROUND_QUOTA_SHARE = float(os.getenv("RATE_LIMIT_BACKGROUND_QUOTA_SHARE", "0.8"))
+
+
+def _provider_limits(prefix: str, rate: str, burst: str, daily: str) -> Dict[str, float]:
+    return {
+        "rate_per_minute": float(os.getenv(f"{prefix}_RATE_PER_MINUTE", rate)),
+        "burst": float(os.getenv(f"{prefix}_BURST", burst)),
+        "daily_quota": int(os.getenv(f"{prefix}_DAILY_QUOTA", daily)),
+    }
+
+
+# Ліміти по провайдерах (за замовчуванням - безкоштовні тарифи); daily_quota 0 - без квоти
+PROVIDER_LIMITS = {
+    "twelve_data": _provider_limits("TWELVE_DATA", "8", "8", "800"),
+    "newsdata": _provider_limits("NEWSDATA", "2", "10", "200"),
+    "finage": _provider_limits("FINAGE", "60", "60", "0"),
+}
+
+# Хост API -> провайдер
+PROVIDER_HOSTS = {
+    "api.twelvedata.com": "twelve_data",
+    "newsdata.io": "newsdata",
+    "api.finage.co.uk": "finage",
+}
+
+_request_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "request_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+class RateLimitExceeded(Exception):
+    """Запит не можна виконати в межах лімітів (квота вичерпана або черга задовга)"""
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Задає пріоритет зовнішніх запитів у межах блоку (і створених у ньому задач)"""
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+def _utc_day() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class TokenBucket:
+    """
+    Token bucket з пріоритетною чергою очікувачів та денною квотою.
+
+    Токени поповнюються зі швидкістю rate_per_minute до burst. Запити
+    обслуговуються в порядку пріоритету (в межах пріоритету - FIFO);
+    якщо очікування перевищить max_wait, запит відхиляється одразу.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: float, daily_quota: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(burst, 1.0)
+        self.daily_quota = daily_quota
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._day = _utc_day()
+        self.used_today = 0
+        self.stats = {"granted": 0, "queued": 0, "rejected": 0, "throttled": 0}
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _check_quota(self, cost: int, priority: int) -> None:
+        day = _utc_day()
+        if day != self._day:
+            self._day, self.used_today = day, 0
+        if not self.daily_quota:
+            return
+        quota = self.daily_quota
+        if priority > PRIORITY_INTERACTIVE:
+            quota = int(quota * RATE_LIMIT_BACKGROUND_QUOTA_SHARE)
+        if self.used_today + cost > quota:
+            self.stats["rejected"] += 1
+            raise RateLimitExceeded(f"Денну квоту вичерпано ({self.used_today}/{self.daily_quota})")
+
+    def _wait_time(self, position: int, cost: float, now: float) -> float:
+        """Оцінка очікування для запиту на позиції position у черзі"""
+        missing = (position + 1) * cost - self.tokens
+        wait = missing / self.rate if missing > 0 and self.rate > 0 else 0.0
+        return max(wait, self._blocked_until - now)
+
+    async def acquire(self, cost: int = 1, priority: int = PRIORITY_INTERACTIVE, max_wait: float = 5.0) -> None:
+        """
+        Чекає на токени для запиту
+
+        Args:
+            cost: Вартість запиту в кредитах провайдера
+            priority: Пріоритет (PRIORITY_INTERACTIVE / PRIORITY_BACKGROUND)
+            max_wait: Максимальний час очікування (секунди)
+
+        Raises:
+            RateLimitExceeded: Квота вичерпана або очікування довше за max_wait
+        """
+        self._check_quota(cost, priority)
+        # Запит дорожчий за місткість відра чекає на повне відро
+        tokens_needed = min(float(cost), self.capacity)
+        entry = (priority, next(self._seq))
+        heapq.heappush(self._waiters, entry)
+        deadline = time.monotonic() + max_wait
+        queued = False
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._waiters[0] == entry and self.tokens >= tokens_needed and now >= self._blocked_until:
+                    # Квоту перевіряємо ще раз: поки запит чекав, її могли вичерпати
+                    self._check_quota(cost, priority)
+                    self.tokens -= tokens_needed
+                    self.used_today += cost
+                    self.stats["granted"] += 1
+                    return
+
+                position = sorted(self._waiters).index(entry)
+                wait = self._wait_time(position, tokens_needed, now)
+                if now + wait > deadline:
+                    self.stats["rejected"] += 1
+                    raise RateLimitExceeded(f"Ліміт запитів: очікування {wait:.1f}с перевищує {max_wait:.1f}с")
+                if not queued:
+                    queued = True
+                    self.stats["queued"] += 1
+                await asyncio.sleep(max(min(wait, deadline - now), 0.01))
+        finally:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+
+    def throttle(self, retry_after: float) -> None:
+        """Призупиняє видачу токенів після відповіді 429 від провайдера"""
+        self.tokens = 0.0
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        self.stats["throttled"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        self._refill(time.monotonic())
+        return {
+            **self.stats,
+            "tokens": round(self.tokens, 2),
+            "waiting": len(self._waiters),
+            "used_today": self.used_today,
+            "daily_quota": self.daily_quota or None
+        }
+
+
+class RateLimiter:
+    """
+    Реєстр token bucket'ів по (провайдер, API ключ).
+
+    Підключається до httpx клієнтів як event hook, тож ліміти діють
+    для всіх запитів до відомих провайдерів, незалежно від місця виклику.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, float]], hosts: Dict[str, str]):
+        self.limits = limits
+        self.hosts = hosts
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def bucket(self, provider: str, api_key: str) -> TokenBucket:
+        """Повертає bucket провайдера для API ключа"""
+        key = (provider, api_key)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            limits = self.limits[provider]
+            bucket = TokenBucket(limits["rate_per_minute"], limits["burst"], int(limits["daily_quota"]))
+            self._buckets[key] = bucket
+        return bucket
+
+    def _bucket_for(self, request: Any) -> Optional[TokenBucket]:
+        provider = self.hosts.get(request.url.host)
+        if provider is None:
+            return None
+        return self.bucket(provider, request.url.params.get("apikey", ""))
+
+    @staticmethod
+    def _cost(request: Any) -> int:
+        # Twelve Data рахує кредити за кожен символ пакетного запиту
+        if request.url.host == "api.twelvedata.com":
+            symbols = request.url.params.get("symbol", "")
+            return max(1, len([s for s in symbols.split(",") if s]))
+        return 1
+
+    async def before_request(self, request: Any) -> None:
+        """httpx event hook: чекає на дозвіл ліміту перед відправкою запиту"""
+        if not RATE_LIMIT_ENABLED:
+            return
+        bucket = self._bucket_for(request)
+        if bucket is None:
+            return
+        priority = _request_priority.get()
+        max_wait = RATE_LIMIT_MAX_WAIT if priority <= PRIORITY_INTERACTIVE else RATE_LIMIT_BACKGROUND_MAX_WAIT
+        await bucket.acquire(self._cost(request), priority, max_wait)
+
+    async def after_response(self, response: Any) -> None:
+        """httpx event hook: враховує 429 від провайдера (Retry-After)"""
+        if response.status_code != 429:
+            return
+        bucket = self._bucket_for(response.request)
+        if bucket is None:
+            return
+        try:
+            retry_after = float(response.headers.get("Retry-After", "60"))
+        except ValueError:
+            retry_after = 60.0
+        bucket.throttle(retry_after)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Стан лімітів по провайдерах (ключ показується лише останніми 4 символами)"""
+        return {
+            f"{provider}:…{api_key[-4:]}": bucket.get_stats()
+            for (provider, api_key), bucket in self._buckets.items()
+        }
+
+
+# Глобальний обмежувач запитів
+rate_limiter = RateLimiter(PROVIDER_LIMITS, PROVIDER_HOSTS)
@@ -0,0 +1,150 @@
+"""
+Постійний кеш результатів аналізу тональності (SQLite)
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SENTIMENT_CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", "sentiment_cache.sqlite3")
+SENTIMENT_CACHE_MAX_ENTRIES = int(os.getenv("SENTIMENT_CACHE_MAX_ENTRIES", "10000"))
+
+# Як часто (кожні N записів) перевіряти розмір кешу
+_EVICTION_CHECK_INTERVAL = 100
+# Оновлення last_used після влучань накопичуються в пам'яті та записуються
+# одною транзакцією раз на N секунд або після N влучань
+_TOUCH_FLUSH_INTERVAL = 30.0
+_TOUCH_FLUSH_SIZE = 100
+
+
+def normalize_news_text(text: str) -> str:
+    """Нормалізує текст новини для ключа кешу (регістр, пробіли)"""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def prompt_version(prompt: str, model: str) -> str:
+    """Коротка версія промпту: змінюється разом з текстом правил або моделлю"""
+    return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+class SentimentCache:
+    """
+    Кеш тональності з ключем sha256(версія промпту + нормалізований текст).
+
+    Зберігається в SQLite, тож переживає перезапуск сервера. Коли записів
+    більше за max_entries, видаляються найдавніше використані.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        self._touched: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
+        self._check_interval = max(1, min(_EVICTION_CHECK_INTERVAL, max_entries // 10))
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS sentiment_cache (
+                    key TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_last_used ON sentiment_cache(last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(news_text: str, version: str) -> str:
+        """Формує ключ кешу для тексту новини та версії промпту"""
+        payload = f"{version}\n{normalize_news_text(news_text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Повертає збережений JSON результат або None"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT result FROM sentiment_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= _TOUCH_FLUSH_SIZE or time.monotonic() - self._last_flush >= _TOUCH_FLUSH_INTERVAL:
+                self._flush_touched(conn)
+                conn.commit()
+            self.stats["hits"] += 1
+            return row[0]
+
+    def _flush_touched(self, conn: sqlite3.Connection) -> None:
+        """Записує накопичені last_used (без commit)"""
+        if self._touched:
+            conn.executemany(
+                "UPDATE sentiment_cache SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+        self._last_flush = time.monotonic()
+
+    def set(self, key: str, result: str) -> None:
+        """Зберігає JSON результат аналізу"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            self._touched.pop(key, None)
+            conn.execute(
+                "INSERT OR REPLACE INTO sentiment_cache (key, result, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, result, now, now)
+            )
+            self._writes += 1
+            if self._writes % self._check_interval == 0:
+                # Витіснення має бачити актуальні last_used
+                self._flush_touched(conn)
+                self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (count,) = conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM sentiment_cache WHERE key IN "
+                "(SELECT key FROM sentiment_cache ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+            self.stats["evictions"] += excess
+
+    def get_stats(self) -> Dict[str, int]:
+        """Повертає лічильники та розмір кешу"""
+        with self._lock:
+            (size,) = self._connection().execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()
+        return {**self.stats, "size": size, "max_entries": self.max_entries}
+
+    def close(self) -> None:
+        """Закриває з'єднання з базою"""
+        with self._lock:
+            if self._conn is not None:
+                self._flush_touched(self._conn)
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+# Глобальний кеш тональності
+sentiment_cache = SentimentCache(SENTIMENT_CACHE_PATH, SENTIMENT_CACHE_MAX_ENTRIES)
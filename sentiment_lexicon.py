@@ -0,0 +1,146 @@
+"""
+Локальний лексичний аналіз тональності - швидкий етап перед зверненням до LLM
+"""
+import math
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SENTIMENT_LEXICON_ENABLED = os.getenv("SENTIMENT_LEXICON_ENABLED", "true").lower() in ("1", "true", "yes")
+# Мінімальна впевненість, з якою результат словника приймається без LLM
+SENTIMENT_LEXICON_THRESHOLD = float(os.getenv("SENTIMENT_LEXICON_THRESHOLD", "0.75"))
+
+# Основи слів та фрази -> вага (позитивна = bullish, негативна = bearish)
+SENTIMENT_LEXICON = {
+    # Зростання
+    r"surg\w*": 1.0, r"soar\w*": 1.0, r"jump\w*": 0.8, r"rall(?:y|ies|ied|ying)": 1.0,
+    r"skyrocket\w*": 1.2, r"rebound\w*": 0.7, r"climb\w*": 0.6, r"gain(?:s|ed)?": 0.6,
+    r"ris(?:e|es|ing)": 0.6, r"rose": 0.6,
+    r"record high\w*": 1.2, r"all-time high\w*": 1.2, r"beat\w* (?:estimates|expectations|forecasts)": 1.2,
+    r"upgrad\w*": 0.9, r"outperform\w*": 0.8, r"bullish": 1.2, r"boom\w*": 0.8,
+    r"strong (?:demand|growth|earnings|results)": 1.0, r"profit\w* (?:rise|rises|rose|jump\w*)": 1.0,
+    r"raise\w* (?:guidance|outlook|forecast)": 1.0, r"buyback\w*": 0.6, r"approv\w*": 0.5,
+    r"зрост\w*": 0.8, r"злет\w*": 1.0, r"підйом\w*": 0.7, r"рекорд\w*": 0.8, r"прибут\w*": 0.5,
+    r"рост\w*": 0.8, r"взлет\w*": 1.0, r"зрос(?:ла|ло|ли)?": 0.8, r"зріс": 0.8, r"вырос\w*": 0.8,
+    # Падіння
+    r"plung\w*": -1.2, r"plummet\w*": -1.2, r"crash\w*": -1.2, r"tumbl\w*": -1.0, r"slump\w*": -1.0,
+    r"sink\w*": -0.9, r"sank": -0.9, r"fall(?:s|ing)?": -0.7, r"fell": -0.7, r"drop\w*": -0.7,
+    r"slid(?:e|es|ing)?": -0.7, r"declin\w*": -0.6, r"los(?:s|ses)": -0.7, r"sell-?off\w*": -1.0,
+    r"downgrad\w*": -0.9, r"underperform\w*": -0.8, r"bearish": -1.2, r"recession\w*": -1.0,
+    r"miss\w* (?:estimates|expectations|forecasts)": -1.2, r"bankrupt\w*": -1.5, r"default\w*": -0.9,
+    r"layoff\w*": -0.8, r"lawsuit\w*": -0.6, r"probe\w*": -0.5, r"fraud\w*": -1.2,
+    r"cut\w* (?:guidance|outlook|forecast)": -1.0, r"record low\w*": -1.2, r"weak (?:demand|growth|earnings|results)": -1.0,
+    r"паді\w*": -0.8, r"обвал\w*": -1.2, r"збит\w*": -0.7, r"криз\w*": -0.9, r"рецесі\w*": -1.0,
+    r"банкрут\w*": -1.5, r"паден\w*": -0.8, r"убыт\w*": -0.7,
+    r"впа(?:в|ла|ло|ли)": -0.8, r"упа(?:в|ла|ло|ли)": -0.8, r"подешев\w*": -0.7,
+}
+
+# Заперечення перед сигналом (в межах 3 слів). Знак не змінюється: "did not crash"
+# не означає зростання, тож сигнал лише послаблюється, а впевненість знижується
+NEGATIONS = {"not", "no", "never", "without", "fails", "failed", "не", "ні", "без", "нет"}
+_NEGATION_WINDOW = 3
+# Частка ваги, що лишається в сигналу після заперечення
+_NEGATION_DAMPING = 0.2
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Всі терміни в одному скомпільованому виразі; довші фрази мають пріоритет
+_TERMS: List[Tuple[str, float]] = sorted(SENTIMENT_LEXICON.items(), key=lambda item: -len(item[0]))
+_LEXICON_RE = re.compile(
+    "|".join(f"(?P<t{i}>\\b{pattern}\\b)" for i, (pattern, _) in enumerate(_TERMS)),
+    re.IGNORECASE | re.UNICODE
+)
+
+# Статистика ескалацій до LLM
+lexicon_stats = {"scored": 0, "resolved": 0, "escalated": 0}
+
+
+def score_sentiment(text: str) -> Dict[str, Any]:
+    """
+    Оцінює тональність тексту за словником без мережевих викликів
+
+    Args:
+        text: Текст новини
+
+    Returns:
+        Словник у форматі analyze_market_sentiment (sentiment, explanation, confidence)
+    """
+    positive = negative = negated = 0.0
+    positive_hits, negative_hits = [], []
+
+    for match in _LEXICON_RE.finditer(text):
+        weight = _TERMS[int(match.lastgroup[1:])][1]
+        preceding = _WORD_RE.findall(text[max(0, match.start() - 40):match.start()].lower())
+        if NEGATIONS.intersection(preceding[-_NEGATION_WINDOW:]):
+            negated += abs(weight) * (1 - _NEGATION_DAMPING)
+            weight *= _NEGATION_DAMPING
+
+        term = match.group(0).lower()
+        if weight > 0:
+            positive += weight
+            positive_hits.append(term)
+        else:
+            negative -= weight
+            negative_hits.append(term)
+
+    total = positive + negative
+    if total == 0:
+        return {"sentiment": "neutral", "explanation": "Лексичний аналіз: немає сигналів", "confidence": 0.0}
+
+    net = positive - negative
+    # Частка домінуючого напрямку та сила сигналу
+    dominance = abs(net) / total
+    strength = 1 - math.exp(-abs(net))
+    # Заперечені сигнали знижують впевненість, щоб такі тексти йшли в LLM
+    certainty = total / (total + negated)
+    confidence = round(dominance * (0.5 + 0.5 * strength) * certainty, 2)
+
+    if net > 0:
+        sentiment, hits, label = "bullish", positive_hits, "позитивні"
+    elif net < 0:
+        sentiment, hits, label = "bearish", negative_hits, "негативні"
+    else:
+        sentiment, hits, label = "neutral", positive_hits + negative_hits, "змішані"
+
+    return {
+        "sentiment": sentiment,
+        "explanation": f"Лексичний аналіз: {label} сигнали ({', '.join(dict.fromkeys(hits[:3]))})",
+        "confidence": confidence
+    }
+
+
+def classify_with_lexicon(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Повертає результат словника, якщо він достатньо впевнений
+
+    Args:
+        text: Текст новини
+
+    Returns:
+        Результат аналізу або None, якщо текст треба передати в LLM
+    """
+    if not SENTIMENT_LEXICON_ENABLED:
+        return None
+
+    result = score_sentiment(text)
+    lexicon_stats["scored"] += 1
+    if result["sentiment"] != "neutral" and result["confidence"] >= SENTIMENT_LEXICON_THRESHOLD:
+        lexicon_stats["resolved"] += 1
+        return result
+
+    lexicon_stats["escalated"] += 1
+    return None
+
+
+def get_lexicon_stats() -> Dict[str, Any]:
+    """Повертає статистику та частку ескалацій до LLM"""
+    scored = lexicon_stats["scored"]
+    return {
+        **lexicon_stats,
+        "escalation_rate": round(lexicon_stats["escalated"] / scored, 3) if scored else 0.0,
+        "threshold": SENTIMENT_LEXICON_THRESHOLD
+    }
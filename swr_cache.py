@@ -0,0 +1,159 @@
+"""
+Кеш зі стратегією stale-while-revalidate та фоновим оновленням
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Затримка першої повторної спроби після невдалого оновлення (секунди);
+# далі подвоюється, але не перевищує refresh_after
+SWR_RETRY_DELAY = 5.0
+
+
+class StaleWhileRevalidateCache:
+    """
+    Кеш одного значення (наприклад, стрічки новин).
+
+    - Свіже значення (молодше за refresh_after) повертається одразу.
+    - Застаріле, але в межах ttl + max_stale, теж повертається одразу,
+      а оновлення запускається у фоні.
+    - Одночасні оновлення об'єднуються в одну задачу.
+    - Після невдалого оновлення наступна спроба відкладається з експоненційною
+      затримкою (до refresh_after), щоб збій джерела не вичерпував квоту API.
+    - Порожній результат без попередніх даних кешується як звичайне значення.
+    - Фоновий цикл (run_refresher) оновлює значення до закінчення TTL,
+      поки кеш використовується.
+    """
+
+    def __init__(
+        self,
+        fetcher: Callable[[], Awaitable[Any]],
+        ttl: float,
+        max_stale: float,
+        prewarm_ratio: float = 0.8,
+        idle_timeout: Optional[float] = None
+    ):
+        """
+        Args:
+            fetcher: Корутина-фабрика, що завантажує свіже значення
+            ttl: Час життя значення (секунди)
+            max_stale: Скільки секунд після ttl ще можна віддавати застаріле значення
+            prewarm_ratio: Частка ttl, після якої значення оновлюється заздалегідь
+            idle_timeout: Фонове оновлення зупиняється, якщо кеш не читали стільки секунд
+        """
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.refresh_after = ttl * prewarm_ratio
+        self.idle_timeout = idle_timeout if idle_timeout is not None else ttl * 3
+        self._value: Any = None
+        self._fetched_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._failures = 0
+        self._last_error: Optional[Exception] = None
+        self._last_access = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.stats = {"fresh": 0, "stale": 0, "miss": 0, "refreshes": 0, "refresh_errors": 0, "backoff": 0}
+
+    def _age(self) -> Optional[float]:
+        if self._fetched_at is None:
+            return None
+        return time.monotonic() - self._fetched_at
+
+    def _retry_delay(self) -> float:
+        """Затримка до наступної спроби після невдалих оновлень"""
+        return min(SWR_RETRY_DELAY * 2 ** (self._failures - 1), max(self.refresh_after, SWR_RETRY_DELAY))
+
+    def _backing_off(self) -> bool:
+        if not self._failures or self._attempted_at is None:
+            return False
+        return time.monotonic() - self._attempted_at < self._retry_delay()
+
+    async def _refresh(self) -> Any:
+        self.stats["refreshes"] += 1
+        self._attempted_at = time.monotonic()
+        try:
+            value = await self.fetcher()
+        except Exception as e:
+            self._failures += 1
+            self._last_error = e
+            self.stats["refresh_errors"] += 1
+            print(f"Помилка оновлення кешу: {e}")
+            if self._fetched_at is None:
+                raise
+            return self._value
+
+        if not value and self._fetched_at is not None and self._value:
+            # Порожній результат не затирає попередні дані, але вважається збоєм джерела
+            self._failures += 1
+            self.stats["refresh_errors"] += 1
+            return self._value
+
+        self._value = value
+        self._fetched_at = time.monotonic()
+        self._failures = 0
+        self._last_error = None
+        return self._value
+
+    def refresh(self) -> "asyncio.Future":
+        """Запускає оновлення або повертає вже запущене (в межах циклу подій)"""
+        loop = asyncio.get_running_loop()
+        task = self._refresh_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._refresh())
+            self._refresh_task = task
+        return task
+
+    async def get(self) -> Any:
+        """Повертає значення з кешу, за потреби оновлюючи його"""
+        self._last_access = time.monotonic()
+        age = self._age()
+
+        if age is not None:
+            if age < self.refresh_after:
+                self.stats["fresh"] += 1
+                return self._value
+            if age < self.ttl + self.max_stale:
+                # Віддаємо застаріле значення, оновлюємо у фоні (якщо не чекаємо після збою)
+                self.stats["stale"] += 1
+                if not self._backing_off():
+                    self.refresh()
+                return self._value
+
+        task = self._refresh_task
+        if self._backing_off() and (task is None or task.done()):
+            # Джерело недоступне: не повторюємо запит на кожне читання
+            self.stats["backoff"] += 1
+            if self._fetched_at is not None:
+                return self._value
+            raise self._last_error or RuntimeError("Джерело даних тимчасово недоступне")
+
+        self.stats["miss"] += 1
+        return await asyncio.shield(self.refresh())
+
+    async def run_refresher(self) -> None:
+        """Фоновий цикл: оновлює значення до закінчення TTL, поки кеш читають"""
+        while True:
+            age = self._age()
+            delay = self.refresh_after - age if age is not None else self.refresh_after
+            if self._failures and self._attempted_at is not None:
+                delay = self._retry_delay() - (time.monotonic() - self._attempted_at)
+            await asyncio.sleep(max(delay, 1.0))
+
+            idle = time.monotonic() - self._last_access
+            if self._last_access and idle < self.idle_timeout:
+                try:
+                    await asyncio.shield(self.refresh())
+                except Exception:
+                    # Помилку вже враховано в _refresh, пробуємо наступного разу
+                    pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Повертає лічильники та вік значення"""
+        age = self._age()
+        return {
+            **self.stats,
+            "age": round(age, 1) if age is not None else None,
+            "ttl": self.ttl,
+            "failures": self._failures
+        }
@@ -0,0 +1,212 @@
+"""
+Довідник символів (symbol master): тикери, аліаси та класи активів з SQLite індексу
+"""
+import csv
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SYMBOL_INDEX_PATH = os.getenv("SYMBOL_INDEX_PATH", "symbols.sqlite3")
+# Як часто (секунди) фонова задача перевіряє, чи змінився файл індексу
+SYMBOL_INDEX_CHECK_INTERVAL = float(os.getenv("SYMBOL_INDEX_CHECK_INTERVAL", "30"))
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS symbols (
+        symbol TEXT PRIMARY KEY,
+        asset_class TEXT NOT NULL,
+        name TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS aliases (
+        alias TEXT PRIMARY KEY,
+        symbol TEXT NOT NULL
+    )""",
+)
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    # Читаємо індекс через mmap замість буферизованих read()
+    conn.execute("PRAGMA mmap_size=268435456")
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def write_index(
+    path: str,
+    symbols: Iterable[Tuple[str, str, Optional[str]]],
+    aliases: Iterable[Tuple[str, str]]
+) -> None:
+    """
+    Записує символи та аліаси в SQLite індекс (існуючі записи оновлюються)
+
+    Args:
+        path: Шлях до файлу індексу
+        symbols: Пари (тикер, клас активу, назва)
+        aliases: Пари (аліас, тикер)
+    """
+    conn = _connect(path)
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO symbols (symbol, asset_class, name) VALUES (?, ?, ?)",
+            ((symbol.upper(), asset_class, name) for symbol, asset_class, name in symbols)
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO aliases (alias, symbol) VALUES (?, ?)",
+            ((alias.lower(), symbol.upper()) for alias, symbol in aliases)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def import_csv(csv_path: str, index_path: str) -> int:
+    """
+    Імпортує символи з CSV у індекс.
+
+    Колонки: symbol, asset_class (stocks / crypto / forex), name, aliases
+    (аліаси через "|", наприклад "apple|епл|яблоко").
+
+    Returns:
+        Кількість імпортованих символів
+    """
+    symbols: List[Tuple[str, str, Optional[str]]] = []
+    aliases: List[Tuple[str, str]] = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            symbol = row["symbol"].strip().upper()
+            if not symbol:
+                continue
+            symbols.append((symbol, row.get("asset_class", "stocks").strip() or "stocks", row.get("name") or None))
+            for alias in (row.get("aliases") or "").split("|"):
+                if alias.strip():
+                    aliases.append((alias.strip(), symbol))
+    write_index(index_path, symbols, aliases)
+    return len(symbols)
+
+
+class SymbolMaster:
+    """
+    Довідник символів з O(1) пошуком за тикером та аліасом.
+
+    Дані читаються з SQLite індексу в словники при першому зверненні;
+    зміни файлу індексу підхоплює maybe_reload, який викликає фонова задача
+    (не запити). Якщо індексу немає, він створюється з вбудованих словників (seed).
+    """
+
+    def __init__(self, path: str, seed_aliases: Dict[str, str], seed_categories: Dict[str, List[str]]):
+        self.path = path
+        self._seed_aliases = seed_aliases
+        self._seed_categories = seed_categories
+        self._lock = threading.Lock()
+        self._symbols: Dict[str, str] = {}
+        self._names: Dict[str, str] = {}
+        self._aliases: Dict[str, str] = {}
+        self._mtime = 0.0
+        # Збільшується з кожним перезавантаженням (для перебудови залежних структур)
+        self.version = 0
+
+    def _seed(self) -> None:
+        symbols = [
+            (symbol, asset_class, None)
+            for asset_class, tickers in self._seed_categories.items()
+            for symbol in tickers
+        ]
+        write_index(self.path, symbols, self._seed_aliases.items())
+
+    def load(self) -> None:
+        """Завантажує (або перезавантажує) довідник з індексу"""
+        with self._lock:
+            if not os.path.exists(self.path):
+                self._seed()
+
+            # Вбудовані словники завжди доступні, індекс їх доповнює або перевизначає
+            symbols = {
+                symbol: asset_class
+                for asset_class, tickers in self._seed_categories.items()
+                for symbol in tickers
+            }
+            names: Dict[str, str] = {}
+            aliases = {alias.lower(): symbol for alias, symbol in self._seed_aliases.items()}
+
+            conn = _connect(self.path)
+            try:
+                for symbol, asset_class, name in conn.execute("SELECT symbol, asset_class, name FROM symbols"):
+                    symbols[symbol] = asset_class
+                    if name:
+                        names[symbol] = name
+                aliases.update(conn.execute("SELECT alias, symbol FROM aliases"))
+            finally:
+                conn.close()
+
+            # Підміняємо словники цілком - читачі бачать або старий, або новий стан
+            self._symbols, self._names, self._aliases = symbols, names, aliases
+            self._mtime = os.path.getmtime(self.path)
+            self.version += 1
+        print(f"📇 Довідник символів: {len(symbols)} символів, {len(aliases)} аліасів")
+
+    def _ensure_loaded(self) -> None:
+        # Лише перше звернення читає індекс; далі зміни підхоплює фонова перевірка
+        if not self.version:
+            self.load()
+
+    def maybe_reload(self) -> bool:
+        """
+        Перезавантажує довідник, якщо файл індексу змінився
+        (блокує - викликається з фонової задачі, а не з обробки запитів)
+
+        Returns:
+            True, якщо довідник було перезавантажено
+        """
+        if not self.version:
+            self.load()
+            return True
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime != self._mtime:
+            self.load()
+            return True
+        return False
+
+    def asset_class(self, symbol: str) -> Optional[str]:
+        """Повертає клас активу (stocks / crypto / forex) або None"""
+        self._ensure_loaded()
+        return self._symbols.get(symbol.upper())
+
+    def resolve_alias(self, alias: str) -> Optional[str]:
+        """Повертає тикер для аліаса ("apple", "біткоїн") або None"""
+        self._ensure_loaded()
+        return self._aliases.get(alias.lower())
+
+    def name(self, symbol: str) -> Optional[str]:
+        """Повертає назву символу, якщо вона є в індексі"""
+        self._ensure_loaded()
+        return self._names.get(symbol.upper())
+
+    def aliases(self) -> Dict[str, str]:
+        """Повертає всі аліаси (аліас -> тикер)"""
+        self._ensure_loaded()
+        return self._aliases
+
+    def stats(self) -> Dict[str, int]:
+        """Кількість символів та аліасів у довіднику"""
+        self._ensure_loaded()
+        return {"symbols": len(self._symbols), "aliases": len(self._aliases), "version": self.version}
+
+
+if __name__ == "__main__":
+    # python symbol_master.py symbols.csv [symbols.sqlite3]
+    if len(sys.argv) < 2:
+        print("Використання: python symbol_master.py <symbols.csv> [index.sqlite3]")
+        sys.exit(1)
+    target = sys.argv[2] if len(sys.argv) > 2 else SYMBOL_INDEX_PATH
+    count = import_csv(sys.argv[1], target)
+    print(f"✅ Імпортовано {count} символів у {target}")
@@ -1,5 +1,6 @@
 import os
 import asyncio
+import json
 import logging
 import time
 from dotenv import load_dotenv
@@ -12,6 +13,10 @@ load_dotenv()
 # Token із .env
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 API_URL = "http://localhost:8000/run"
+STREAM_API_URL = "http://localhost:8000/run/stream"
+
+# Мінімальний інтервал між оновленнями часткової відповіді (ліміти Telegram на редагування)
+STREAM_EDIT_INTERVAL = 1.5
 
 # Ініціалізація бота
 bot = Bot(token=TELEGRAM_TOKEN)
@@ -33,6 +38,69 @@ INTENT_EMOJIS = {
 }
 
 
+async def fetch_streaming_answer(payload: dict, processing_msg: types.Message) -> str:
+    """
+    Отримує відповідь агента через /run/stream і показує часткову відповідь
+    та кроки агента в повідомленні про обробку
+
+    Returns:
+        Фінальний текст відповіді
+    """
+    partial = ""
+    last_edit = 0.0
+    event = None
+
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        async with client.stream("POST", STREAM_API_URL, json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                    continue
+                if not line.startswith("data:"):
+                    continue
+
+                data = json.loads(line[len("data:"):].strip())
+                if event in ("final", "error"):
+                    return data["content"]
+
+                status = None
+                if event == "step":
+                    status = f"🔧 Виконую: {data['tool']}..."
+                elif event == "token":
+                    partial += data["token"]
+                    status = partial[-4000:]
+
+                now = time.monotonic()
+                if status and now - last_edit >= STREAM_EDIT_INTERVAL:
+                    last_edit = now
+                    try:
+                        # Без parse_mode: часткова відповідь може мати незакриту Markdown розмітку
+                        await processing_msg.edit_text(status)
+                    except Exception:
+                        logging.debug("Не вдалося оновити часткову відповідь")
+
+    return partial or "Не вдалося отримати відповідь від агента."
+
+
+async def fetch_answer(payload: dict, processing_msg: types.Message) -> str:
+    """
+    Отримує відповідь агента потоково (/run/stream), а якщо потік недоступний
+    або обірвався - звичайним запитом до /run (таймаут не повторюється)
+    """
+    try:
+        return await fetch_streaming_answer(payload, processing_msg)
+    except httpx.TimeoutException:
+        raise
+    except (httpx.HTTPStatusError, httpx.TransportError, ValueError) as e:
+        logging.warning(f"Потокова відповідь недоступна ({e}), запит через /run")
+
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        response = await client.post(API_URL, json=payload)
+        response.raise_for_status()
+        return response.json()["message"]["content"]
+
+
 # Команди бота
 @dp.message(Command("start"))
 async def cmd_start(message: types.Message):
@@ -118,11 +186,7 @@ async def handle_message(message: types.Message):
     }
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(API_URL, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            content = result["message"]["content"]
+        content = await fetch_answer(payload, processing_msg)
 
         # Видаляємо повідомлення про обробку
         await processing_msg.delete()
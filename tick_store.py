@@ -0,0 +1,239 @@
+"""
+In-memory сховище тіків: кільцеві буфери (timestamp, ціна, обсяг) по символах
+з O(1) агрегатами за вікно часу (зміна, мін/макс, VWAP/TWAP)
+"""
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from quote_cache import normalize_symbol
+
+load_dotenv()
+
+# Скільки останніх тіків зберігати на символ
+TICK_BUFFER_SIZE = int(os.getenv("TICK_BUFFER_SIZE", "512"))
+# Скільки символів тримати в пам'яті (найдавніше використані витісняються)
+TICK_STORE_MAX_SYMBOLS = int(os.getenv("TICK_STORE_MAX_SYMBOLS", "2000"))
+# Вікно агрегатів (секунди): старіші тіки не враховуються у зміні ціни та діапазоні
+TICK_WINDOW = float(os.getenv("TICK_WINDOW", "86400"))
+
+
+# Мінімальна сумарна тривалість (секунди), з якою TWAP має сенс (менше - залишок округлення)
+_TW_EPSILON = 1e-6
+
+
+class TickBuffer:
+    """
+    Кільцевий буфер тіків одного символу фіксованого розміру.
+
+    Дані лежать у масивах array('d'), тож пам'ять на символ обмежена
+    (4 * 8 байт * capacity). Вікно - не більше capacity тіків і не старіше
+    window секунд. Суми для VWAP/TWAP оновлюються інкрементально,
+    мінімум і максимум вікна - монотонними чергами (амортизовано O(1)).
+    """
+
+    def __init__(self, capacity: int, window: float = TICK_WINDOW):
+        self.capacity = capacity
+        self.window = window
+        self._ts = array("d", bytes(8 * capacity))
+        self._price = array("d", bytes(8 * capacity))
+        self._volume = array("d", bytes(8 * capacity))
+        # Тривалість, протягом якої діяла ціна тіку (до наступного тіку) - вага для TWAP
+        self._duration = array("d", bytes(8 * capacity))
+        self._seq = 0  # номер наступного тіку
+        self._start = 0  # номер найстарішого тіку у вікні
+        self._pv_sum = 0.0
+        self._volume_sum = 0.0
+        self._volume_ticks = 0  # тіки з ненульовим обсягом у вікні
+        self._tw_sum = 0.0
+        self._tw_duration = 0.0
+        self._max: Deque[Tuple[int, float]] = deque()
+        self._min: Deque[Tuple[int, float]] = deque()
+
+    def __len__(self) -> int:
+        return self._seq - self._start
+
+    def _slot(self, seq: int) -> int:
+        return seq % self.capacity
+
+    def _drop_oldest(self) -> None:
+        old = self._slot(self._start)
+        if self._volume[old] > 0:
+            self._volume_ticks -= 1
+        self._pv_sum -= self._price[old] * self._volume[old]
+        self._volume_sum -= self._volume[old]
+        self._tw_sum -= self._price[old] * self._duration[old]
+        self._tw_duration -= self._duration[old]
+        if not self._volume_ticks:
+            # Без залишків похибки округлення від вилучених тіків
+            self._pv_sum = self._volume_sum = 0.0
+        self._start += 1
+        for window in (self._max, self._min):
+            while window and window[0][0] < self._start:
+                window.popleft()
+
+    def expire(self, now: float) -> None:
+        """Прибирає тіки, старіші за вікно часу"""
+        while self._start < self._seq and self._ts[self._slot(self._start)] <= now - self.window:
+            self._drop_oldest()
+        if len(self) <= 1:
+            # Одному тіку ще немає з чим рахувати тривалість - без залишків округлення
+            self._tw_sum = self._tw_duration = 0.0
+
+    def append(self, timestamp: float, price: float, volume: float = 0.0) -> None:
+        """Додає тік, витісняючи найстаріший, якщо буфер заповнений"""
+        seq = self._seq
+        if seq > self._start:
+            # Попередній тік діяв до поточного
+            prev = self._slot(seq - 1)
+            duration = max(timestamp - self._ts[prev], 0.0)
+            self._duration[prev] = duration
+            self._tw_sum += self._price[prev] * duration
+            self._tw_duration += duration
+
+        if seq - self._start >= self.capacity:
+            self._drop_oldest()
+
+        slot = self._slot(seq)
+        self._ts[slot] = timestamp
+        self._price[slot] = price
+        self._volume[slot] = volume
+        self._duration[slot] = 0.0
+        self._pv_sum += price * volume
+        self._volume_sum += volume
+        if volume > 0:
+            self._volume_ticks += 1
+
+        for window, better in ((self._max, lambda a, b: a >= b), (self._min, lambda a, b: a <= b)):
+            while window and better(price, window[-1][1]):
+                window.pop()
+            window.append((seq, price))
+        self._seq = seq + 1
+        self.expire(timestamp)
+
+    def last(self) -> Optional[Tuple[float, float]]:
+        """Останній тік (timestamp, ціна)"""
+        if not len(self):
+            return None
+        slot = self._slot(self._seq - 1)
+        return self._ts[slot], self._price[slot]
+
+    def first(self) -> Optional[Tuple[float, float]]:
+        """Найстаріший тік у вікні (timestamp, ціна)"""
+        if not len(self):
+            return None
+        slot = self._slot(self._start)
+        return self._ts[slot], self._price[slot]
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        """
+        Агрегати по вікну: зміна ціни від since, діапазон і середня ціна -
+        vwap, якщо тіки мають обсяг, інакше twap (зважена за часом)
+        """
+        last, first = self.last(), self.first()
+        if last is None or first is None:
+            return None
+        change = last[1] - first[1]
+        summary = {
+            "last": last[1],
+            "change": change,
+            "change_percent": change / first[1] * 100 if first[1] else 0.0,
+            "high": self._max[0][1],
+            "low": self._min[0][1],
+            "ticks": len(self),
+            "since": first[0],
+            "updated_at": last[0]
+        }
+        if self._volume_ticks and self._volume_sum > 0:
+            summary["vwap"] = self._pv_sum / self._volume_sum
+        else:
+            summary["twap"] = self._tw_sum / self._tw_duration if self._tw_duration > _TW_EPSILON else last[1]
+        return summary
+
+
+class TickStore:
+    """Кільцеві буфери тіків по символах з LRU витісненням холодних символів"""
+
+    def __init__(self, capacity: int, max_symbols: int, window: float = TICK_WINDOW):
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self.window = window
+        self._buffers: "OrderedDict[str, TickBuffer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"ticks": 0, "evictions": 0}
+
+    def record(self, symbol: str, price: Any, timestamp: Optional[float] = None, volume: float = 0.0) -> None:
+        """
+        Записує тік ціни
+
+        Args:
+            symbol: Тикер
+            price: Ціна (число або рядок з API)
+            timestamp: Час тіку (unix timestamp), за замовчуванням - зараз
+            volume: Обсяг, якщо відомий (для VWAP)
+        """
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            return
+        key = normalize_symbol(symbol)
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = TickBuffer(self.capacity, self.window)
+                self._buffers[key] = buffer
+                while len(self._buffers) > self.max_symbols:
+                    self._buffers.popitem(last=False)
+                    self.stats["evictions"] += 1
+            self._buffers.move_to_end(key)
+            buffer.append(timestamp if timestamp is not None else time.time(), price, volume)
+            self.stats["ticks"] += 1
+
+    def summary(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Агрегати по символу або None, якщо тіків немає"""
+        key = normalize_symbol(symbol)
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                return None
+            self._buffers.move_to_end(key)
+            buffer.expire(time.time())
+            return buffer.summary()
+
+    def enrich(self, symbol: str, quote: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Доповнює котирування зміною ціни (від since) та діапазоном з тіків
+        за вікно (лише якщо є хоча б два тіки і в котируванні цих полів ще немає)
+        """
+        if quote.get("error"):
+            return quote
+        summary = self.summary(symbol)
+        if summary is None or summary["ticks"] < 2:
+            return quote
+        enriched = dict(quote)
+        for field in ("change", "change_percent", "high", "low", "vwap", "twap"):
+            if field in summary:
+                enriched.setdefault(field, round(summary[field], 6))
+        enriched.setdefault("since", summary["since"])
+        return enriched
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Розмір сховища"""
+        with self._lock:
+            symbols = len(self._buffers)
+        return {
+            **self.stats,
+            "symbols": symbols,
+            "max_symbols": self.max_symbols,
+            "buffer_size": self.capacity,
+            "window": self.window
+        }
+
+
+# Глобальне сховище тіків
+tick_store = TickStore(TICK_BUFFER_SIZE, TICK_STORE_MAX_SYMBOLS)
@@ -7,10 +7,31 @@ import backoff
 import httpx
 import re
 import json
-from typing import Dict, Any, Optional
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
 import os
 from dotenv import load_dotenv
 
+from http_clients import http_client
+from llm_client import openai_client
+from quote_cache import quote_cache
+from tick_store import tick_store
+from price_stream import PRICE_STREAM_ENABLED, price_stream
+from price_history import (
+    HISTORY_CACHE_DIR, HISTORY_INTERVALS, HISTORY_MAX_BARS, HistoryFetchError, HistoryStore, PriceHistory
+)
+from sentiment_cache import sentiment_cache, prompt_version
+from sentiment_lexicon import classify_with_lexicon
+from entity_matcher import build_entity_matcher
+from symbol_master import SymbolMaster, SYMBOL_INDEX_CHECK_INTERVAL, SYMBOL_INDEX_PATH
+from news_cache import news_query_cache
+from provider_health import hedged_request
+from provider_router import ProviderAdapter, provider_router
+from news_pipeline import rank_news, NEWS_PROVIDER_FETCH_SIZE
+from news_store import news_store
+from news_ingest import NEWS_INGEST_ENABLED, NEWS_INGEST_INTERVAL
+
 load_dotenv()
 
 # Константа для правил аналізу тональності
@@ -29,9 +50,12 @@ SENTIMENT_ANALYSIS_RULES = """Проаналізуй тональність ек
 }
 """
 
+
 async def analyze_market_sentiment(news_text: str) -> str:
     """
-    Аналізує тональність новини за допомогою OpenAI GPT-3.5-turbo
+    Аналізує тональність новини за допомогою OpenAI GPT-3.5-turbo.
+    Результати зберігаються в постійному кеші, тож повторна новина
+    не потребує звернення до LLM.
     
     Args:
         news_text: Текст новини для аналізу
@@ -39,6 +63,11 @@ async def analyze_market_sentiment(news_text: str) -> str:
     Returns:
         JSON рядок з результатами аналізу
     """
+    news_text = news_text[:2000]
+    cache_key = sentiment_cache.make_key(news_text, SENTIMENT_PROMPT_VERSION)
+    cached = sentiment_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
     @backoff.on_exception(
         backoff.expo,
@@ -46,15 +75,13 @@ async def analyze_market_sentiment(news_text: str) -> str:
         max_tries=3
     )
     async def call_openai():
-        client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        try:
+        async with openai_client() as client:
             response = await asyncio.wait_for(
                 client.chat.completions.create(
                     model="gpt-3.5-turbo",
                     messages=[
                         {"role": "system", "content": SENTIMENT_ANALYSIS_RULES},
-                        {"role": "user", "content": f"Новина: {news_text[:2000]}"}
+                        {"role": "user", "content": f"Новина: {news_text}"}
                     ],
                     temperature=0,
                     max_tokens=512,
@@ -63,22 +90,172 @@ async def analyze_market_sentiment(news_text: str) -> str:
                 timeout=30.0
             )
             return response.choices[0].message.content.strip()
-        finally:
-            await client.close()
     
-    return await call_openai()
+    result = await call_openai()
+    
+    # Кешуємо лише коректні JSON відповіді
+    try:
+        if "sentiment" in json.loads(result):
+            sentiment_cache.set(cache_key, result)
+    except (ValueError, TypeError):
+        pass
+    
+    return result
 
 
-async def analyze_multiple_news(news_list: list) -> list:
+# Правила для пакетного аналізу кількох новин одним запитом
+SENTIMENT_BATCH_RULES = """Проаналізуй тональність кожної економічної новини для ринку окремо.
+
+Класифікуй кожну як:
+- bullish: позитивний вплив на ринок (зростання, позитивні показники)
+- bearish: негативний вплив на ринок (падіння, негативні показники)  
+- neutral: нейтральний або неоднозначний вплив
+
+Новини пронумеровані як [0], [1], ... Поверни тільки JSON масив у тому ж порядку,
+по одному об'єкту на кожну новину:
+[
+  {"index": 0, "sentiment": "bullish/bearish/neutral", "explanation": "коротке пояснення (до 50 слів)", "confidence": 0.8}
+]
+"""
+
+# Налаштування пакетного режиму
+SENTIMENT_BATCH_ENABLED = os.getenv("SENTIMENT_BATCH_ENABLED", "true").lower() in ("1", "true", "yes")
+SENTIMENT_BATCH_TOKEN_BUDGET = int(os.getenv("SENTIMENT_BATCH_TOKEN_BUDGET", "3000"))
+SENTIMENT_BATCH_MAX_ITEMS = int(os.getenv("SENTIMENT_BATCH_MAX_ITEMS", "20"))
+
+VALID_SENTIMENTS = ("bullish", "bearish", "neutral")
+
+# Версія промпту для ключів кешу тональності. Одиночний і пакетний аналіз
+# пишуть у спільний кеш, тож зміна будь-якого з правил інвалідовує записи
+SENTIMENT_PROMPT_VERSION = prompt_version(
+    f"{SENTIMENT_ANALYSIS_RULES}\n{SENTIMENT_BATCH_RULES}", "gpt-3.5-turbo"
+)
+
+
+def _parse_sentiment_result(result: Any) -> Dict[str, Any]:
+    """Перетворює відповідь analyze_market_sentiment (або виняток) у словник"""
+    if isinstance(result, Exception):
+        return {
+            "sentiment": "neutral",
+            "explanation": f"Помилка аналізу: {str(result)[:50]}",
+            "confidence": 0.0
+        }
+    try:
+        return json.loads(result)
+    except (ValueError, TypeError):
+        return {
+            "sentiment": "neutral", 
+            "explanation": "Не вдалося розпарсити відповідь",
+            "confidence": 0.0
+        }
+
+
+def _estimate_tokens(text: str) -> int:
+    """Груба оцінка кількості токенів (~4 символи на токен)"""
+    return len(text) // 4 + 1
+
+
+def _chunk_by_token_budget(items: list, token_budget: int, max_items: int) -> list:
     """
-    Аналізує список новин паралельно
-    
+    Розбиває список (індекс, текст) на пакети в межах бюджету токенів
+
     Args:
-        news_list: Список текстів новин
-        
+        items: Список пар (індекс, текст новини)
+        token_budget: Максимум токенів вхідного тексту на пакет
+        max_items: Максимум новин у пакеті
+
     Returns:
-        Список результатів аналізу
+        Список пакетів
+    """
+    chunks, current, used = [], [], 0
+    for index, text in items:
+        cost = _estimate_tokens(text)
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            chunks.append(current)
+            current, used = [], 0
+        current.append((index, text))
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _parse_batch_response(content: str, expected: int) -> Optional[list]:
+    """
+    Розбирає JSON масив відповіді пакетного аналізу
+
+    Returns:
+        Список результатів у порядку новин або None, якщо відповідь некоректна
     """
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.strip("`")
+        content = content[content.find("["):]
+    try:
+        data = json.loads(content)
+    except (ValueError, TypeError):
+        return None
+    if isinstance(data, dict):
+        data = data.get("results")
+    if not isinstance(data, list) or len(data) != expected:
+        return None
+
+    # Відновлюємо порядок за index, якщо модель його переставила
+    if all(isinstance(item, dict) and isinstance(item.get("index"), int) for item in data):
+        data = sorted(data, key=lambda item: item["index"])
+        if [item["index"] for item in data] != list(range(expected)):
+            return None
+
+    results = []
+    for item in data:
+        if not isinstance(item, dict):
+            return None
+        sentiment = str(item.get("sentiment", "")).lower()
+        if sentiment not in VALID_SENTIMENTS:
+            return None
+        try:
+            confidence = float(item.get("confidence", 0.5))
+        except (ValueError, TypeError):
+            confidence = 0.5
+        results.append({
+            "sentiment": sentiment,
+            "explanation": str(item.get("explanation", "")),
+            "confidence": confidence
+        })
+    return results
+
+
+async def _classify_news_chunk(texts: list) -> Optional[list]:
+    """Класифікує пакет новин одним запитом до GPT. None - якщо відповідь не розпарсилась."""
+    numbered = "\n\n".join(f"[{i}] {text}" for i, text in enumerate(texts))
+
+    @backoff.on_exception(
+        backoff.expo,
+        (openai.APIError, openai.RateLimitError, asyncio.TimeoutError),
+        max_tries=3
+    )
+    async def call_openai():
+        async with openai_client() as client:
+            response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": SENTIMENT_BATCH_RULES},
+                        {"role": "user", "content": f"Новини:\n{numbered}"}
+                    ],
+                    temperature=0,
+                    max_tokens=min(4096, 120 * len(texts) + 100),
+                    stream=False
+                ),
+                timeout=45.0
+            )
+            return response.choices[0].message.content.strip()
+
+    return _parse_batch_response(await call_openai(), len(texts))
+
+
+async def _analyze_news_individually(news_list: list) -> list:
+    """Аналізує новини окремими запитами (до 5 одночасно)"""
     semaphore = asyncio.Semaphore(5)  # Максимум 5 одночасних запитів
     
     async def analyze_single(news_text):
@@ -89,26 +266,91 @@ async def analyze_multiple_news(news_list: list) -> list:
     results = await asyncio.gather(*tasks, return_exceptions=True)
     
     # Обробляємо помилки
-    processed_results = []
-    for i, result in enumerate(results):
-        if isinstance(result, Exception):
-            processed_results.append({
-                "sentiment": "neutral",
-                "explanation": f"Помилка аналізу: {str(result)[:50]}",
-                "confidence": 0.0
-            })
+    return [_parse_sentiment_result(result) for result in results]
+
+
+async def analyze_news_batch(news_list: list) -> list:
+    """
+    Аналізує список новин пакетами: кілька новин в одному запиті до GPT.
+
+    Новини з кешу тональності не відправляються. Решта ділиться на пакети
+    за бюджетом токенів; якщо відповідь пакета не розпарсилась, його новини
+    аналізуються окремими запитами.
+    
+    Args:
+        news_list: Список текстів новин
+        
+    Returns:
+        Список результатів аналізу у порядку новин
+    """
+    results: list = [None] * len(news_list)
+    pending = []
+    
+    for i, news_text in enumerate(news_list):
+        news_text = news_text[:2000]
+        cached = sentiment_cache.get(sentiment_cache.make_key(news_text, SENTIMENT_PROMPT_VERSION))
+        if cached is not None:
+            results[i] = _parse_sentiment_result(cached)
+        else:
+            pending.append((i, news_text))
+    
+    semaphore = asyncio.Semaphore(5)
+    
+    async def run_chunk(chunk):
+        texts = [text for _, text in chunk]
+        try:
+            async with semaphore:
+                parsed = await _classify_news_chunk(texts)
+        except Exception as e:
+            print(f"Помилка пакетного аналізу тональності: {e}")
+            parsed = None
+        
+        if parsed is None:
+            parsed = await _analyze_news_individually(texts)
+        else:
+            for text, item in zip(texts, parsed):
+                key = sentiment_cache.make_key(text, SENTIMENT_PROMPT_VERSION)
+                sentiment_cache.set(key, json.dumps(item, ensure_ascii=False))
+        
+        for (i, _), item in zip(chunk, parsed):
+            results[i] = item
+    
+    chunks = _chunk_by_token_budget(pending, SENTIMENT_BATCH_TOKEN_BUDGET, SENTIMENT_BATCH_MAX_ITEMS)
+    await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    return results
+
+
+async def analyze_multiple_news(news_list: list) -> list:
+    """
+    Аналізує список новин. Однозначні заголовки класифікуються локальним
+    словником, решта - через LLM (пакетно або окремими запитами).
+    
+    Args:
+        news_list: Список текстів новин
+        
+    Returns:
+        Список результатів аналізу
+    """
+    results: list = [None] * len(news_list)
+    escalated = []
+    
+    for i, news_text in enumerate(news_list):
+        local_result = classify_with_lexicon(news_text)
+        if local_result is not None:
+            results[i] = local_result
+        else:
+            escalated.append(i)
+    
+    if escalated:
+        texts = [news_list[i] for i in escalated]
+        if SENTIMENT_BATCH_ENABLED and len(texts) > 1:
+            llm_results = await analyze_news_batch(texts)
         else:
-            try:
-                import json
-                processed_results.append(json.loads(result))
-            except:
-                processed_results.append({
-                    "sentiment": "neutral", 
-                    "explanation": "Не вдалося розпарсити відповідь",
-                    "confidence": 0.0
-                })
+            llm_results = await _analyze_news_individually(texts)
+        for i, result in zip(escalated, llm_results):
+            results[i] = result
     
-    return processed_results
+    return results
 
 
 # Константа для детекції інтентів
@@ -180,6 +422,90 @@ NON_FINANCIAL_KEYWORDS = [
     "movie", "фільм", "кино", "серіал"
 ]
 
+# Довідник символів: вбудовані словники + SQLite індекс (десятки тисяч тикерів)
+symbol_master = SymbolMaster(SYMBOL_INDEX_PATH, POPULAR_TICKERS, ASSET_CATEGORIES)
+
+# Автомат для пошуку аліасів тикерів та не-фінансових слів за один прохід
+_entity_matcher = {"version": None, "matcher": None}
+
+
+def refresh_symbols(force: bool = False) -> None:
+    """
+    Перечитує довідник символів (якщо індекс змінився або force) і перебудовує
+    автомат сутностей. Блокує (SQLite, побудова автомата) - на сервері
+    виконується у фоновому потоці, запити користуються готовим автоматом.
+    """
+    if force:
+        symbol_master.load()
+    else:
+        symbol_master.maybe_reload()
+    version = symbol_master.version
+    if _entity_matcher["version"] != version:
+        _entity_matcher["matcher"] = build_entity_matcher(symbol_master.aliases(), NON_FINANCIAL_KEYWORDS)
+        _entity_matcher["version"] = version
+
+
+async def run_symbol_reloader() -> None:
+    """Фоновий цикл: раз на SYMBOL_INDEX_CHECK_INTERVAL підхоплює зміни індексу символів"""
+    while True:
+        await asyncio.sleep(SYMBOL_INDEX_CHECK_INTERVAL)
+        try:
+            await asyncio.to_thread(refresh_symbols)
+        except Exception as e:
+            print(f"Помилка перезавантаження довідника символів: {e}")
+
+
+def get_entity_matcher():
+    """Повертає автомат сутностей (при першому зверненні - будує його)"""
+    if _entity_matcher["matcher"] is None:
+        refresh_symbols()
+    return _entity_matcher["matcher"]
+
+
+def entity_type_for(ticker: str) -> Optional[str]:
+    """Повертає тип сутності (stock / crypto / forex) для відомого тикера"""
+    asset_class = symbol_master.asset_class(ticker)
+    return asset_class.rstrip('s') if asset_class else None  # stocks -> stock
+
+# Тикери у верхньому регістрі (AAPL, TSLA)
+TICKER_PATTERN = re.compile(r'\b[A-Z]{3,5}\b')
+
+
+def extract_entities(text: str) -> list:
+    """
+    Знаходить тикери, згадані в тексті (аліаси та відомі тикери у верхньому регістрі)
+    
+    Args:
+        text: Текст новини
+        
+    Returns:
+        Відсортований список унікальних тикерів
+    """
+    tickers = {match.value for match in get_entity_matcher().find(text) if match.kind == "ticker"}
+    tickers.update(symbol for symbol in TICKER_PATTERN.findall(text) if symbol_master.asset_class(symbol))
+    return sorted(tickers)
+
+# Ключові слова для планування дій
+PRICE_KEYWORDS_RE = re.compile("|".join(["ціна", "скільки", "коштує", "price", "cost"]))
+INVEST_KEYWORDS_RE = re.compile("|".join([
+    "варто", "купити", "купува", "продати", "продава", "вкладати", "инвестировать", "buy", "sell", "invest"
+]))
+ASSET_NEWS_KEYWORDS_RE = re.compile("|".join(["новини", "що", "ситуація", "стан", "news", "situation"]))
+MARKET_KEYWORDS_RE = re.compile("|".join(["ринок", "ситуація", "новини", "market", "news", "sentiment"]))
+GENERAL_INVEST_KEYWORDS_RE = re.compile("|".join(["вкладати", "купити", "инвестировать", "invest", "buy"]))
+ANALYSIS_KEYWORDS_RE = re.compile("|".join([
+    "аналіз", "тональн", "прогноз", "порівня", "чому", "analy", "sentiment", "forecast", "compare", "why"
+]))
+
+
+def needs_analysis(user_input: str) -> bool:
+    """Чи питає запит більше, ніж ціну (інвестиції, новини, аналіз) - такі запити не йдуть швидким маршрутом"""
+    user_lower = user_input.lower()
+    return any(
+        pattern.search(user_lower)
+        for pattern in (INVEST_KEYWORDS_RE, MARKET_KEYWORDS_RE, ANALYSIS_KEYWORDS_RE)
+    )
+
 
 async def analyze_intent(user_input: str) -> str:
     """
@@ -198,9 +524,7 @@ async def analyze_intent(user_input: str) -> str:
         max_tries=3
     )
     async def call_openai():
-        client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        try:
+        async with openai_client() as client:
             response = await asyncio.wait_for(
                 client.chat.completions.create(
                     model="gpt-3.5-turbo",
@@ -215,8 +539,6 @@ async def analyze_intent(user_input: str) -> str:
                 timeout=15.0
             )
             return response.choices[0].message.content.strip().lower()
-        finally:
-            await client.close()
     
     try:
         intent = await call_openai()
@@ -243,22 +565,38 @@ def extract_ticker(user_input: str) -> Optional[str]:
     Returns:
         Тикер акції або None якщо не знайдено
     """
-    user_input_lower = user_input.lower()
-    
     # Спочатку шукаємо в популярних тикерах
-    for key, ticker in POPULAR_TICKERS.items():
-        if key in user_input_lower:
-            return ticker
+    for match in get_entity_matcher().find(user_input):
+        if match.kind == "ticker":
+            return match.value
     
     # Шукаємо паттерни типу AAPL, TSLA (верхній регістр, 3-5 букв)
-    ticker_pattern = r'\b[A-Z]{3,5}\b'
-    matches = re.findall(ticker_pattern, user_input)
-    if matches:
-        return matches[0]
+    match = TICKER_PATTERN.search(user_input)
+    if match:
+        return match.group(0)
     
     return None
 
 
+def to_twelve_data_symbol(symbol: str, asset_class: str) -> str:
+    """
+    Переводить тикер у формат Twelve Data
+
+    Args:
+        symbol: Тикер активу (наприклад, AAPL або BTCUSD)
+        asset_class: Клас активу (stocks / crypto / forex)
+
+    Returns:
+        Тикер для Twelve Data (BTCUSD -> BTC/USD, EURUSD -> EUR/USD)
+    """
+    symbol = symbol.upper()
+    if asset_class == "crypto" and "/" not in symbol and symbol.endswith("USD") and len(symbol) > 3:
+        return f"{symbol[:-3]}/USD"
+    if asset_class == "forex" and "/" not in symbol and len(symbol) == 6:
+        return f"{symbol[:3]}/{symbol[3:]}"
+    return symbol
+
+
 async def get_stock_price(symbol: str) -> Dict[str, Any]:
     """
     Отримує поточну ціну акції через Twelve Data API
@@ -280,7 +618,7 @@ async def get_stock_price(symbol: str) -> Dict[str, Any]:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with http_client(url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             data = response.json()
@@ -317,11 +655,7 @@ async def get_crypto_price(symbol: str) -> Dict[str, Any]:
         return {"error": "API ключ Twelve Data не налаштований"}
     
     # Конвертуємо формат для Twelve Data API (BTC/USD)
-    if symbol.upper().endswith("USD") and len(symbol) > 3:
-        crypto_base = symbol.upper()[:-3]
-        formatted_symbol = f"{crypto_base}/USD"
-    else:
-        formatted_symbol = symbol.upper()
+    formatted_symbol = to_twelve_data_symbol(symbol, "crypto")
     
     url = "https://api.twelvedata.com/price"
     params = {
@@ -330,7 +664,7 @@ async def get_crypto_price(symbol: str) -> Dict[str, Any]:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with http_client(url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             data = response.json()
@@ -403,38 +737,36 @@ ACTION_PLANNING_RULES = """Ти плануєш дії для фінансово
 """
 
 
-async def detect_entity(user_input: str) -> Dict[str, Any]:
+async def detect_entity(user_input: str, use_llm: bool = True) -> Dict[str, Any]:
     """
     Розпізнає фінансові сутності у запиті користувача
     
     Args:
         user_input: Текст запиту користувача
+        use_llm: Звертатися до LLM, якщо словник нічого не знайшов
         
     Returns:
         Словник з інформацією про сутність
     """
-    # Спочатку швидка перевірка через словник
-    user_input_lower = user_input.lower()
+    # Спочатку швидка перевірка через словник (один прохід автомата)
+    matches = get_entity_matcher().find(user_input)
     
     # Перевіряємо чи є не-фінансові ключові слова
-    for keyword in NON_FINANCIAL_KEYWORDS:
-        if keyword in user_input_lower:
-            return {
-                "is_financial": False,
-                "entity": None,
-                "entity_type": None,
-                "confidence": 0.8
-            }
+    if any(match.kind == "non_financial" for match in matches):
+        return {
+            "is_financial": False,
+            "entity": None,
+            "entity_type": None,
+            "confidence": 0.8
+        }
     
     # Шукаємо в словнику популярних тикерів
-    for key, ticker in POPULAR_TICKERS.items():
-        if key in user_input_lower:
+    for match in matches:
+        if match.kind == "ticker":
+            ticker = match.value
+            
             # Визначаємо тип активу
-            entity_type = "stock"
-            if ticker in ASSET_CATEGORIES["crypto"]:
-                entity_type = "crypto"
-            elif ticker in ASSET_CATEGORIES["forex"]:
-                entity_type = "forex"
+            entity_type = entity_type_for(ticker) or "stock"
             
             return {
                 "is_financial": True,
@@ -444,24 +776,26 @@ async def detect_entity(user_input: str) -> Dict[str, Any]:
             }
     
     # Шукаємо тикери у верхньому регістрі (AAPL, TSLA, тощо)
-    ticker_pattern = r'\b[A-Z]{3,5}\b'
-    matches = re.findall(ticker_pattern, user_input)
-    if matches:
-        ticker = matches[0]
-        entity_type = "stock"  # За замовчуванням
-        
-        for category, tickers in ASSET_CATEGORIES.items():
-            if ticker in tickers:
-                entity_type = category.rstrip('s')  # stocks -> stock
-                break
+    ticker_match = TICKER_PATTERN.search(user_input)
+    if ticker_match:
+        ticker = ticker_match.group(0)
+        known_type = entity_type_for(ticker)
         
         return {
             "is_financial": True,
             "entity": ticker,
-            "entity_type": entity_type,
+            "entity_type": known_type or "stock",  # За замовчуванням
             "confidence": 0.7
         }
     
+    if not use_llm:
+        return {
+            "is_financial": False,
+            "entity": None,
+            "entity_type": None,
+            "confidence": 0.0
+        }
+    
     # Якщо нічого не знайшли через словник, використовуємо LLM
     try:
         @backoff.on_exception(
@@ -470,9 +804,7 @@ async def detect_entity(user_input: str) -> Dict[str, Any]:
             max_tries=3
         )
         async def call_openai():
-            client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            
-            try:
+            async with openai_client() as client:
                 response = await asyncio.wait_for(
                     client.chat.completions.create(
                         model="gpt-3.5-turbo",
@@ -487,8 +819,6 @@ async def detect_entity(user_input: str) -> Dict[str, Any]:
                     timeout=15.0
                 )
                 return response.choices[0].message.content.strip()
-            finally:
-                await client.close()
         
         result = await call_openai()
         return json.loads(result)
@@ -525,11 +855,11 @@ async def plan_actions(user_input: str, entity_info: Dict[str, Any]) -> Dict[str
         entity = entity_info["entity"]
         
         # Якщо питають про ціну
-        if any(word in user_lower for word in ["ціна", "скільки", "коштує", "price", "cost"]):
+        if PRICE_KEYWORDS_RE.search(user_lower):
             actions.append({"action": "get_price", "params": {"symbol": entity}})
         
         # Якщо питають про інвестиції/рекомендації
-        elif any(word in user_lower for word in ["варто", "купити", "вкладати", "инвестировать", "buy", "invest"]):
+        elif INVEST_KEYWORDS_RE.search(user_lower):
             actions.extend([
                 {"action": "get_price", "params": {"symbol": entity}},
                 {"action": "get_news_targeted", "params": {"query": entity.replace("USD", "")}},
@@ -537,7 +867,7 @@ async def plan_actions(user_input: str, entity_info: Dict[str, Any]) -> Dict[str
             ])
         
         # Якщо питають про новини/ситуацію з активом
-        elif any(word in user_lower for word in ["новини", "що", "ситуація", "стан", "news", "situation"]):
+        elif ASSET_NEWS_KEYWORDS_RE.search(user_lower):
             actions.extend([
                 {"action": "get_price", "params": {"symbol": entity}},
                 {"action": "get_news_targeted", "params": {"query": entity.replace("USD", "")}}
@@ -552,13 +882,13 @@ async def plan_actions(user_input: str, entity_info: Dict[str, Any]) -> Dict[str
     
     # Якщо немає конкретного активу
     else:
-        if any(word in user_lower for word in ["ринок", "ситуація", "новини", "market", "news", "sentiment"]):
+        if MARKET_KEYWORDS_RE.search(user_lower):
             actions.extend([
                 {"action": "get_news_general"},
                 {"action": "analyze_sentiment"}
             ])
         
-        elif any(word in user_lower for word in ["вкладати", "купити", "инвестировать", "invest", "buy"]):
+        elif GENERAL_INVEST_KEYWORDS_RE.search(user_lower):
             actions.extend([
                 {"action": "get_news_general"},
                 {"action": "analyze_sentiment"},
@@ -571,31 +901,31 @@ async def plan_actions(user_input: str, entity_info: Dict[str, Any]) -> Dict[str
     }
 
 
-async def get_price(symbol: str) -> Dict[str, Any]:
+def classify_symbol(symbol: str) -> str:
     """
-    Універсальна функція для отримання ціни (акції, крипто або форекс)
-    
+    Визначає клас активу за тикером
+
     Args:
         symbol: Тикер активу
-        
+
     Returns:
-        Словник з інформацією про ціну
+        Клас активу: stocks, crypto або forex
     """
-    # Визначаємо тип активу та API endpoint
-    if symbol in ASSET_CATEGORIES["stocks"]:
-        return await get_stock_price(symbol)
-    elif symbol in ASSET_CATEGORIES["crypto"]:
-        return await get_crypto_price(symbol)
-    elif symbol in ASSET_CATEGORIES["forex"]:
-        return await get_forex_price(symbol)
-    else:
-        # Спробуємо вгадати тип за форматом
-        if "USD" in symbol and len(symbol) <= 7:
-            return await get_crypto_price(symbol)
-        elif len(symbol) == 6 and symbol.isupper():
-            return await get_forex_price(symbol)
-        else:
-            return await get_stock_price(symbol)
+    asset_class = symbol_master.asset_class(symbol)
+    if asset_class:
+        return asset_class
+
+    # Спробуємо вгадати тип за форматом
+    if "USD" in symbol and len(symbol) <= 7:
+        return "crypto"
+    elif len(symbol) == 6 and symbol.isupper():
+        return "forex"
+    return "stocks"
+
+
+def is_known_symbol(symbol: str) -> bool:
+    """Чи є символ у довіднику (BTC/USD і BTCUSD - той самий символ)"""
+    return symbol_master.asset_class(symbol.strip().upper().replace("/", "").replace("-", "")) is not None
 
 
 async def get_forex_price(symbol: str) -> Dict[str, Any]:
@@ -605,6 +935,20 @@ async def get_forex_price(symbol: str) -> Dict[str, Any]:
     Args:
         symbol: Тикер валютної пари (наприклад, EURUSD)
         
+    Returns:
+        Словник з інформацією про ціну
+    """
+    return await get_finage_price(symbol, "forex")
+
+
+async def get_finage_price(symbol: str, market: str) -> Dict[str, Any]:
+    """
+    Отримує останню ціну через Finage API
+    
+    Args:
+        symbol: Тикер у форматі Finage (AAPL, BTCUSD, EURUSD)
+        market: Ринок Finage: stock / crypto / forex
+        
     Returns:
         Словник з інформацією про ціну
     """
@@ -612,11 +956,12 @@ async def get_forex_price(symbol: str) -> Dict[str, Any]:
     if not api_key:
         return {"error": "API ключ Finage не налаштований"}
     
-    url = f"https://api.finage.co.uk/last/forex/{symbol}"
+    symbol = symbol.upper().replace("/", "")
+    url = f"https://api.finage.co.uk/last/{market}/{symbol}"
     params = {"apikey": api_key}
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with http_client(url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             data = response.json()
@@ -635,17 +980,407 @@ async def get_forex_price(symbol: str) -> Dict[str, Any]:
                 return {"error": f"Ціна для {symbol} не знайдена"}
                 
     except Exception as e:
-        return {"error": f"Помилка отримання ціни валютної пари: {str(e)}"}
+        return {"error": f"Помилка отримання ціни з Finage: {str(e)}"}
+
+
+async def get_twelve_data_forex_price(symbol: str) -> Dict[str, Any]:
+    """Резервне джерело цін валютних пар: Twelve Data /price (EURUSD -> EUR/USD)"""
+    quote = await get_stock_price(to_twelve_data_symbol(symbol, "forex"))
+    return quote if quote.get("error") else {**quote, "symbol": symbol.upper()}
+
+
+def note_stream_request(symbol: str, asset_class: str) -> None:
+    """Враховує запит ціни для підписки на потік цін (price_stream)"""
+    if PRICE_STREAM_ENABLED:
+        price_stream.note_request(symbol, asset_class, to_twelve_data_symbol(symbol, asset_class))
+
+
+async def get_price(symbol: str, asset_class: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Універсальна функція для отримання ціни (акції, крипто або форекс).
+    Провайдер обирає provider_router (найшвидший здоровий для класу активу),
+    повільний або недоступний провайдер хеджується наступним за оцінкою.
+    Котирування кешуються в quote_cache з TTL по класу активу, кожне нове
+    котирування записується в tick_store (звідти - зміна ціни, мін/макс, VWAP/TWAP).
+    Часто запитувані символи підписуються на потік цін (price_stream) і
+    читаються з кешу без звернення до API.
+    
+    Args:
+        symbol: Тикер активу
+        asset_class: Клас активу (stocks / crypto / forex), якщо відомий заздалегідь
+        
+    Returns:
+        Словник з інформацією про ціну
+    """
+    asset_class = asset_class or classify_symbol(symbol)
+    note_stream_request(symbol, asset_class)
+    
+    async def fetch() -> Dict[str, Any]:
+        candidates = provider_router.candidates("price", asset_class)
+        if not candidates:
+            return {"error": f"Немає налаштованого провайдера цін для класу {asset_class} (перевірте ключі API)"}
+        primary = candidates[0]
+        if len(candidates) == 1:
+            quote = await primary.call("price", symbol, asset_class)
+        else:
+            fallback = candidates[1]
+            quote = await hedged_request(
+                lambda: primary.call("price", symbol, asset_class),
+                lambda: fallback.call("price", symbol, asset_class),
+                primary.name,
+                fallback_on_any_error=not provider_router.is_proven(primary, candidates)
+            )
+        if not quote.get("error"):
+            tick_store.record(symbol, quote.get("price"))
+        return quote
+    
+    quote = await quote_cache.get_or_fetch(symbol, asset_class, fetch)
+    return tick_store.enrich(symbol, quote)
+
+
+# Twelve Data приймає до 120 символів в одному запиті /price
+TWELVE_DATA_BATCH_SIZE = 100
+
+
+async def fetch_twelve_data_batch(symbols: list) -> Dict[str, Dict[str, Any]]:
+    """
+    Отримує ціни кількох символів одним запитом до Twelve Data /price
+
+    Args:
+        symbols: Тикери у форматі Twelve Data (AAPL, BTC/USD)
+
+    Returns:
+        Словник {тикер Twelve Data: інформація про ціну або помилка}
+    """
+    api_key = os.getenv("TWELVE_DATA_API_KEY")
+    if not api_key:
+        return {symbol: {"error": "API ключ Twelve Data не налаштований"} for symbol in symbols}
+    
+    url = "https://api.twelvedata.com/price"
+    params = {
+        "symbol": ",".join(symbols),
+        "apikey": api_key
+    }
+    
+    try:
+        async with http_client(url) as client:
+            response = await client.get(url, params=params, timeout=10.0)
+            response.raise_for_status()
+            data = response.json()
+    except httpx.TimeoutException:
+        return {symbol: {"error": "Таймаут при отриманні даних"} for symbol in symbols}
+    except httpx.HTTPStatusError as e:
+        return {symbol: {"error": f"HTTP помилка: {e.response.status_code}"} for symbol in symbols}
+    except Exception as e:
+        return {symbol: {"error": f"Помилка отримання ціни: {str(e)}"} for symbol in symbols}
+    
+    # Для одного символу Twelve Data повертає плоский об'єкт, для кількох - словник по символах
+    if len(symbols) == 1:
+        data = {symbols[0]: data}
+    
+    results = {}
+    for symbol in symbols:
+        item = data.get(symbol) or {}
+        if "price" in item:
+            results[symbol] = {
+                "symbol": symbol,
+                "price": float(item["price"]),
+                "currency": "USD"
+            }
+        else:
+            results[symbol] = {"error": f"Ціна для {symbol} не знайдена. {item.get('message', '')}"}
+    return results
+
+
+async def fetch_twelve_data_prices(pairs: list) -> Dict[str, Dict[str, Any]]:
+    """
+    Отримує ціни пакетами у Twelve Data
+
+    Args:
+        pairs: Список (тикер, клас активу)
+
+    Returns:
+        Словник {тикер: інформація про ціну або помилка}
+    """
+    td_symbols: Dict[str, list] = {}  # тикер Twelve Data -> [тикер]
+    for symbol, asset_class in pairs:
+        td_symbols.setdefault(to_twelve_data_symbol(symbol, asset_class), []).append(symbol)
+    
+    batch_symbols = list(td_symbols)
+    batches = [
+        batch_symbols[i:i + TWELVE_DATA_BATCH_SIZE]
+        for i in range(0, len(batch_symbols), TWELVE_DATA_BATCH_SIZE)
+    ]
+    results: Dict[str, Dict[str, Any]] = {}
+    for batch_result in await asyncio.gather(*(fetch_twelve_data_batch(batch) for batch in batches)):
+        for td_symbol, quote in batch_result.items():
+            for symbol in td_symbols[td_symbol]:
+                results[symbol] = quote
+    return results
+
+
+async def get_prices(symbols: list) -> Dict[str, Dict[str, Any]]:
+    """
+    Отримує ціни списку активів мінімальною кількістю запитів.
+
+    Свіжі котирування беруться з кешу. Символи, для яких найкращий провайдер
+    підтримує пакетні запити, запитуються пакетами, решта - паралельно через get_price.
+    
+    Args:
+        symbols: Список тикерів
+        
+    Returns:
+        Словник {тикер: інформація про ціну}
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    batched: Dict[str, tuple] = {}  # провайдер -> (адаптер, [(тикер, клас активу)])
+    single = []
+    
+    for raw_symbol in symbols:
+        symbol = raw_symbol.strip().upper()
+        if not symbol or symbol in results:
+            continue
+        
+        asset_class = classify_symbol(symbol)
+        cached = quote_cache.get(symbol, asset_class)
+        if cached is not None:
+            note_stream_request(symbol, asset_class)
+            results[symbol] = tick_store.enrich(symbol, cached)
+            continue
+        
+        candidates = provider_router.candidates("price", asset_class)
+        if candidates and candidates[0].supports("prices"):
+            # Символи з get_price враховуються там
+            note_stream_request(symbol, asset_class)
+            batched.setdefault(candidates[0].name, (candidates[0], []))[1].append((symbol, asset_class))
+        else:
+            single.append((symbol, asset_class))
+        results[symbol] = {}
+    
+    batch_results, single_results = await asyncio.gather(
+        asyncio.gather(*(adapter.call("prices", pairs) for adapter, pairs in batched.values())),
+        asyncio.gather(*(get_price(symbol, asset_class=asset_class) for symbol, asset_class in single))
+    )
+    
+    for (adapter, pairs), batch_result in zip(batched.values(), batch_results):
+        for symbol, asset_class in pairs:
+            quote = batch_result.get(symbol, {"error": f"Ціна для {symbol} не знайдена"})
+            if not quote.get("error"):
+                quote_cache.set(symbol, asset_class, quote)
+                tick_store.record(symbol, quote.get("price"))
+                results[symbol] = tick_store.enrich(symbol, quote)
+                continue
+            # Ліміт або збій API - віддаємо нещодавнє котирування, якщо воно є
+            stale = quote_cache.get_stale(symbol, asset_class)
+            results[symbol] = {**stale, "stale": True} if stale is not None else quote
+    
+    for (symbol, _), quote in zip(single, single_results):
+        results[symbol] = quote
+    
+    return results
+
+
+async def fetch_twelve_data_time_series(symbol: str, interval: str, start: int, end: int) -> list:
+    """
+    Завантажує OHLCV свічки з Twelve Data /time_series
+
+    Args:
+        symbol: Тикер активу
+        interval: Інтервал (1min ... 1week)
+        start: Початок діапазону (unix timestamp)
+        end: Кінець діапазону (unix timestamp, не включно)
+
+    Returns:
+        Свічки {ts, open, high, low, close, volume} за зростанням часу
+
+    Raises:
+        HistoryFetchError: Помилка API або мережі
+    """
+    api_key = os.getenv("TWELVE_DATA_API_KEY")
+    if not api_key:
+        raise HistoryFetchError("API ключ Twelve Data не налаштований")
+    
+    date_format = "%Y-%m-%d %H:%M:%S"
+    url = "https://api.twelvedata.com/time_series"
+    params = {
+        "symbol": to_twelve_data_symbol(symbol, classify_symbol(symbol)),
+        "interval": interval,
+        "start_date": datetime.fromtimestamp(start, timezone.utc).strftime(date_format),
+        "end_date": datetime.fromtimestamp(end, timezone.utc).strftime(date_format),
+        "timezone": "UTC",
+        "order": "ASC",
+        "outputsize": 5000,
+        "apikey": api_key
+    }
+    
+    try:
+        async with http_client(url) as client:
+            response = await client.get(url, params=params, timeout=30.0)
+            response.raise_for_status()
+            data = response.json()
+    except httpx.HTTPStatusError as e:
+        raise HistoryFetchError(f"HTTP помилка: {e.response.status_code}")
+    except Exception as e:
+        raise HistoryFetchError(f"Помилка отримання історії цін: {str(e)}")
+    
+    if data.get("status") == "error":
+        # Для діапазону без торгів (вихідні, свята) Twelve Data повертає помилку "No data"
+        if "no data" in str(data.get("message", "")).lower():
+            return []
+        raise HistoryFetchError(f"Історія для {symbol} недоступна. {data.get('message', '')}")
+    
+    bars = []
+    for value in data.get("values") or []:
+        moment = value["datetime"]
+        parsed = datetime.strptime(moment, date_format if " " in moment else "%Y-%m-%d")
+        ts = int(parsed.replace(tzinfo=timezone.utc).timestamp())
+        if start <= ts < end:
+            bars.append({
+                "ts": ts,
+                "open": float(value["open"]),
+                "high": float(value["high"]),
+                "low": float(value["low"]),
+                "close": float(value["close"]),
+                "volume": float(value.get("volume") or 0.0)
+            })
+    return bars
+
+
+# Історія цін: локальний колонковий кеш, до API - лише за відсутні діапазони
+price_history = PriceHistory(HistoryStore(HISTORY_CACHE_DIR), fetch_twelve_data_time_series)
+# Скільки інтервалів охоплює запит, якщо початок діапазону не задано
+HISTORY_DEFAULT_BARS = 100
+
+
+async def get_price_history(
+    symbol: str,
+    interval: str = "1day",
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    bars: int = HISTORY_DEFAULT_BARS
+) -> Dict[str, Any]:
+    """
+    Історичні OHLCV свічки активу
+    
+    Args:
+        symbol: Тикер активу
+        interval: Інтервал (1min, 5min, 15min, 30min, 1h, 4h, 1day, 1week)
+        start: Початок діапазону (unix timestamp), за замовчуванням - bars інтервалів тому;
+            діапазон не може бути довшим за HISTORY_MAX_BARS інтервалів
+        end: Кінець діапазону (unix timestamp), за замовчуванням - зараз
+        bars: Глибина історії в інтервалах, якщо start не задано (до HISTORY_MAX_BARS)
+        
+    Returns:
+        Словник зі свічками або помилкою
+    """
+    step = HISTORY_INTERVALS.get(interval)
+    if step is None:
+        return {"error": f"Невідомий інтервал: {interval}. Доступні: {', '.join(HISTORY_INTERVALS)}"}
+    end = end or int(time.time())
+    start = start or end - step * min(max(bars, 1), HISTORY_MAX_BARS)
+    
+    try:
+        candles = await price_history.get_bars(symbol, interval, start, end)
+    except (HistoryFetchError, ValueError) as e:
+        return {"error": str(e)}
+    
+    return {
+        "symbol": symbol.upper(),
+        "interval": interval,
+        "bars": candles.to_rows()
+    }
+
+
+def normalize_news_query(query: str) -> str:
+    """
+    Нормалізує пошуковий запит новин для ключа кешу:
+    регістр, пробіли та аліаси ("Apple", "aapl", "епл" -> AAPL; "BTC" -> BTCUSD)
+    
+    Args:
+        query: Пошуковий запит
+        
+    Returns:
+        Нормалізований ключ
+    """
+    normalized = " ".join(query.lower().split())
+    ticker = symbol_master.resolve_alias(normalized)
+    if ticker:
+        return ticker
+    if symbol_master.asset_class(normalized):
+        return normalized.upper()
+    return normalized
+
+
+# Вікно пошуку в локальному індексі новин (години)
+NEWS_LOCAL_SEARCH_HOURS = float(os.getenv("NEWS_LOCAL_SEARCH_HOURS", "72"))
+
+
+def search_local_news(query: str, limit: int) -> list:
+    """
+    Шукає новини в локальному повнотекстовому індексі (BM25) за словами
+    запиту та відповідним тикером
+    
+    Args:
+        query: Пошуковий запит
+        limit: Кількість новин
+        
+    Returns:
+        Список новин (може бути порожнім)
+    """
+    # Індекс наповнює лише фоновий інжест
+    if not NEWS_INGEST_ENABLED:
+        return []
+    normalized = normalize_news_query(query)
+    terms = set(query.lower().split())
+    terms.add(normalized)
+    since = time.time() - NEWS_LOCAL_SEARCH_HOURS * 3600
+    return news_store.search(sorted(terms), limit, since=since)
 
 
 async def get_news_targeted(query: str, limit: int = 5) -> list:
     """
-    Отримує новини по конкретному активу
+    Отримує новини по конкретному активу.
+    Спершу шукає в локальному індексі новин; до NewsData.io звертається,
+    лише якщо локальні дані застаріли або нічого не знайдено.
+    Результати API кешуються по нормалізованому запиту (news_query_cache).
     
     Args:
         query: Пошуковий запит (наприклад, "Apple", "Bitcoin")
         limit: Кількість новин
         
+    Returns:
+        Список новин
+    """
+    # SQLite пошук блокує - виконується в пулі потоків, а не в циклі подій
+    local_items = await asyncio.to_thread(search_local_news, query, limit)
+    sync_age = news_store.sync_age()
+    if local_items and sync_age is not None and sync_age < NEWS_INGEST_INTERVAL * 3:
+        return local_items
+    
+    cache_key = (normalize_news_query(query), limit)
+    cached = news_query_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    candidates = provider_router.candidates("news_search")
+    news_items = await candidates[0].call("news_search", query, limit) if candidates else []
+    # Порожній результат може бути помилкою API - не кешуємо,
+    # а віддаємо хоча б застарілі локальні новини
+    if news_items:
+        news_query_cache.set(cache_key, news_items)
+        return news_items
+    return local_items
+
+
+async def fetch_news_targeted(query: str, limit: int = 5) -> list:
+    """
+    Запитує новини по активу в NewsData.io (без кешу).
+    Запитуємо з запасом, щоб після дедуплікації залишилось limit новин.
+    
+    Args:
+        query: Пошуковий запит
+        limit: Кількість новин
+        
     Returns:
         Список новин
     """
@@ -659,17 +1394,17 @@ async def get_news_targeted(query: str, limit: int = 5) -> list:
         "q": f"{query} finance stock market investment",
         "category": "business",
         "language": "en",
-        "size": str(limit)
+        "size": str(max(limit, NEWS_PROVIDER_FETCH_SIZE))
     }
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with http_client(url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             data = response.json()
             
             news_items = []
-            for article in data.get("results", [])[:limit]:
+            for article in data.get("results", []):
                 if article.get("title") and article.get("description"):
                     news_items.append({
                         "title": article["title"],
@@ -679,15 +1414,251 @@ async def get_news_targeted(query: str, limit: int = 5) -> list:
                         "full_text": f"{article['title']}. {article['description']}"
                     })
             
-            return news_items
+            return rank_news(news_items, limit=limit)
     except Exception as e:
         print(f"Помилка отримання таргетованих новин: {e}")
         return []
 
 
+async def fetch_newsdata_io_news(category: str = "business,top", query: Optional[str] = None) -> List[Dict]:
+    """
+    Отримує новини з NewsData.io API
+
+    Args:
+        category: Категорії NewsData.io через кому
+        query: Ключові слова (None - всі новини категорій)
+    """
+    api_key = os.getenv("NEWSDATA_API_KEY")
+    if not api_key:
+        return []
+    
+    url = "https://newsdata.io/api/1/news"
+    params = {
+        "apikey": api_key,
+        "category": category,
+        "language": "en",
+        "size": str(NEWS_PROVIDER_FETCH_SIZE)
+    }
+    if query:
+        params["q"] = query
+    
+    try:
+        async with http_client(url) as client:
+            response = await client.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            
+            news_items = []
+            for article in data.get("results", [])[:NEWS_PROVIDER_FETCH_SIZE]:
+                if article.get("title") and article.get("description"):
+                    news_items.append({
+                        "title": article["title"],
+                        "description": article["description"],
+                        "source": "NewsData.io",
+                        "published_at": article.get("pubDate", ""),
+                        "full_text": f"{article['title']}. {article['description']}"
+                    })
+            return news_items
+    except Exception as e:
+        print(f"Помилка при отриманні новин з NewsData.io: {e}")
+        return []
+
+
+async def fetch_finage_news() -> List[Dict]:
+    """Отримує новини з Finage API"""
+    api_key = os.getenv("FINAGE_API_KEY")
+    if not api_key:
+        return []
+    
+    url = "https://api.finage.co.uk/news/forex"
+    params = {
+        "apikey": api_key,
+        "limit": str(NEWS_PROVIDER_FETCH_SIZE)
+    }
+    
+    try:
+        async with http_client(url) as client:
+            response = await client.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            
+            news_items = []
+            articles = data if isinstance(data, list) else data.get("news", [])
+            
+            for article in articles[:NEWS_PROVIDER_FETCH_SIZE]:
+                if article.get("title"):
+                    description = article.get("description", "") or article.get("summary", "")
+                    news_items.append({
+                        "title": article["title"],
+                        "description": description,
+                        "source": "Finage",
+                        "published_at": article.get("date", ""),
+                        "full_text": f"{article['title']}. {description}"
+                    })
+            return news_items
+    except Exception as e:
+        print(f"Помилка при отриманні новин з Finage: {e}")
+        return []
+
+
+async def get_market_news(category: str = "business", limit: int = 5) -> list:
+    """
+    Ринкові новини категорії через провайдера з можливістю news_category
+    (кешуються в news_query_cache, як і таргетовані новини)
+
+    Args:
+        category: Категорія NewsData.io (business, technology, ...)
+        limit: Кількість новин
+
+    Returns:
+        Список новин
+    """
+    cache_key = (f"category:{category.strip().lower()}", limit)
+    cached = news_query_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    candidates = provider_router.candidates("news_category")
+    news_items = await candidates[0].call("news_category", category, "market") if candidates else []
+    news_items = rank_news(news_items, limit=limit)
+    if news_items:
+        news_query_cache.set(cache_key, news_items)
+    return news_items
+
+
+async def twelve_data_price(symbol: str, asset_class: str) -> Dict[str, Any]:
+    """Ціна через Twelve Data для будь-якого класу активу"""
+    if asset_class == "crypto":
+        return await get_crypto_price(symbol)
+    if asset_class == "forex":
+        return await get_twelve_data_forex_price(symbol)
+    return await get_stock_price(symbol)
+
+
+# Ринки Finage по класах активів
+FINAGE_MARKETS = {"stocks": "stock", "crypto": "crypto", "forex": "forex"}
+
+
+async def finage_price(symbol: str, asset_class: str) -> Dict[str, Any]:
+    """Ціна через Finage для будь-якого класу активу"""
+    return await get_finage_price(symbol, FINAGE_MARKETS.get(asset_class, "stock"))
+
+
+# Адаптери провайдерів: можливості (обробники), класи активів, пакетні запити, затримка даних
+provider_router.register(ProviderAdapter(
+    "twelve_data",
+    asset_classes=("stocks", "crypto", "forex"),
+    batch_size=TWELVE_DATA_BATCH_SIZE,
+    freshness=60.0,
+    label="Twelve Data",
+    credentials=("TWELVE_DATA_API_KEY",),
+    price=twelve_data_price,
+    prices=fetch_twelve_data_prices
+))
+provider_router.register(ProviderAdapter(
+    "finage",
+    asset_classes=("stocks", "crypto", "forex"),
+    freshness=1.0,
+    label="Finage",
+    weight=0.5,
+    credentials=("FINAGE_API_KEY",),
+    price=finage_price,
+    news=fetch_finage_news
+))
+provider_router.register(ProviderAdapter(
+    "newsdata",
+    label="NewsData.io",
+    weight=0.6,
+    credentials=("NEWSDATA_API_KEY",),
+    news=fetch_newsdata_io_news,
+    news_search=fetch_news_targeted,
+    news_category=fetch_newsdata_io_news
+))
+
+
+# Залежності між діями плану: дія чекає на всі дії перелічених типів.
+# "*" - залежить від усіх інших дій плану
+ACTION_DEPENDENCIES = {
+    "analyze_sentiment": ("get_news_targeted", "get_news_general"),
+    "generate_advice": ("*",),
+}
+
+# Таймаути виконання окремих дій (секунди)
+ACTION_TIMEOUTS = {
+    "get_price": 12.0,
+    "get_news_targeted": 12.0,
+    "get_news_general": 15.0,
+    "analyze_sentiment": 45.0,
+    "generate_advice": 30.0,
+}
+DEFAULT_ACTION_TIMEOUT = 30.0
+
+
+async def _execute_action(action: Dict[str, Any], data: Dict[str, Any]) -> Optional[str]:
+    """
+    Виконує одну дію плану та записує результат у data
+
+    Returns:
+        Опис виконаної дії або None, якщо дія нічого не зробила
+    """
+    action_type = action["action"]
+    params = action.get("params", {})
+    
+    if action_type == "get_price":
+        symbol = params["symbol"]
+        data["price"] = await get_price(symbol)
+        return f"Отримано ціну для {symbol}"
+        
+    elif action_type == "get_news_targeted":
+        query = params["query"]
+        data["targeted_news"] = await get_news_targeted(query)
+        return f"Отримано новини для {query}"
+        
+    elif action_type == "get_news_general":
+        # Використовуємо існуючу функцію
+        from main import get_news
+        data["general_news"] = await get_news()
+        return "Отримано загальні новини"
+        
+    elif action_type == "analyze_sentiment":
+        # Аналізуємо тональність отриманих новин
+        news_to_analyze = data.get("targeted_news") or data.get("general_news", [])
+        if news_to_analyze:
+            news_texts = [item["full_text"] for item in news_to_analyze]
+            data["sentiment"] = await analyze_multiple_news(news_texts[:3])  # Обмежуємо для швидкості
+            return "Проаналізовано тональність новин"
+        
+    elif action_type == "generate_advice":
+        # Генеруємо поради на основі зібраних даних
+        context = params.get("context", "general")
+        data["advice"] = await generate_investment_advice(data, context)
+        return "Згенеровано інвестиційні поради"
+    
+    return None
+
+
+def _action_dependencies(actions: list) -> list:
+    """Повертає для кожної дії список індексів дій, від яких вона залежить"""
+    dependencies = []
+    for index, action in enumerate(actions):
+        depends_on = ACTION_DEPENDENCIES.get(action["action"], ())
+        dependencies.append([
+            other_index for other_index, other in enumerate(actions)
+            if other_index != index and (
+                ("*" in depends_on and "*" not in ACTION_DEPENDENCIES.get(other["action"], ()))
+                or other["action"] in depends_on
+            )
+        ])
+    return dependencies
+
+
 async def execute_action_plan(action_plan: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Виконує план дій та збирає результати
+    Виконує план дій та збирає результати.
+
+    Дії утворюють граф залежностей: незалежні (ціна, новини) виконуються
+    паралельно, аналіз тональності чекає на новини, поради - на все інше.
+    Кожна дія має власний таймаут.
     
     Args:
         action_plan: План дій з функції plan_actions
@@ -696,50 +1667,45 @@ async def execute_action_plan(action_plan: Dict[str, Any]) -> Dict[str, Any]:
         Результати виконання всіх дій
     """
     results = {"actions": [], "data": {}}
+    actions = action_plan["actions"]
+    dependencies = _action_dependencies(actions)
+    messages: list = [None] * len(actions)
+    tasks: Dict[int, asyncio.Task] = {}
     
-    for action in action_plan["actions"]:
-        action_type = action["action"]
-        params = action.get("params", {})
+    async def run_node(index: int) -> None:
+        action_type = actions[index]["action"]
+        dependency_tasks = [tasks[dep] for dep in dependencies[index]]
+        if dependency_tasks:
+            await asyncio.gather(*dependency_tasks, return_exceptions=True)
         
         try:
-            if action_type == "get_price":
-                symbol = params["symbol"]
-                price_data = await get_price(symbol)
-                results["data"]["price"] = price_data
-                results["actions"].append(f"Отримано ціну для {symbol}")
-                
-            elif action_type == "get_news_targeted":
-                query = params["query"]
-                news_data = await get_news_targeted(query)
-                results["data"]["targeted_news"] = news_data
-                results["actions"].append(f"Отримано новини для {query}")
-                
-            elif action_type == "get_news_general":
-                # Використовуємо існуючу функцію
-                from main import get_news
-                news_data = await get_news()
-                results["data"]["general_news"] = news_data
-                results["actions"].append("Отримано загальні новини")
-                
-            elif action_type == "analyze_sentiment":
-                # Аналізуємо тональність отриманих новин
-                news_to_analyze = results["data"].get("targeted_news") or results["data"].get("general_news", [])
-                if news_to_analyze:
-                    news_texts = [item["full_text"] for item in news_to_analyze]
-                    sentiment_data = await analyze_multiple_news(news_texts[:3])  # Обмежуємо для швидкості
-                    results["data"]["sentiment"] = sentiment_data
-                    results["actions"].append("Проаналізовано тональність новин")
-                
-            elif action_type == "generate_advice":
-                # Генеруємо поради на основі зібраних даних
-                context = params.get("context", "general")
-                advice = await generate_investment_advice(results["data"], context)
-                results["data"]["advice"] = advice
-                results["actions"].append("Згенеровано інвестиційні поради")
-                
+            messages[index] = await asyncio.wait_for(
+                _execute_action(actions[index], results["data"]),
+                timeout=ACTION_TIMEOUTS.get(action_type, DEFAULT_ACTION_TIMEOUT)
+            )
+        except asyncio.TimeoutError:
+            messages[index] = f"Таймаут виконання {action_type}"
         except Exception as e:
-            results["actions"].append(f"Помилка виконання {action_type}: {str(e)}")
+            messages[index] = f"Помилка виконання {action_type}: {str(e)}"
     
+    # Створюємо задачі в топологічному порядку, щоб залежності вже існували
+    pending = list(range(len(actions)))
+    while pending:
+        ready = [i for i in pending if all(dep in tasks for dep in dependencies[i])]
+        if not ready:
+            # Цикл у ACTION_DEPENDENCIES - решта дій ніколи не дочекається залежностей
+            skipped = ", ".join(actions[i]["action"] for i in pending)
+            print(f"⚠️ Циклічні залежності в плані дій, пропущено: {skipped}")
+            for index in pending:
+                messages[index] = f"Пропущено {actions[index]['action']}: циклічна залежність"
+            break
+        for index in ready:
+            tasks[index] = asyncio.create_task(run_node(index))
+        pending = [i for i in pending if i not in tasks]
+    await asyncio.gather(*tasks.values())
+    
+    # Описи дій у порядку плану
+    results["actions"] = [message for message in messages if message]
     return results
 
 
@@ -813,24 +1779,22 @@ async def generate_investment_advice(data: Dict[str, Any], context: str) -> str:
 Дай конкретні поради для контексту: {context}"""
     
     try:
-        client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        response = await asyncio.wait_for(
-            client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": advice_prompt},
-                    {"role": "user", "content": "Дай інвестиційні поради на основі наданого контексту"}
-                ],
-                temperature=0.3,
-                max_tokens=4096,
-                stream=False
-            ),
-            timeout=25.0
-        )
+        async with openai_client() as client:
+            response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": advice_prompt},
+                        {"role": "user", "content": "Дай інвестиційні поради на основі наданого контексту"}
+                    ],
+                    temperature=0.3,
+                    max_tokens=4096,
+                    stream=False
+                ),
+                timeout=25.0
+            )
         
         advice = response.choices[0].message.content.strip()
-        await client.close()
         return advice
         
     except Exception as e: